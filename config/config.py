@@ -1,6 +1,10 @@
+import logging
 import os
 import yaml
+from dataclasses import dataclass
 from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping
 from dotenv import load_dotenv
 
 # Load secrets from .env file
@@ -9,14 +13,163 @@ load_dotenv()
 # Base directory
 BASE_DIR = Path(__file__).resolve().parent.parent
 
-def load_settings():
+SETTINGS_PATH = BASE_DIR / "config" / "settings.yaml"
+
+def load_settings(settings_path: Path = SETTINGS_PATH) -> Dict[str, Any]:
     """Loads configuration from settings.yaml."""
-    settings_path = BASE_DIR / "config" / "settings.yaml"
+    settings_path = Path(settings_path)
     if not settings_path.exists():
         raise FileNotFoundError(f"Configuration file not found: {settings_path}")
     
+    # libyaml loader when available (several times faster than the pure Python one)
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
     with open(settings_path, "r") as f:
-        return yaml.safe_load(f)
+        return yaml.load(f, Loader=loader)
+
+def settings_values(settings: Dict[str, Any]) -> Dict[str, Any]:
+    """Config attribute values derived from a parsed settings.yaml (see Config.apply)."""
+    settings = {section: values or {} for section, values in (settings or {}).items()}
+    return {
+        # Trading Settings (from settings.yaml)
+        "TRADING_PAIRS": settings.get("trading", {}).get("pairs", []),
+        "TIMEFRAME": settings.get("trading", {}).get("timeframe", "M1"),
+        "MAGIC_NUMBER": settings.get("trading", {}).get("magic_number", 123456),
+
+        # Risk Settings
+        "MAX_DAILY_LOSS_PERCENT": settings.get("risk", {}).get("max_daily_loss_percent", 4.0),
+        "RISK_PER_TRADE_PERCENT": settings.get("risk", {}).get("risk_per_trade_percent", 0.5),
+        "MAX_RISK_PER_TRADE_PERCENT": settings.get("risk", {}).get("max_risk_per_trade_percent", 2.0),
+        "MAX_OPEN_TRADES": settings.get("risk", {}).get("max_open_trades", 1),
+        "MAX_CURRENCY_EXPOSURE": settings.get("risk", {}).get("max_currency_exposure", 2),
+        "MAX_CORRELATION": settings.get("risk", {}).get("max_correlation", 0.8),
+        "CORRELATION_WINDOW": settings.get("risk", {}).get("correlation_window", 100),
+        "CORRELATION_MIN_PERIODS": settings.get("risk", {}).get("correlation_min_periods", 30),
+
+        # Execution Settings
+        "ORDER_WORKERS": settings.get("execution", {}).get("order_workers", 2),
+        "CLOSE_WORKERS": settings.get("execution", {}).get("close_workers", 8),
+        "DEVIATION_POINTS": settings.get("execution", {}).get("deviation_points", 10),
+        "MAX_RETRIES": settings.get("execution", {}).get("max_retries", 3),
+        "RETRY_BUDGET_MS": settings.get("execution", {}).get("retry_budget_ms", 500),
+
+        # Position Management (Trailing Stop / Break-Even)
+        "MANAGE_POSITIONS": settings.get("position_management", {}).get("enabled", True),
+        "BREAK_EVEN_ATR": settings.get("position_management", {}).get("break_even_atr", 1.0),
+        "BREAK_EVEN_LOCK_POINTS": settings.get("position_management", {}).get("break_even_lock_points", 10),
+        "TRAIL_START_ATR": settings.get("position_management", {}).get("trail_start_atr", 1.5),
+        "TRAIL_DISTANCE_ATR": settings.get("position_management", {}).get("trail_distance_atr", 1.0),
+        "MIN_STEP_POINTS": settings.get("position_management", {}).get("min_step_points", 20),
+
+        # News Calendar
+        "NEWS_BLACKOUT_MINUTES": settings.get("news", {}).get("blackout_minutes", 15),
+        "NEWS_REFRESH_INTERVAL": settings.get("news", {}).get("refresh_interval_seconds", 4 * 3600),
+        "NEWS_RETRY_DELAY": settings.get("news", {}).get("retry_delay_seconds", 300),
+        "NEWS_STALE_AFTER": settings.get("news", {}).get("stale_after_seconds", 12 * 3600),
+        "NEWS_STALE_POLICY": settings.get("news", {}).get("stale_policy", "block"),
+        "NEWS_CACHE_PATH": str(BASE_DIR / settings.get("news", {}).get("cache_path", "data/news_cache.json")),
+        "NEWS_CALENDAR_FILE": settings.get("news", {}).get("calendar_file") or None,
+
+        # State Persistence
+        "STATE_ENABLED": settings.get("state", {}).get("enabled", True),
+        "STATE_PATH": str(BASE_DIR / settings.get("state", {}).get("path", "data/state.db")),
+        "STATE_FLUSH_INTERVAL": settings.get("state", {}).get("flush_interval_seconds", 1.0),
+        "STATE_CORRELATION_MAX_AGE": settings.get("state", {}).get("correlation_max_age_seconds", 600),
+
+        # Telegram Notifications (outbound queue)
+        "TELEGRAM_QUEUE_SIZE": settings.get("telegram", {}).get("queue_size", 200),
+        "TELEGRAM_MIN_INTERVAL": settings.get("telegram", {}).get("min_interval_seconds", 1.0),
+        "TELEGRAM_TIMEOUT": settings.get("telegram", {}).get("timeout_seconds", 10),
+        "TELEGRAM_ERROR_WINDOW": settings.get("telegram", {}).get("error_dedup_window_seconds", 600),
+        "TELEGRAM_DIGEST_INTERVAL": settings.get("telegram", {}).get("error_digest_interval_seconds", 60),
+        "TELEGRAM_COMMAND_TIMEOUT": settings.get("telegram", {}).get("command_timeout_seconds", 15),
+
+        # Console Dashboard
+        "UI_DASHBOARD": settings.get("ui", {}).get("dashboard", "auto"),
+        "UI_REFRESH_INTERVAL": settings.get("ui", {}).get("refresh_interval_seconds", 1.0),
+
+        # System Settings
+        "LOG_LEVEL": settings.get("system", {}).get("log_level", "INFO"),
+        "LOG_FORMAT": settings.get("system", {}).get("log_format", "text"),
+        "LOG_FILE": str(BASE_DIR / settings["system"]["log_file"]) if settings.get("system", {}).get("log_file") else "",
+        "LOG_MAX_BYTES": settings.get("system", {}).get("log_max_bytes", 10 * 1024 * 1024),
+        "LOG_BACKUP_COUNT": settings.get("system", {}).get("log_backup_count", 5),
+        "LOOP_INTERVAL": settings.get("system", {}).get("loop_interval_seconds", 1),
+        "DRY_RUN": settings.get("system", {}).get("dry_run", False),
+        "CONFIG_RELOAD_INTERVAL": settings.get("system", {}).get("config_reload_interval_seconds", 2.0),
+        "MT5_PROFILE": settings.get("system", {}).get("mt5_profile", True),
+
+        # Simulation Settings (Dry-Run Fill Model & Account)
+        "SIM_INITIAL_BALANCE": settings.get("simulation", {}).get("initial_balance", 10000.0),
+        "SIM_LEVERAGE": settings.get("simulation", {}).get("leverage", 100),
+        "SIM_SPREAD_POINTS": settings.get("simulation", {}).get("spread_points", 0),
+        "SIM_SLIPPAGE_POINTS": settings.get("simulation", {}).get("slippage_points", 0),
+        "SIM_LATENCY_MS": settings.get("simulation", {}).get("latency_ms", 0),
+        "SIM_SEED": settings.get("simulation", {}).get("seed", 42),
+
+        # Session Recording / Replay (MT5_BACKEND=replay)
+        "MT5_RECORD_PATH": str(BASE_DIR / settings["recording"]["record_path"])
+                           if settings.get("recording", {}).get("record_path") else "",
+        "MT5_REPLAY_PATH": str(BASE_DIR / settings.get("recording", {}).get("replay_path", "data/session.mt5rec")),
+        "MT5_REPLAY_PACE": settings.get("recording", {}).get("replay_pace", "realtime"),
+
+        # Fake Terminal (MT5_BACKEND=fake)
+        "FAKE_SEED": settings.get("fake_terminal", {}).get("seed", 42),
+        "FAKE_HISTORY_BARS": settings.get("fake_terminal", {}).get("history_bars", 2000),
+        "FAKE_TICK_INTERVAL": settings.get("fake_terminal", {}).get("tick_interval_seconds", 0.5),
+        "FAKE_VOLATILITY": settings.get("fake_terminal", {}).get("volatility", 0.0001),
+        "FAKE_SPREAD_POINTS": settings.get("fake_terminal", {}).get("spread_points", 10),
+        "FAKE_BALANCE": settings.get("fake_terminal", {}).get("balance", 10000.0),
+        "FAKE_LEVERAGE": settings.get("fake_terminal", {}).get("leverage", 100),
+        "FAKE_SPEED": settings.get("fake_terminal", {}).get("speed", 1.0),
+        "FAKE_BARS_PATH": settings.get("fake_terminal", {}).get("bars_path", ""),
+        "FAKE_LATENCY_MS": settings.get("fake_terminal", {}).get("latency_ms", 0.0),
+        "FAKE_JITTER_MS": settings.get("fake_terminal", {}).get("jitter_ms", 0.0),
+        "FAKE_FAILURE_RATE": settings.get("fake_terminal", {}).get("failure_rate", 0.0),
+        "FAKE_REQUOTE_RATE": settings.get("fake_terminal", {}).get("requote_rate", 0.0),
+    }
+
+# Settings the running engine re-applies on reload (see ScalpMasterBot.apply_config).
+# Any other change is reported and takes effect after a restart.
+HOT_RELOAD_KEYS = frozenset({
+    "TRADING_PAIRS", "LOOP_INTERVAL", "CONFIG_RELOAD_INTERVAL", "LOG_LEVEL",
+    "RISK_PER_TRADE_PERCENT", "MAX_RISK_PER_TRADE_PERCENT", "MAX_DAILY_LOSS_PERCENT", "MAX_OPEN_TRADES",
+    "MAX_CURRENCY_EXPOSURE", "MAX_CORRELATION",
+    "MANAGE_POSITIONS", "BREAK_EVEN_ATR", "BREAK_EVEN_LOCK_POINTS", "TRAIL_START_ATR",
+    "TRAIL_DISTANCE_ATR", "MIN_STEP_POINTS",
+    "NEWS_STALE_AFTER", "NEWS_STALE_POLICY", "TELEGRAM_COMMAND_TIMEOUT", "UI_REFRESH_INTERVAL",
+})
+
+# Type/range of every numeric hot-reloadable setting, checked before a reload is applied
+_POSITIVE, _NON_NEGATIVE, _COUNT = "a positive number", "a number >= 0", "a positive integer"
+_NUMERIC_SETTINGS = {
+    "LOOP_INTERVAL": _POSITIVE, "CONFIG_RELOAD_INTERVAL": _NON_NEGATIVE,
+    "RISK_PER_TRADE_PERCENT": _POSITIVE, "MAX_RISK_PER_TRADE_PERCENT": _POSITIVE,
+    "MAX_DAILY_LOSS_PERCENT": _POSITIVE, "MAX_OPEN_TRADES": _COUNT,
+    "MAX_CURRENCY_EXPOSURE": _COUNT, "MAX_CORRELATION": _POSITIVE,
+    "BREAK_EVEN_ATR": _POSITIVE, "BREAK_EVEN_LOCK_POINTS": _NON_NEGATIVE, "TRAIL_START_ATR": _POSITIVE,
+    "TRAIL_DISTANCE_ATR": _POSITIVE, "MIN_STEP_POINTS": _NON_NEGATIVE,
+    "NEWS_STALE_AFTER": _POSITIVE, "TELEGRAM_COMMAND_TIMEOUT": _POSITIVE, "UI_REFRESH_INTERVAL": _NON_NEGATIVE,
+}
+
+def _valid_number(value, rule: str) -> bool:
+    if isinstance(value, bool) or not isinstance(value, int if rule == _COUNT else (int, float)):
+        return False
+    return value >= 0 if rule == _NON_NEGATIVE else value > 0
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """Immutable set of settings values (one parsed settings.yaml)."""
+    values: Mapping[str, Any]
+    version: int = 0
+    mtime: float = 0.0
+
+    @classmethod
+    def of(cls, values: Dict[str, Any], version: int = 0, mtime: float = 0.0) -> "ConfigSnapshot":
+        return cls(MappingProxyType(dict(values)), version, mtime)
+
+    def changed(self, other: "ConfigSnapshot") -> List[str]:
+        """Keys whose value differs from `other`."""
+        return [key for key, value in self.values.items() if other.values.get(key) != value]
 
 # Load settings
 _settings = load_settings()
@@ -28,6 +181,7 @@ class Config:
     MT5_SERVER = os.getenv("MT5_SERVER", "")
     MT5_PATH = os.getenv("MT5_PATH", "")
     MT5_SUFFIX = os.getenv("MT5_SUFFIX", "")
+    MT5_BACKEND = os.getenv("MT5_BACKEND", "auto").lower()  # auto | mock | fake | replay (see mt5_loader)
     TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN", "")
     TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID", "")
 
@@ -39,20 +193,39 @@ class Config:
         """
         return f"{pair}{cls.MT5_SUFFIX}"
 
-    # Trading Settings (from settings.yaml)
-    TRADING_PAIRS = _settings.get("trading", {}).get("pairs", [])
-    TIMEFRAME = _settings.get("trading", {}).get("timeframe", "M1")
-    MAGIC_NUMBER = _settings.get("trading", {}).get("magic_number", 123456)
+    @classmethod
+    def snapshot(cls) -> ConfigSnapshot:
+        """The settings values currently in effect."""
+        return ConfigSnapshot.of({key: getattr(cls, key) for key in cls._settings_keys})
 
-    # Risk Settings
-    MAX_DAILY_LOSS_PERCENT = _settings.get("risk", {}).get("max_daily_loss_percent", 4.0)
-    RISK_PER_TRADE_PERCENT = _settings.get("risk", {}).get("risk_per_trade_percent", 0.5)
-    MAX_OPEN_TRADES = _settings.get("risk", {}).get("max_open_trades", 1)
+    @classmethod
+    def apply(cls, values: Dict[str, Any]):
+        """Installs settings values (one attribute assignment per key)."""
+        for key, value in values.items():
+            setattr(cls, key, value)
+        cls._settings_keys = tuple(dict.fromkeys((*getattr(cls, "_settings_keys", ()), *values)))
 
-    # System Settings
-    LOG_LEVEL = _settings.get("system", {}).get("log_level", "INFO")
-    LOOP_INTERVAL = _settings.get("system", {}).get("loop_interval_seconds", 1)
-    DRY_RUN = _settings.get("system", {}).get("dry_run", False)
+    @staticmethod
+    def check_settings(values: Dict[str, Any]) -> List[str]:
+        """Problems that make a (reloaded) settings.yaml unusable. Empty if valid."""
+        problems = []
+        pairs = values.get("TRADING_PAIRS")
+        if not pairs or not isinstance(pairs, list) or not all(isinstance(p, str) for p in pairs):
+            problems.append("trading.pairs must be a non-empty list of symbols")
+        bad = {key for key, rule in _NUMERIC_SETTINGS.items() if not _valid_number(values.get(key), rule)}
+        problems.extend(f"{key} must be {_NUMERIC_SETTINGS[key]}" for key in sorted(bad))
+        if not bad & {"RISK_PER_TRADE_PERCENT", "MAX_RISK_PER_TRADE_PERCENT"}:
+            if values["RISK_PER_TRADE_PERCENT"] > values["MAX_RISK_PER_TRADE_PERCENT"]:
+                problems.append("risk.risk_per_trade_percent exceeds risk.max_risk_per_trade_percent")
+        if "MAX_CORRELATION" not in bad and values["MAX_CORRELATION"] > 1:
+            problems.append("risk.max_correlation must be <= 1")
+        if not isinstance(values.get("MANAGE_POSITIONS"), bool):
+            problems.append("position_management.enabled must be true or false")
+        if values.get("NEWS_STALE_POLICY") not in ("block", "warn", "ignore"):
+            problems.append("news.stale_policy must be block, warn or ignore")
+        if not isinstance(logging.getLevelName(str(values.get("LOG_LEVEL")).upper()), int):
+            problems.append(f"system.log_level '{values.get('LOG_LEVEL')}' is not a logging level")
+        return problems
 
     @classmethod
     def validate(cls):
@@ -61,14 +234,16 @@ class Config:
         Raises ValueError if any critical config is missing.
         """
         missing_secrets = []
-        if not cls.MT5_LOGIN:
-            missing_secrets.append("MT5_LOGIN")
-        if not cls.MT5_PASSWORD:
-            missing_secrets.append("MT5_PASSWORD")
-        if not cls.MT5_SERVER:
-            missing_secrets.append("MT5_SERVER")
-        if not cls.MT5_PATH:
-            missing_secrets.append("MT5_PATH")
+        # The fake and replay terminals need no broker account
+        if cls.MT5_BACKEND not in ("fake", "replay"):
+            if not cls.MT5_LOGIN:
+                missing_secrets.append("MT5_LOGIN")
+            if not cls.MT5_PASSWORD:
+                missing_secrets.append("MT5_PASSWORD")
+            if not cls.MT5_SERVER:
+                missing_secrets.append("MT5_SERVER")
+            if not cls.MT5_PATH:
+                missing_secrets.append("MT5_PATH")
         if not cls.TELEGRAM_TOKEN:
             missing_secrets.append("TELEGRAM_TOKEN")
         if not cls.TELEGRAM_CHAT_ID:
@@ -93,6 +268,8 @@ class Config:
 
         print("[Config] Validation Successful.")
 
+Config.apply(settings_values(_settings))
+
 # Usage: 
 # from config.config import Config
 # Config.validate()
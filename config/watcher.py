@@ -0,0 +1,86 @@
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+from config.config import SETTINGS_PATH, Config, ConfigSnapshot, load_settings, settings_values
+
+logger = logging.getLogger(__name__)
+
+class ConfigWatcher:
+    """
+    Watches settings.yaml and prepares validated ConfigSnapshots.
+
+    A background thread polls the file's mtime every
+    Config.CONFIG_RELOAD_INTERVAL seconds (0 disables reloading). A changed
+    file is parsed and checked off the trading thread; only a valid
+    snapshot is published, and the engine take()s it between loops. An
+    invalid edit is logged and the running configuration is kept.
+    """
+    def __init__(self, path: Path = SETTINGS_PATH):
+        self.path = Path(path)
+        self.version = 0
+        self._mtime = self._stat()
+        self._pending: Optional[ConfigSnapshot] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is None and Config.CONFIG_RELOAD_INTERVAL > 0:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch, name="ConfigWatcher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def take(self) -> Optional[ConfigSnapshot]:
+        """The newest valid snapshot not yet applied, if any."""
+        with self._lock:
+            snapshot, self._pending = self._pending, None
+        return snapshot
+
+    def poll(self) -> Optional[ConfigSnapshot]:
+        """Checks the file once. Returns (and publishes) a new valid snapshot."""
+        mtime = self._stat()
+        if mtime is None or mtime == self._mtime:
+            return None
+        self._mtime = mtime
+        try:
+            values = settings_values(load_settings(self.path))
+        except Exception as e:
+            logger.error(f"settings.yaml reload failed, keeping current config: {e}")
+            return None
+        problems = Config.check_settings(values)
+        if problems:
+            logger.error(f"settings.yaml rejected, keeping current config: {'; '.join(problems)}")
+            return None
+
+        self.version += 1
+        snapshot = ConfigSnapshot.of(values, self.version, mtime)
+        with self._lock:
+            self._pending = snapshot
+        logger.info(f"settings.yaml changed: config v{self.version} ready")
+        return snapshot
+
+    def _stat(self) -> Optional[float]:
+        try:
+            return os.stat(self.path).st_mtime
+        except OSError:
+            return None
+
+    def _watch(self):
+        while True:
+            interval = Config.CONFIG_RELOAD_INTERVAL
+            if interval <= 0:
+                # Turned off by a reload: watching resumes after a restart
+                logger.info("settings.yaml reloading disabled (config_reload_interval_seconds = 0)")
+                return
+            if self._stop.wait(interval):
+                return
+            self.poll()
@@ -1,48 +1,89 @@
 import time
 import logging
 from datetime import datetime
-from typing import Dict
 
-from config.config import Config
+import pandas as pd
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Set, Tuple
+
+from config.config import HOT_RELOAD_KEYS, Config, ConfigSnapshot
+from config.watcher import ConfigWatcher
+from core.commands import CommandQueue
 from core.context import TradeContext
-from core.risk import RiskManager
+from core.correlation import RollingCorrelation
+from core.engine_state import EngineState, PositionView, SymbolState
+from core.exposure import PortfolioExposure
+from core.risk import LotSpec, RiskManager
+from core.startup import StartupTimer
 from modules.data.connection_manager import ConnectionManager
 from modules.data.market_data import MarketData
-from modules.data.mt5_loader import MT5
+from modules.data.mt5_loader import MT5, PROFILE
 from modules.indicators.indicators import Indicators
 from modules.ai.regime_filter import RegimeFilter
+from modules.ai.post_trade_adaptor import PostTradeAdaptor
 from strategies.checklist import StrategyChecklist
 from modules.data.news_loader import NewsLoader
-from modules.ui.telegram.notifier import TelegramNotifier
+from modules.data.state_store import StateStore
+from modules.ui.telegram.notifier import HIGH, TelegramNotifier
 from modules.ui.console import ConsoleUI
 
-# Execution Engines
-from modules.execution.order_manager import OrderManager
-from modules.execution.simulator import SimulatedExecution
+# Execution Engines (OrderManager / SimulatedExecution are imported for the active mode only)
+from modules.execution.pipeline import BulkCloseReport
+from modules.execution.position_cache import ClosedTrade, pair_name
+from modules.execution.position_manager import PositionManager
 
 logger = logging.getLogger(__name__)
 
 class ScalpMasterBot:
-    def __init__(self):
+    def __init__(self, startup: Optional[StartupTimer] = None):
         self.is_running = False
+        # Phase timings up to the first scan (main.py passes its own, started before the imports)
+        self.startup = startup or StartupTimer()
         
         # Initialize Core Modules
         self.risk_manager = RiskManager()
         self.regime_filter = RegimeFilter()
+        self.adaptor = PostTradeAdaptor()
         self.checklist = StrategyChecklist()
-        self.news_loader = NewsLoader()
+        self.news_loader = NewsLoader(cache_path=Config.NEWS_CACHE_PATH, calendar_file=Config.NEWS_CALENDAR_FILE)
+        # Portfolio gate: currency exposure + rolling return correlation
+        self.correlation = RollingCorrelation(Config.TRADING_PAIRS)
+        self.exposure = PortfolioExposure(Config.TRADING_PAIRS, self.correlation)
         
         # Select Execution Engine
         if Config.DRY_RUN:
             logger.info("Initializing in DRY-RUN (Simulation) Mode")
+            from modules.execution.simulator import SimulatedExecution
             self.execution = SimulatedExecution()
         else:
             logger.info("Initializing in LIVE TRADING Mode")
+            from modules.execution.order_manager import OrderManager
             self.execution = OrderManager()
-            
+        # Realized PnL feeds risk streaks, adaptor thresholds and Telegram
+        self.execution.subscribe_closes(self._on_trade_closed)
+        self.position_manager = PositionManager()
+
+        # Durable state: a crash-restart must not reset the daily loss limit
+        self.state_store = None
+        if Config.STATE_ENABLED:
+            namespace = "DRY-RUN" if Config.DRY_RUN else "LIVE"
+            self.state_store = StateStore(Config.STATE_PATH, namespace, Config.STATE_FLUSH_INTERVAL)
+        self._correlation_version = -1
+
         # State Tracking
         self.last_scan_time = 0
         self.start_time = time.time()
+        # Published once per loop for the UI threads (see get_state_summary)
+        self._decisions: Dict[str, SymbolState] = {}
+        self.state = EngineState(mode="DRY-RUN" if Config.DRY_RUN else "LIVE", started_at=self.start_time)
+
+        # Requests from the UI threads, applied between loop stages
+        self.commands = CommandQueue()
+        self.paused: Set[str] = set()
+        # Symbols that reported their last bar to the correlation matrix this loop
+        self._fed_symbols: Set[str] = set()
+        # settings.yaml hot reload, applied at the start of a loop
+        self.config_watcher = ConfigWatcher()
 
     def start(self):
         """
@@ -50,19 +91,35 @@ class ScalpMasterBot:
         """
         self.is_running = True
         logger.info(f"ScalpMaster v1.2 Started. Loop Interval: {Config.LOOP_INTERVAL}s")
-        TelegramNotifier.send("🚀 <b>ScalpMaster v1.2 Started</b>\nMonitoring markets...")
+        TelegramNotifier.send("🚀 <b>ScalpMaster v1.2 Started</b>\nMonitoring markets...", priority=HIGH)
         
         if not ConnectionManager.initialize():
             logger.critical("Failed to connect to MT5. Exiting.")
             return
+        self.startup.mark("mt5_connect")
 
-        # Snapshot Account for Risk Manager
-        self._risk_snapshot()
+        # Warm restart from the previous run, else snapshot the account
+        restored = self._restore_state()
+        if not restored.get('risk'):
+            self._risk_snapshot()
+        self.startup.mark("restore_state")
+        if not restored.get('correlation'):
+            self._seed_correlation()
+        self.startup.mark("history_load")
+        if self.state_store is not None:
+            self.state_store.start()
+        # Calendar refreshes off the trading loop
+        self.news_loader.start()
+        self.config_watcher.start()
 
         try:
             while self.is_running:
                 self.run_tick()
-                time.sleep(Config.LOOP_INTERVAL)
+                if not self.startup.reported:
+                    self.startup.mark("first_scan")
+                    self.startup.report()
+                # Sleeps like time.sleep, but a queued command wakes the loop
+                self.commands.wait(Config.LOOP_INTERVAL)
         except KeyboardInterrupt:
             self.stop()
         except Exception as e:
@@ -71,16 +128,29 @@ class ScalpMasterBot:
 
     def stop(self):
         self.is_running = False
+        self.news_loader.stop()
+        self.config_watcher.stop()
+        # Let in-flight orders finish before dropping the terminal connection
+        self.execution.shutdown()
+        self._reconcile_orders()
+        if self.state_store is not None:
+            self._persist_state()
+            self.state_store.close()
+            self.state_store = None
         ConnectionManager.shutdown()
+        if PROFILE is not None:
+            logger.info(PROFILE.report())
         logger.info("ScalpMaster Stopped.")
-        TelegramNotifier.send("🛑 <b>ScalpMaster Stopped</b>")
+        TelegramNotifier.send("🛑 <b>ScalpMaster Stopped</b>", priority=HIGH)
+        TelegramNotifier.flush()
 
     def _risk_snapshot(self):
         # account_info() returns tuple/struct in MT5
         # Mock returns None or Object
         # We need balance.
         # REAL MT5: mt5.account_info().balance
-        info = MT5.account_info()
+        # DRY-RUN: the simulated ledger
+        info = self.execution.account_info()
         balance = 10000.0 # Default fallback
         if info and hasattr(info, 'balance'):
             balance = info.balance
@@ -94,28 +164,322 @@ class ScalpMasterBot:
         if not ConnectionManager.ensure_connected():
             return
 
+        # Between loops: swap in an edited settings.yaml (validated off-thread)
+        snapshot = self.config_watcher.take()
+        if snapshot is not None:
+            self.apply_config(snapshot)
+
         current_time = datetime.now()
-        
+        timings: Dict[str, float] = {}
+        started = time.perf_counter()
+
+        # New UTC day: reset the daily loss baseline
+        if self.risk_manager.needs_snapshot():
+            self._risk_snapshot()
+
+        # One positions/deals sync per loop (Dry-Run: marks SL/TP fills).
+        # Closed trades are dispatched to _on_trade_closed.
+        self.execution.sync_positions()
+        if Config.MANAGE_POSITIONS:
+            self._manage_positions()
+        self.exposure.update(self.execution.cached_positions(), self.execution.pending_orders())
+
+        # Apply results of orders confirmed since the last loop
+        self._reconcile_orders()
+        mark = time.perf_counter()
+        timings['positions'] = (mark - started) * 1000.0
+
+        # UI commands (pause/resume/risk now, scans after this loop's scan)
+        scans = self._apply_commands()
+        forced = {symbol for _, symbols in scans for symbol in symbols}
+
         # Iterate over monitored pairs
         if not Config.TRADING_PAIRS:
+            self._publish_state(timings)
+            self._complete_scans(scans)
             return
 
         ConsoleUI.print_header(len(Config.TRADING_PAIRS), current_time)
         
         # Iterate over monitored pairs
+        signals = []
+        self._fed_symbols.clear()
         for symbol in Config.TRADING_PAIRS:
+            if symbol in self.paused and symbol not in forced:
+                self._report(symbol, "---", 0.0, "Paused")
+                continue
+            symbol_started = time.perf_counter()
             try:
-                self._process_symbol(symbol, current_time)
+                signal = self._process_symbol(symbol, current_time)
+                if signal:
+                    signals.append(signal)
             except Exception as e:
-                logger.error(f"Error processing {symbol}: {e}")
-                ConsoleUI.print_row(symbol, "ERR", 0.0, f"Error: {str(e)}", error=True)
-                
+                logger.error("Error processing %s: %s", symbol, e, extra={"symbol": symbol, "stage": "scan"})
+                self._report(symbol, "ERR", 0.0, f"Error: {str(e)}", error=True)
+            logger.debug("Scanned %s", symbol, extra={
+                "symbol": symbol, "stage": "scan", "latency_ms": (time.perf_counter() - symbol_started) * 1000.0,
+            })
+        self._feed_unscanned()
+
         ConsoleUI.print_section_end()
+        timings['scan'] = (time.perf_counter() - mark) * 1000.0
+        mark = time.perf_counter()
+
+        # 7. Execute! All confirmed signals of this loop are sized in one batch
+        self._execute_signals(signals)
+        timings['execute'] = (time.perf_counter() - mark) * 1000.0
+
+        self._persist_state()
+        timings['loop'] = (time.perf_counter() - started) * 1000.0
+        logger.debug("Loop done: positions %.1f ms, scan %.1f ms, execute %.1f ms",
+                     timings['positions'], timings['scan'], timings['execute'],
+                     extra={"stage": "loop", "latency_ms": timings['loop']})
+        self._publish_state(timings)
+        self._complete_scans(scans)
+
+    # --- Config Hot Reload (see ConfigWatcher) ---
+
+    def apply_config(self, snapshot: ConfigSnapshot) -> List[str]:
+        """
+        Applies the hot-reloadable part of a new settings snapshot to Config
+        and the components that captured values at construction. Other
+        changes are reported and wait for a restart. Returns applied keys.
+        """
+        changed = snapshot.changed(Config.snapshot())
+        deferred = sorted(key for key in changed if key not in HOT_RELOAD_KEYS)
+        if deferred:
+            logger.warning(f"settings.yaml: {', '.join(deferred)} changed; takes effect after restart")
+        applied = [key for key in changed if key in HOT_RELOAD_KEYS]
+        if not applied:
+            return applied
+
+        old_pairs = list(Config.TRADING_PAIRS)
+        Config.apply({key: snapshot.values[key] for key in applied})
+        if 'TRADING_PAIRS' in applied:
+            self._apply_pairs(old_pairs, list(Config.TRADING_PAIRS))
+
+        rm = self.risk_manager
+        if 'RISK_PER_TRADE_PERCENT' in applied:
+            rm.base_risk = Config.RISK_PER_TRADE_PERCENT  # Overrides a /risk change
+        rm.max_daily_loss_pct = Config.MAX_DAILY_LOSS_PERCENT
+        self.exposure.max_currency_exposure = Config.MAX_CURRENCY_EXPOSURE
+        self.exposure.max_correlation = Config.MAX_CORRELATION
+        pm = self.position_manager
+        pm.break_even_atr = Config.BREAK_EVEN_ATR
+        pm.break_even_lock_points = Config.BREAK_EVEN_LOCK_POINTS
+        pm.trail_start_atr = Config.TRAIL_START_ATR
+        pm.trail_distance_atr = Config.TRAIL_DISTANCE_ATR
+        pm.min_step_points = Config.MIN_STEP_POINTS
+        self.checklist.NEWS_STALE_AFTER = Config.NEWS_STALE_AFTER
+        self.checklist.NEWS_STALE_POLICY = Config.NEWS_STALE_POLICY
+        ConsoleUI.dashboard().refresh_interval = Config.UI_REFRESH_INTERVAL
+        logging.getLogger().setLevel(str(Config.LOG_LEVEL).upper())
+
+        logger.info(f"Config v{snapshot.version} applied: {', '.join(sorted(applied))}")
+        return applied
+
+    def _apply_pairs(self, old_pairs: List[str], pairs: List[str]):
+        """Keeps the warm state of unchanged pairs; only added pairs load history."""
+        added = [s for s in pairs if s not in old_pairs]
+        removed = [s for s in old_pairs if s not in pairs]
+        history = self._history_closes(added) if added else None
+        self.correlation = self.correlation.with_symbols(pairs, history)
+        self._correlation_version = -1
+        self.exposure.symbols = list(pairs)
+        self.exposure.correlation = self.correlation
+        for symbol in removed:
+            # Open positions stay managed; only new entries stop
+            self.paused.discard(symbol)
+            self._decisions.pop(symbol, None)
+            ConsoleUI.remove_row(symbol)
+        logger.info(f"Trading pairs updated. Added: {added or '-'}, removed: {removed or '-'}")
+
+    # --- UI Commands (see CommandQueue) ---
+
+    def _apply_commands(self) -> List[Tuple[Future, List[str]]]:
+        """Runs queued commands. Scans are returned and answered after the scan stage."""
+        scans = []
+        for command in self.commands.drain():
+            future = command.future
+            if not future.set_running_or_notify_cancel():
+                continue  # The requester gave up waiting
+            try:
+                if command.name == "scan":
+                    scans.append((future, self._resolve_symbols(command.args.get('symbol'))))
+                    continue
+                handler = getattr(self, f"_cmd_{command.name}", None)
+                if handler is None:
+                    raise ValueError(f"Unknown command: {command.name}")
+                future.set_result(handler(**command.args))
+            except Exception as e:
+                future.set_exception(e)
+        return scans
+
+    def _complete_scans(self, scans: List[Tuple[Future, List[str]]]):
+        for future, symbols in scans:
+            future.set_result({symbol: self._decisions.get(symbol) for symbol in symbols})
+
+    def _resolve_symbols(self, symbol: Optional[str]) -> List[str]:
+        if symbol is None:
+            return list(Config.TRADING_PAIRS)
+        symbol = symbol.upper()
+        if symbol not in Config.TRADING_PAIRS:
+            raise ValueError(f"Unknown symbol: {symbol}")
+        return [symbol]
+
+    def _cmd_pause(self, symbol: Optional[str] = None) -> List[str]:
+        symbols = self._resolve_symbols(symbol)
+        self.paused.update(symbols)
+        logger.info(f"Paused: {', '.join(symbols)}")
+        return sorted(self.paused)
+
+    def _cmd_resume(self, symbol: Optional[str] = None) -> List[str]:
+        symbols = self._resolve_symbols(symbol)
+        self.paused.difference_update(symbols)
+        logger.info(f"Resumed: {', '.join(symbols)}")
+        return sorted(self.paused)
+
+    def _cmd_risk(self, pct: Optional[float] = None) -> float:
+        """Sets the base risk per trade (until restart). Returns the active value."""
+        if pct is not None:
+            if not 0 < pct <= Config.MAX_RISK_PER_TRADE_PERCENT:
+                raise ValueError(f"Risk must be in (0, {Config.MAX_RISK_PER_TRADE_PERCENT}]%")
+            logger.info(f"Risk per trade changed: {self.risk_manager.base_risk}% -> {pct}%")
+            self.risk_manager.base_risk = pct
+        return self.risk_manager.base_risk
+
+    def _cmd_panic(self) -> BulkCloseReport:
+        """Flattens the account on the engine thread (no close races with the loop)."""
+        return self.panic_close()
+
+    def _report(self, symbol: str, bias: str, rsi: float, status: str, error: bool = False):
+        """Console row + last decision of the symbol for the published state."""
+        ConsoleUI.print_row(symbol, bias, rsi, status, error=error)
+        self._decisions[symbol] = SymbolState(symbol, bias, rsi, status, error, time.time())
+
+    def _publish_state(self, timings: Dict[str, float]):
+        """Builds the loop's immutable EngineState and swaps it in (atomic reference swap)."""
+        info = self.execution.account_info()
+        balance = info.balance if info else 10000.0
+        equity = info.equity if info else 10000.0
+        previous = self.state
+        broker_calls, broker_ms = PROFILE.loop() if PROFILE is not None else (0, 0.0)
+        self.state = EngineState(
+            mode=previous.mode,
+            started_at=self.start_time,
+            published_at=time.time(),
+            loop=previous.loop + 1,
+            balance=balance,
+            equity=equity,
+            daily_pnl=equity - self.risk_manager.daily_start_balance,
+            positions=tuple(PositionView.from_position(p) for p in self.execution.cached_positions()),
+            symbols=EngineState.freeze(self._decisions),
+            timings_ms=EngineState.freeze(timings),
+            broker_calls=broker_calls,
+            broker_ms=broker_ms,
+        )
+
+    def _restore_state(self) -> Dict[str, bool]:
+        """Loads the previous run's state in one query. Returns what was restored."""
+        restored: Dict[str, bool] = {}
+        if self.state_store is None:
+            return restored
+        started = time.perf_counter()
+        state = self.state_store.load()
+
+        # Dry-Run: the simulated ledger the risk state was measured against
+        if Config.DRY_RUN and 'simulator' in state:
+            self.execution.restore_state(state['simulator'])
+            restored['simulator'] = True
+        if 'risk' in state:
+            restored['risk'] = self.risk_manager.restore_state(state['risk'])
+        if 'position_manager' in state:
+            self.position_manager.restore_state(state['position_manager'])
+            restored['position_manager'] = True
+        cache = getattr(self.execution, 'position_cache', None)
+        if cache is not None and 'positions' in state:
+            cache.restore_state(state['positions'])
+            restored['positions'] = True
+        corr = state.get('correlation')
+        if corr and time.time() - corr.get('saved_at', 0) < Config.STATE_CORRELATION_MAX_AGE:
+            restored['correlation'] = self.correlation.restore_state(corr)
 
-    def _process_symbol(self, symbol: str, now: datetime):
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        names = ", ".join(k for k, v in restored.items() if v) or "nothing"
+        logger.info(f"Warm restart: restored {names} in {elapsed_ms:.1f} ms")
+        return restored
+
+    def _persist_state(self):
+        """Queues the current state; the store's writer thread does the I/O."""
+        if self.state_store is None:
+            return
+        self.state_store.put('risk', self.risk_manager.to_state())
+        self.state_store.put('position_manager', self.position_manager.to_state())
+        if Config.DRY_RUN:
+            self.state_store.put('simulator', self.execution.to_state())
+        cache = getattr(self.execution, 'position_cache', None)
+        if cache is not None:
+            self.state_store.put('positions', cache.to_state())
+        # The correlation buffer only changes once per bar
+        if self.correlation.version != self._correlation_version:
+            self._correlation_version = self.correlation.version
+            corr = self.correlation.to_state()
+            corr['saved_at'] = time.time()
+            self.state_store.put('correlation', corr)
+
+    def _seed_correlation(self):
+        """Warm-starts the correlation matrix so the rule is active from the first loop."""
+        closes = self._history_closes(Config.TRADING_PAIRS)
+        if not closes.empty:
+            self.correlation.seed(closes)
+
+    def _history_closes(self, symbols: List[str]) -> pd.DataFrame:
+        """Completed bar closes (one correlation window) per symbol, indexed by bar time."""
+        closes = {}
+        for symbol in symbols:
+            df = MarketData.get_candles_df(symbol, Config.TIMEFRAME, self.correlation.window + 2)
+            if not df.empty and 'time' in df.columns:
+                # Drop the bar still forming
+                closes[symbol] = df.iloc[:-1].set_index('time')['close']
+        return pd.DataFrame(closes)
+
+    def _feed_correlation(self, symbol: str, df):
+        if len(df) >= 2 and 'time' in df.columns:
+            bar = df.iloc[-2]  # Last completed bar
+            self.correlation.on_bar(symbol, bar['time'], bar['close'])
+            self._fed_symbols.add(symbol)
+
+    def _feed_unscanned(self):
+        """
+        Paused, in-flight and failed pairs still report their bar: a missing
+        close counts as a zero return and would dilute their correlations.
+        """
+        for symbol in Config.TRADING_PAIRS:
+            if symbol not in self._fed_symbols:
+                self._feed_correlation(symbol, MarketData.get_candles_df(symbol, Config.TIMEFRAME, 3))
+
+    def _manage_positions(self):
+        """Break-even / trailing stops over every open position, one tick per symbol."""
+        positions = self.execution.cached_positions()
+        if not positions:
+            return
+        quotes = {}
+        for symbol in {pair_name(p.symbol) for p in positions}:
+            tick = MarketData.get_tick_info(symbol)
+            if tick:
+                quotes[symbol] = (tick.bid, tick.ask)
+        self.position_manager.run(self.execution, positions, quotes)
+
+    def _process_symbol(self, symbol: str, now: datetime) -> Optional[Dict]:
+        """Scans one pair. Returns a signal (see _build_signal) if the checklist passed."""
         # 0. Skip if position exists (One trade per pair rule)
-        if self.execution.count_open_trades(symbol) > 0:
-            ConsoleUI.print_row(symbol, "---", 0.0, "Active Position (Skipped)", error=False)
+        if self.execution.cached_open_trades(symbol) > 0:
+            # Still needs the latest bar for the correlation matrix
+            self._feed_correlation(symbol, MarketData.get_candles_df(symbol, Config.TIMEFRAME, 3))
+            self._report(symbol, "---", 0.0, "Active Position (Skipped)")
+            return
+        if self.execution.has_pending_order(symbol):
+            self._report(symbol, "---", 0.0, "Order In Flight (Skipped)")
             return
 
         # 0. Check connection/availability specific to symbol?
@@ -126,6 +490,7 @@ class ScalpMasterBot:
         df = MarketData.get_candles_df(symbol, Config.TIMEFRAME, 500)
         if df.empty:
             return
+        self._feed_correlation(symbol, df)
 
         # 2. Add Indicators
         df = Indicators.add_all(df)
@@ -171,6 +536,9 @@ class ScalpMasterBot:
         # 4.2 Check News State
         is_news = self.news_loader.is_news_imminent(symbol)
 
+        # 4.3 Portfolio Exposure (O(1) lookup, evaluated once per loop)
+        exposure_ok, exposure_reason = self.exposure.check(symbol, bias)
+
         ctx = TradeContext(
             symbol=symbol,
             timestamp=now,
@@ -189,7 +557,11 @@ class ScalpMasterBot:
             trend_bias=bias,
             cooldown_remaining=0, 
             pullback_candles=0, # Not strictly used in Checklist v1
-            risk_status={'can_trade': can_trade_risk, 'reason': risk_reason}
+            risk_status={
+                'can_trade': can_trade_risk, 'reason': risk_reason,
+                'exposure_ok': exposure_ok, 'exposure_reason': exposure_reason,
+            },
+            news_age_seconds=self.news_loader.news_age(),
         )
 
         # 5. Run Checklist
@@ -202,30 +574,26 @@ class ScalpMasterBot:
              status_msg = "🔥 TRADE FOUND!"
         
         rsi_val = ctx.indicators.get('RSI_14', 0.0)
-        ConsoleUI.print_row(symbol, bias, rsi_val, status_msg)
+        self._report(symbol, bias, rsi_val, status_msg)
         
         if decision.can_trade:
-            # 7. Execute!
-            self._execute_signal(symbol, bias, ctx)
-        else:
-            # Silent fail usually, or debug log if in verbose
-            # logger.debug(f"{symbol} ignored: {decision.reasons}")
-            pass
+            return self._build_signal(symbol, bias, ctx, sym_info)
+        # Silent fail usually, or debug log if in verbose
+        # logger.debug(f"{symbol} ignored: {decision.reasons}")
+        return None
 
-    def _execute_signal(self, symbol: str, direction: str, ctx: TradeContext):
+    def _build_signal(self, symbol: str, direction: str, ctx: TradeContext, sym_info) -> Optional[Dict]:
+        """Stops/targets for a confirmed setup. Sizing is done per batch in _execute_signals."""
         # Double check Risk (Redundant but safe)
         can_trade, _ = self.risk_manager.can_trade(self._get_equity(), datetime.now().timestamp())
         if not can_trade:
-            return
+            return None
 
         # Calculate Size
         # Dynamic ATR-Based Stops
         # SL = 1.5 x ATR
         # TP = 3.0 x ATR
         atr = ctx.indicators.get('ATR_14', 0.0)
-        
-        mt_symbol = Config.get_mt5_symbol(symbol)
-        sym_info = MT5.symbol_info(mt_symbol)
         point = sym_info.point if sym_info else 0.00001
         
         # Safety: Floor ATR to avoid zero division or tiny stops
@@ -251,67 +619,140 @@ class ScalpMasterBot:
             tp = current_price - tp_dist
             mt5_dir = "SELL"
             
-        risk_pct = self.risk_manager.get_adaptive_risk(self._get_equity())
-        
-        volume = self.risk_manager.calculate_lot_size(
-            balance=self._get_balance(),
-            entry_price=current_price,
-            sl_price=sl,
-            risk_pct=risk_pct
+        return {
+            'symbol': symbol,
+            'direction': mt5_dir,
+            'entry': current_price,
+            'sl': sl,
+            'tp': tp,
+            'atr': atr,
+            'risk_pct': self.risk_manager.get_adaptive_risk(self._get_equity()),
+            'spec': LotSpec.from_symbol_info(sym_info),
+        }
+
+    def _execute_signals(self, signals: List[Dict]):
+        if not signals:
+            return
+        # One vectorized sizing call for every signal of the loop
+        volumes = self.risk_manager.calculate_lot_sizes(
+            self._get_balance(),
+            [s['entry'] for s in signals],
+            [s['sl'] for s in signals],
+            [s['risk_pct'] for s in signals],
+            [s['spec'] for s in signals],
         )
-        
-        if volume > 0:
-            logger.info(f"Signal Confirmed: {mt5_dir} {symbol}. Risk={risk_pct}%. Lots={volume}")
-            success = self.execution.execute_trade(symbol, mt5_dir, volume, sl, tp)
-            
-            if success:
-                # Notify Telegram
-                msg = (
-                    f"✅ <b>Order Placed</b>\n"
-                    f"Symbol: <code>{symbol}</code>\n"
-                    f"Side: <b>{mt5_dir}</b>\n"
-                    f"Lots: {volume}\n"
-                    f"Price: {current_price}\n"
-                    f"Risk: {risk_pct}%"
-                )
-                TelegramNotifier.send(msg)
+        for signal, volume in zip(signals, volumes):
+            if volume <= 0:
+                continue
+            volume = float(volume)
+            symbol, mt5_dir = signal['symbol'], signal['direction']
+            # Scans were gated against the loop's start: recheck against the signals sent since
+            admitted, reason = self.exposure.admit(symbol, mt5_dir)
+            if not admitted:
+                logger.info(f"Signal {mt5_dir} {symbol} dropped: {reason}")
+                continue
+            logger.info(f"Signal Confirmed: {mt5_dir} {symbol}. Risk={signal['risk_pct']}%. Lots={volume}")
+            # Trailing / break-even distances are measured in entry ATR
+            self.position_manager.set_atr(symbol, signal['atr'])
+            # Non-blocking: the broker round-trip runs on the order pipeline,
+            # the outcome is picked up by _reconcile_orders() on a later loop.
+            self.execution.submit_trade(
+                symbol, mt5_dir, volume, signal['sl'], signal['tp'],
+                meta={'risk_pct': signal['risk_pct'], 'signal_price': signal['entry']}
+            )
+
+    def _reconcile_orders(self):
+        """
+        Consumes order results confirmed by the execution pipeline.
+        Runs on the engine thread only.
+        """
+        for result in self.execution.drain_order_results():
+            req = result.request
+            if not result.success:
+                logger.warning(f"Order for {req.symbol} not filled: {result.comment or result.retcode}")
+                continue
+
+            # Notify Telegram
+            msg = (
+                f"✅ <b>Order Placed</b>\n"
+                f"Symbol: <code>{req.symbol}</code>\n"
+                f"Side: <b>{req.direction}</b>\n"
+                f"Lots: {req.volume}\n"
+                f"Price: {result.fill_price or result.price or req.meta.get('signal_price')}\n"
+                f"Risk: {req.meta.get('risk_pct')}%"
+            )
+            TelegramNotifier.send(msg)
+
+    def _on_trade_closed(self, trade: ClosedTrade):
+        """Close event from the execution engine (engine thread)."""
+        self.risk_manager.update_metrics(trade.profit)
+        self.adaptor.update_thresholds(trade.profit)
+        if not self.execution.cached_open_trades(trade.symbol):
+            self.position_manager.forget(trade.symbol)
+
+        icon = "🟢" if trade.profit >= 0 else "🔴"
+        msg = (
+            f"{icon} <b>Trade Closed</b>\n"
+            f"Symbol: <code>{trade.symbol}</code>\n"
+            f"Reason: {trade.reason}\n"
+            f"Lots: {trade.volume}\n"
+            f"Price: {trade.close_price}\n"
+            f"PnL: {trade.profit:.2f}"
+        )
+        TelegramNotifier.send(msg)
 
     def _get_equity(self):
-        info = MT5.account_info()
+        info = self.execution.account_info()
         return info.equity if info else 10000.0
 
     def _get_balance(self):
-        info = MT5.account_info()
+        info = self.execution.account_info()
         return info.balance if info else 10000.0
 
     def get_state_summary(self) -> Dict:
         """
         Returns a dictionary summary of the bot's current state for UI/Telegram.
+        Reads the last published EngineState only: safe from any thread, no broker calls.
         """
-        equity = self._get_equity()
-        balance = self._get_balance()
-        daily_pnl = equity - self.risk_manager.initial_balance # Approximate
-        
-        uptime_seconds = int(time.time() - self.start_time) if self.is_running else 0
+        state = self.state
+        uptime_seconds = int(time.time() - state.started_at) if self.is_running else 0
         hours = uptime_seconds // 3600
         minutes = (uptime_seconds % 3600) // 60
         
         return {
-            "mode": "DRY-RUN" if Config.DRY_RUN else "LIVE",
+            "mode": state.mode,
             "is_running": self.is_running,
             "uptime": f"{hours}h {minutes}m",
-            "balance": balance,
-            "equity": equity,
-            "daily_pnl": daily_pnl,
-            "open_trades": self.execution.count_open_trades(), 
-            "pairs": len(Config.TRADING_PAIRS)
+            "balance": state.balance,
+            "equity": state.equity,
+            "daily_pnl": state.daily_pnl,
+            "open_trades": state.open_trades,
+            "pairs": len(Config.TRADING_PAIRS),
+            "loop_ms": state.timings_ms.get('loop', 0.0),
+            "broker_calls": state.broker_calls,
+            "broker_ms": state.broker_ms,
+            "state_age": state.age,
         }
 
-    def panic_close(self):
+    def panic_close(self) -> BulkCloseReport:
         """
         Emergency method to close all positions.
+        Engine thread only: UIs queue the "panic" command instead.
         """
         logger.warning("PANIC CLOSE TRIGGERED!")
-        TelegramNotifier.send("🚨 <b>PANIC CLOSE TRIGGERED!</b> Closing all positions...")
-        self.execution.close_all_trades()
+        TelegramNotifier.send("🚨 <b>PANIC CLOSE TRIGGERED!</b> Closing all positions...", priority=HIGH)
+        report = self.execution.close_all_trades()
+
+        status = "✅ Account FLAT" if report.is_flat else f"⚠️ {report.remaining} position(s) STILL OPEN"
+        msg = (
+            f"🚨 <b>PANIC CLOSE COMPLETE</b>\n"
+            f"{status}\n"
+            f"Closed: {len(report.closed)}/{report.requested}\n"
+            f"Time to flat: {report.elapsed_ms:.0f} ms"
+        )
+        if report.failed:
+            failures = ", ".join(f"{t}:{r}" for t, r in list(report.failed.items())[:10])
+            msg += f"\nFailed: <code>{failures}</code>"
+        TelegramNotifier.send(msg, priority=HIGH)
+        return report
 
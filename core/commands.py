@@ -0,0 +1,52 @@
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class EngineCommand:
+    name: str
+    args: Dict[str, Any] = field(default_factory=dict)
+    future: Future = field(default_factory=Future)
+
+class CommandQueue:
+    """
+    Thread-safe inbox from the UI threads (Telegram) to the strategy loop.
+
+    submit() never touches engine state: it enqueues and returns a Future
+    that the engine resolves when it drains the queue at a stage boundary.
+    wait() replaces the loop's sleep so a command wakes the engine at once.
+    """
+    def __init__(self):
+        self._queue: "queue.SimpleQueue[EngineCommand]" = queue.SimpleQueue()
+        self._wakeup = threading.Event()
+
+    def submit(self, name: str, **args) -> Future:
+        command = EngineCommand(name, args)
+        self._queue.put(command)
+        self._wakeup.set()
+        return command.future
+
+    def drain(self, limit: int = 10) -> List[EngineCommand]:
+        """Up to `limit` pending commands (bounds the time spent per boundary)."""
+        self._wakeup.clear()
+        commands = []
+        while len(commands) < limit:
+            try:
+                commands.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if not self._queue.empty():
+            self._wakeup.set()
+        return commands
+
+    def wait(self, timeout: Optional[float]) -> bool:
+        """Sleeps up to timeout; returns True early if a command arrived."""
+        return self._wakeup.wait(timeout)
+
+    def __len__(self) -> int:
+        return self._queue.qsize()
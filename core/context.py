@@ -30,6 +30,9 @@ class TradeContext:
     # Risk State
     risk_status: Dict[str, Any]  # e.g. {'can_trade': True, 'daily_pnl': 500.0}
 
+    # Data Freshness
+    news_age_seconds: float = 0.0  # Age of the news calendar behind is_news_event
+
     # Helper to check validity (though data structure serves as data holder mainly)
     def __repr__(self):
         return (f"TradeContext({self.symbol} @ {self.timestamp}, "
@@ -0,0 +1,218 @@
+import logging
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from config.config import Config
+
+logger = logging.getLogger(__name__)
+
+class RollingCorrelation:
+    """
+    Rolling correlation of bar log-returns across a fixed set of symbols.
+
+    Keeps running sums (sum of returns and sum of outer products) over a
+    ring buffer of the last `window` return rows, so each new bar costs
+    O(n^2) instead of recomputing from the full history. The matrix is
+    derived lazily on the first query after a bar, and every lookup is
+    O(1) afterwards. Running sums are rebuilt from the buffer once per
+    window to cancel floating-point drift.
+
+    Bars arrive per symbol (on_bar); a row is committed once every symbol
+    has reported the bar, or when a newer bar starts. Symbols that did not
+    report contribute a zero return for that row.
+    """
+    def __init__(self, symbols: Iterable[str], window: int = None, min_periods: int = None):
+        self.symbols = list(symbols)
+        self.index: Dict[str, int] = {s: i for i, s in enumerate(self.symbols)}
+        self.window = Config.CORRELATION_WINDOW if window is None else window
+        self.min_periods = Config.CORRELATION_MIN_PERIODS if min_periods is None else min_periods
+
+        n = len(self.symbols)
+        self._buf = np.zeros((self.window, n))
+        self._pos = 0
+        self.count = 0
+        self._pushes = 0
+        self._sum = np.zeros(n)
+        self._cross = np.zeros((n, n))
+        self._corr: Optional[np.ndarray] = None
+
+        self._last_close = np.full(n, np.nan)
+        self._committed_time = None
+        self._bar_time = None
+        self._bar_close: Dict[str, float] = {}
+
+    @property
+    def ready(self) -> bool:
+        return self.count >= self.min_periods
+
+    @property
+    def version(self) -> int:
+        """Increments with every committed row (cheap change detection)."""
+        return self._pushes
+
+    # --- Feeding ---
+
+    def on_bar(self, symbol: str, bar_time, close: float):
+        """Reports the close of a completed bar for one symbol."""
+        if symbol not in self.index or not close or close <= 0:
+            return
+        if self._committed_time is not None and bar_time <= self._committed_time:
+            return
+        if self._bar_time is not None and bar_time > self._bar_time:
+            self._commit()
+        if self._bar_time is None or bar_time >= self._bar_time:
+            self._bar_time = bar_time
+            self._bar_close[symbol] = close
+            if len(self._bar_close) == len(self.symbols):
+                self._commit()
+
+    def seed(self, closes: pd.DataFrame):
+        """
+        Warm start from history: a DataFrame of closes indexed by bar time,
+        one column per symbol. Only the last `window` returns are kept.
+        """
+        frame = closes.reindex(columns=self.symbols).sort_index().ffill()
+        if len(frame) < 2:
+            return
+        returns = np.log(frame / frame.shift(1)).iloc[1:].to_numpy()
+        for row in np.nan_to_num(returns[-self.window:], nan=0.0, posinf=0.0, neginf=0.0):
+            self.push(row)
+        self._last_close = frame.iloc[-1].to_numpy(dtype=float)
+        self._committed_time = frame.index[-1]
+        self._bar_time = None
+        self._bar_close.clear()
+
+    def push(self, returns: np.ndarray):
+        """Adds one row of returns (ordered as self.symbols)."""
+        if self.count == self.window:
+            old = self._buf[self._pos]
+            self._sum -= old
+            self._cross -= np.outer(old, old)
+        else:
+            self.count += 1
+        self._buf[self._pos] = returns
+        self._sum += returns
+        self._cross += np.outer(returns, returns)
+        self._pos = (self._pos + 1) % self.window
+        self._pushes += 1
+        if self._pushes % self.window == 0:
+            self._rebuild()
+        self._corr = None
+
+    def _commit(self):
+        closes = self._last_close.copy()
+        for symbol, close in self._bar_close.items():
+            closes[self.index[symbol]] = close
+        had_history = np.isfinite(self._last_close).any()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            returns = np.nan_to_num(np.log(closes / self._last_close), nan=0.0, posinf=0.0, neginf=0.0)
+        self._last_close = closes
+        self._committed_time = self._bar_time
+        self._bar_time = None
+        self._bar_close = {}
+        if had_history:
+            self.push(returns)
+
+    def _rebuild(self):
+        rows = self._buf[:self.count]
+        self._sum = rows.sum(axis=0)
+        self._cross = rows.T @ rows
+
+    # --- Persistence ---
+
+    def _rows(self) -> np.ndarray:
+        """Buffered return rows, oldest first."""
+        if self.count < self.window:
+            return self._buf[:self.count]
+        return np.roll(self._buf, -self._pos, axis=0)
+
+    def to_state(self) -> Dict:
+        """Buffered return rows (oldest first) and last closes, JSON-serializable."""
+        committed = self._committed_time
+        return {
+            'symbols': self.symbols,
+            'rows': self._rows().tolist(),
+            'last_close': [None if np.isnan(c) else float(c) for c in self._last_close],
+            'committed_time': pd.Timestamp(committed).timestamp() if committed is not None else None,
+        }
+
+    def restore_state(self, state: Dict) -> bool:
+        """Rebuilds the buffer and running sums. Refused if the symbol set changed."""
+        if state.get('symbols') != self.symbols:
+            return False
+        rows = np.asarray(state.get('rows') or [], dtype=float).reshape(-1, len(self.symbols))
+        for row in rows[-self.window:]:
+            self.push(row)
+        self._last_close = np.array(
+            [np.nan if c is None else c for c in state.get('last_close', [])] or [np.nan] * len(self.symbols),
+            dtype=float,
+        )
+        committed = state.get('committed_time')
+        self._committed_time = pd.Timestamp(committed, unit='s') if committed is not None else None
+        return True
+
+    def with_symbols(self, symbols: Iterable[str], history: Optional[pd.DataFrame] = None) -> "RollingCorrelation":
+        """
+        Copy for a new symbol set (config reload). Buffered returns of kept
+        symbols carry over; added symbols are back-filled from `history`
+        (closes indexed by bar time, like seed()), newest return aligned
+        with the last committed bar. Added symbols without history
+        contribute zero returns until their bars arrive.
+        """
+        resized = RollingCorrelation(symbols, self.window, self.min_periods)
+        rows = self._rows()
+        count = len(rows)
+        new_rows = np.zeros((count, len(resized.symbols)))
+        last_close = np.full(len(resized.symbols), np.nan)
+        for j, symbol in enumerate(resized.symbols):
+            if symbol in self.index:
+                new_rows[:, j] = rows[:, self.index[symbol]]
+                last_close[j] = self._last_close[self.index[symbol]]
+
+        if history is not None and not history.empty:
+            frame = history.sort_index().ffill()
+            if self._committed_time is not None:
+                frame = frame[frame.index <= self._committed_time]
+            for symbol in frame.columns:
+                j = resized.index.get(symbol)
+                if j is None or symbol in self.index:
+                    continue
+                closes = frame[symbol].dropna()
+                if closes.empty:
+                    continue
+                last_close[j] = closes.iloc[-1]
+                returns = np.log(closes / closes.shift(1)).iloc[1:].to_numpy()[-count:] if count else []
+                if len(returns):
+                    new_rows[count - len(returns):, j] = np.nan_to_num(returns, nan=0.0, posinf=0.0, neginf=0.0)
+
+        for row in new_rows:
+            resized.push(row)
+        resized._last_close = last_close
+        resized._committed_time = self._committed_time
+        return resized
+
+    # --- Queries ---
+
+    def matrix(self) -> np.ndarray:
+        if self._corr is None:
+            n = len(self.symbols)
+            if self.count < 2:
+                self._corr = np.eye(n)
+            else:
+                mean = self._sum / self.count
+                cov = self._cross / self.count - np.outer(mean, mean)
+                std = np.sqrt(np.clip(np.diag(cov), 0.0, None))
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    corr = cov / np.outer(std, std)
+                corr = np.clip(np.nan_to_num(corr, nan=0.0), -1.0, 1.0)
+                np.fill_diagonal(corr, 1.0)
+                self._corr = corr
+        return self._corr
+
+    def correlation(self, a: str, b: str) -> Optional[float]:
+        """Correlation between two symbols, or None until min_periods bars are in."""
+        if not self.ready or a not in self.index or b not in self.index:
+            return None
+        return float(self.matrix()[self.index[a], self.index[b]])
@@ -0,0 +1,74 @@
+import time
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional, Tuple
+
+@dataclass(frozen=True)
+class SymbolState:
+    """Last scan decision for one pair (what the console row showed)."""
+    symbol: str
+    bias: str
+    rsi: float
+    status: str
+    error: bool = False
+    updated_at: float = 0.0
+
+@dataclass(frozen=True)
+class PositionView:
+    ticket: int
+    symbol: str
+    direction: str  # "BUY" / "SELL"
+    volume: float
+    price_open: float
+    sl: float
+    tp: float
+    profit: float = 0.0
+
+    @classmethod
+    def from_position(cls, p) -> "PositionView":
+        """Copies an MT5 TradePosition (or SimPosition)."""
+        return cls(
+            ticket=p.ticket,
+            symbol=p.symbol,
+            direction="BUY" if p.type == 0 else "SELL",
+            volume=p.volume,
+            price_open=p.price_open,
+            sl=p.sl,
+            tp=p.tp,
+            profit=getattr(p, 'profit', 0.0),
+        )
+
+@dataclass(frozen=True)
+class EngineState:
+    """
+    Immutable snapshot of the engine, published once per loop.
+
+    The strategy thread builds a new instance at the end of every loop and
+    swaps the reference; readers (Telegram, UI) only dereference it, so
+    they never call the broker and never take a lock.
+    """
+    mode: str
+    started_at: float
+    published_at: float = 0.0
+    loop: int = 0
+    balance: float = 0.0
+    equity: float = 0.0
+    daily_pnl: float = 0.0
+    positions: Tuple[PositionView, ...] = ()
+    symbols: Mapping[str, SymbolState] = field(default_factory=lambda: MappingProxyType({}))
+    timings_ms: Mapping[str, float] = field(default_factory=lambda: MappingProxyType({}))
+    broker_calls: int = 0     # Terminal calls during the last loop (all threads)
+    broker_ms: float = 0.0    # Time spent in those calls
+
+    @property
+    def open_trades(self) -> int:
+        return len(self.positions)
+
+    @property
+    def age(self) -> Optional[float]:
+        """Seconds since publication, None before the first loop."""
+        return time.time() - self.published_at if self.published_at else None
+
+    @staticmethod
+    def freeze(mapping: Dict) -> Mapping:
+        return MappingProxyType(dict(mapping))
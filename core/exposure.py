@@ -0,0 +1,99 @@
+import logging
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from config.config import Config
+from core.correlation import RollingCorrelation
+from modules.data.mt5_loader import MT5
+from modules.execution.position_cache import pair_name
+
+logger = logging.getLogger(__name__)
+
+_SIGNS = (("LONG", 1), ("SHORT", -1))
+
+def split_pair(symbol: str) -> Tuple[str, str]:
+    """"EURUSD" -> ("EUR", "USD")."""
+    return symbol[:3], symbol[3:6]
+
+class PortfolioExposure:
+    """
+    Portfolio-level entry gate.
+
+    Long EURUSD + long GBPUSD + short USDCHF is one large USD short. Two
+    rules are applied to every candidate (symbol, bias):
+      - net currency exposure, counted in positions (BUY EURUSD = +1 EUR,
+        -1 USD), must stay within max_currency_exposure;
+      - no open position may be correlated (in the trade direction) at or
+        above max_correlation.
+
+    update() evaluates every pair x direction once per loop against the
+    open positions and the orders still in flight; check() is then a dict
+    lookup. admit() re-checks a confirmed signal against everything held
+    or admitted so far, so two signals of one loop cannot both pass.
+    """
+    def __init__(self, symbols: Iterable[str], correlation: Optional[RollingCorrelation] = None,
+                 max_currency_exposure: int = None, max_correlation: float = None):
+        self.symbols = list(symbols)
+        self.correlation = correlation
+        self.max_currency_exposure = (
+            Config.MAX_CURRENCY_EXPOSURE if max_currency_exposure is None else max_currency_exposure
+        )
+        self.max_correlation = Config.MAX_CORRELATION if max_correlation is None else max_correlation
+        self.net: Counter = Counter()
+        self._held: List[Tuple[str, int]] = []
+        self._blocked: Dict[Tuple[str, str], str] = {}
+
+    def update(self, positions: Sequence, pending: Iterable[Tuple[str, str]] = ()):
+        """positions: open positions; pending: (symbol, "BUY"/"SELL") orders not filled yet."""
+        held: List[Tuple[str, int]] = []
+        net: Counter = Counter()
+        legs = [(pair_name(p.symbol), 1 if p.type == MT5.ORDER_TYPE_BUY else -1) for p in positions]
+        legs += [(pair_name(symbol), 1 if direction == "BUY" else -1) for symbol, direction in pending]
+        for symbol, sign in legs:
+            base, quote = split_pair(symbol)
+            net[base] += sign
+            net[quote] -= sign
+            held.append((symbol, sign))
+
+        blocked = {}
+        for symbol in self.symbols:
+            for bias, sign in _SIGNS:
+                reason = self._evaluate(symbol, sign, net, held)
+                if reason:
+                    blocked[(symbol, bias)] = reason
+        self.net, self._held, self._blocked = net, held, blocked
+
+    def check(self, symbol: str, bias: str) -> Tuple[bool, str]:
+        reason = self._blocked.get((symbol, bias))
+        return (False, reason) if reason else (True, "OK")
+
+    def admit(self, symbol: str, direction: str) -> Tuple[bool, str]:
+        """
+        Final gate for an order about to be sent ("BUY"/"SELL"). On success
+        the order counts as held for the rest of the loop.
+        """
+        sign = 1 if direction == "BUY" else -1
+        reason = self._evaluate(symbol, sign, self.net, self._held)
+        if reason:
+            return False, reason
+        base, quote = split_pair(symbol)
+        self.net[base] += sign
+        self.net[quote] -= sign
+        self._held.append((symbol, sign))
+        return True, "OK"
+
+    def _evaluate(self, symbol: str, sign: int, net: Counter, held: List[Tuple[str, int]]) -> str:
+        base, quote = split_pair(symbol)
+        for ccy, delta in ((base, sign), (quote, -sign)):
+            after = net[ccy] + delta
+            if abs(after) > self.max_currency_exposure:
+                return f"CURRENCY_EXPOSURE: {ccy} {after:+d}"
+
+        if self.correlation is not None:
+            for other, other_sign in held:
+                if other == symbol:
+                    continue
+                corr = self.correlation.correlation(symbol, other)
+                if corr is not None and corr * sign * other_sign >= self.max_correlation:
+                    return f"CORRELATED_WITH: {other} ({corr:+.2f})"
+        return ""
@@ -0,0 +1,80 @@
+import json
+import logging
+import os
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import List, Optional
+
+from config.config import Config
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Optional structured fields, passed with extra={...}
+STRUCTURED_FIELDS = ("symbol", "stage", "latency_ms")
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message + structured fields."""
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "thread": record.threadName,
+        }
+        for name in STRUCTURED_FIELDS:
+            value = getattr(record, name, None)
+            if value is not None:
+                entry[name] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+class _EnqueueHandler(QueueHandler):
+    """
+    QueueHandler that enqueues the record untouched.
+
+    The stdlib version formats on the calling thread and merges msg/args,
+    which costs the hot thread the formatting and loses the message
+    template that TelegramLogHandler fingerprints on.
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+def setup_logging(level: str = None, fmt: str = None, file_path: Optional[str] = None,
+                  extra_handlers: List[logging.Handler] = (), logger: logging.Logger = None,
+                  stream=None) -> QueueListener:
+    """
+    Routes `logger` (default: root) through a queue: callers only enqueue,
+    a QueueListener thread formats and writes to stdout, the size-rotated
+    file and any extra handlers (e.g. Telegram). Returns the started
+    listener; stop() it on shutdown to flush.
+    """
+    level = level or Config.LOG_LEVEL
+    fmt = fmt or Config.LOG_FORMAT
+    file_path = Config.LOG_FILE if file_path is None else file_path
+    formatter = JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT)
+
+    console = logging.StreamHandler(stream or sys.stdout)
+    console.setFormatter(formatter)
+    handlers = [console]
+    if file_path:
+        os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+        rotating = RotatingFileHandler(
+            file_path, maxBytes=Config.LOG_MAX_BYTES, backupCount=Config.LOG_BACKUP_COUNT, encoding="utf-8"
+        )
+        rotating.setFormatter(formatter)
+        handlers.append(rotating)
+    handlers.extend(extra_handlers)
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    target = logger or logging.getLogger()
+    for handler in list(target.handlers):
+        target.removeHandler(handler)
+    target.addHandler(_EnqueueHandler(log_queue))
+    target.setLevel(level)
+
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
@@ -1,10 +1,86 @@
 import logging
 from collections import deque
+from dataclasses import dataclass
 import time
+from typing import Dict, Union
+
+import numpy as np
+
 from config.config import Config
 
 logger = logging.getLogger(__name__)
 
+ArrayLike = Union[float, np.ndarray, list]
+
+@dataclass(frozen=True)
+class LotSpec:
+    """
+    Broker contract metadata used for sizing. The defaults reproduce the
+    historical fixed 100k contract with 0.01 lot rounding and no cap.
+    """
+    contract_size: float = 100000.0
+    tick_size: float = 0.0     # 0 = value per price unit is contract_size
+    tick_value: float = 0.0    # Account-currency value of one tick for 1 lot
+    volume_min: float = 0.01
+    volume_max: float = float("inf")
+    volume_step: float = 0.01
+
+    @classmethod
+    def from_symbol_info(cls, info) -> "LotSpec":
+        """Builds a spec from MT5.symbol_info(); falls back to defaults for missing fields."""
+        if info is None:
+            return cls()
+        def num(name, default):
+            value = getattr(info, name, default)
+            return float(value) if isinstance(value, (int, float)) and value > 0 else default
+        return cls(
+            contract_size=num("trade_contract_size", 100000.0),
+            tick_size=num("trade_tick_size", 0.0),
+            tick_value=num("trade_tick_value", 0.0),
+            volume_min=num("volume_min", 0.01),
+            volume_max=num("volume_max", float("inf")),
+            volume_step=num("volume_step", 0.01),
+        )
+
+def size_positions(balances: ArrayLike, entries: ArrayLike, stops: ArrayLike, risk_pcts: ArrayLike,
+                   contract_size: ArrayLike = 100000.0, tick_size: ArrayLike = 0.0,
+                   tick_value: ArrayLike = 0.0, volume_min: ArrayLike = 0.01,
+                   volume_max: ArrayLike = float("inf"), volume_step: ArrayLike = 0.01) -> np.ndarray:
+    """
+    Vectorized lot sizing. Every argument broadcasts (scalars or arrays of
+    one shape), so backtests, optimizers and the live multi-symbol batch
+    size N trades in one call.
+
+    lots = balance * risk% / (|entry - stop| * value per price unit per lot),
+    rounded to volume_step and clamped to [volume_min, volume_max].
+    Rows with a non-positive balance/entry/stop or a zero stop distance
+    get 0 lots.
+    """
+    balances, entries, stops, risk_pcts = (np.asarray(a, dtype=float) for a in (balances, entries, stops, risk_pcts))
+    contract_size, tick_size, tick_value, volume_min, volume_max, volume_step = (
+        np.asarray(a, dtype=float)
+        for a in (contract_size, tick_size, tick_value, volume_min, volume_max, volume_step)
+    )
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Tick value is already in account currency (handles JPY/cross quotes)
+        per_price_unit = np.where((tick_size > 0) & (tick_value > 0), tick_value / tick_size, contract_size)
+        risk_amount = balances * (risk_pcts / 100.0)
+        sl_distance = np.abs(entries - stops)
+        raw = risk_amount / (per_price_unit * sl_distance)
+
+        steps = np.round(raw / volume_step)
+        # Express the result with the step's decimals (0.01 -> 2) to avoid 0.30000000000000004
+        scale = 10.0 ** np.clip(np.ceil(-np.log10(volume_step)), 0, 8)
+        lots = np.round(steps * volume_step * scale) / scale
+        lots = np.minimum(np.maximum(lots, volume_min), volume_max)
+
+    valid = (balances > 0) & (entries > 0) & (stops > 0) & (sl_distance > 0) & np.isfinite(raw)
+    return np.where(valid, lots, 0.0)
+
+def _utc_day() -> str:
+    return time.strftime("%Y-%m-%d", time.gmtime())
+
 class RiskManager:
     def __init__(self):
         # State
@@ -15,6 +91,7 @@ class RiskManager:
         self.trades_today = 0
         self.cooldown_until = 0  # Timestamp
         self.is_hard_stopped = False
+        self.snapshot_day = ""  # UTC date (YYYY-MM-DD) of the last snapshot_account
         
         # Hourly Limit Tracking
         self.trade_timestamps = deque() 
@@ -33,8 +110,49 @@ class RiskManager:
         self.trades_today = 0
         self.is_hard_stopped = False
         self.trade_timestamps.clear()
+        self.snapshot_day = _utc_day()
         logger.info(f"Daily Risk Snapshot: Start Balance = {balance}")
 
+    def needs_snapshot(self) -> bool:
+        """True if no snapshot was taken yet today (UTC), e.g. after midnight rollover."""
+        return self.snapshot_day != _utc_day()
+
+    def to_state(self) -> Dict:
+        """JSON-serializable state for the StateStore."""
+        return {
+            'snapshot_day': self.snapshot_day,
+            'daily_start_balance': self.daily_start_balance,
+            'current_daily_loss': self.current_daily_loss,
+            'loss_streak': self.loss_streak,
+            'win_streak': self.win_streak,
+            'trades_today': self.trades_today,
+            'cooldown_until': self.cooldown_until,
+            'is_hard_stopped': self.is_hard_stopped,
+            'trade_timestamps': list(self.trade_timestamps),
+        }
+
+    def restore_state(self, state: Dict) -> bool:
+        """
+        Warm restart. Daily limits are only restored for the same UTC day,
+        so a crash-restart can no longer reset the daily loss limit.
+        Streaks carry over across days. Returns True if the day was restored.
+        """
+        self.loss_streak = state.get('loss_streak', 0)
+        self.win_streak = state.get('win_streak', 0)
+        self.cooldown_until = state.get('cooldown_until', 0)
+        if state.get('snapshot_day') != _utc_day():
+            return False
+
+        self.snapshot_day = state['snapshot_day']
+        self.daily_start_balance = state.get('daily_start_balance', 0.0)
+        self.current_daily_loss = state.get('current_daily_loss', 0.0)
+        self.trades_today = state.get('trades_today', 0)
+        self.is_hard_stopped = state.get('is_hard_stopped', False)
+        self.trade_timestamps = deque(state.get('trade_timestamps', ()))
+        logger.info(f"Risk state restored: Start Balance = {self.daily_start_balance}, "
+                    f"Hard Stop = {self.is_hard_stopped}, Trades Today = {self.trades_today}")
+        return True
+
     def update_metrics(self, profit: float):
         """
         Called after a trade closes. Updates streaks and daily PnL.
@@ -104,20 +222,25 @@ class RiskManager:
         
         return risk
 
-    def calculate_lot_size(self, balance: float, entry_price: float, sl_price: float, risk_pct: float) -> float:
+    def calculate_lot_size(self, balance: float, entry_price: float, sl_price: float, risk_pct: float,
+                           spec: LotSpec = None) -> float:
         """
         Calculates lot size based on risk percentage and stop loss distance.
-        Assumes standard Forex lot (100,000 units).
+        Without a spec assumes a standard Forex lot (100,000 units).
+        Single-trade view of size_positions(), so both paths agree exactly.
         """
-        if balance <= 0 or entry_price <= 0 or sl_price <= 0:
-            return 0.0
+        spec = spec or LotSpec()
+        return float(size_positions(
+            balance, entry_price, sl_price, risk_pct,
+            spec.contract_size, spec.tick_size, spec.tick_value,
+            spec.volume_min, spec.volume_max, spec.volume_step,
+        ))
 
-        risk_amount = balance * (risk_pct / 100.0)
-        sl_distance = abs(entry_price - sl_price)
-        
-        if sl_distance == 0:
-            return 0.0
-        
-        raw_lots = risk_amount / (100000 * sl_distance)
-        lots = max(0.01, round(raw_lots, 2))
-        return lots
+    def calculate_lot_sizes(self, balances: ArrayLike, entries: ArrayLike, stops: ArrayLike,
+                            risk_pcts: ArrayLike, specs) -> np.ndarray:
+        """Batch sizing: one LotSpec per row."""
+        return size_positions(
+            balances, entries, stops, risk_pcts,
+            [s.contract_size for s in specs], [s.tick_size for s in specs], [s.tick_value for s in specs],
+            [s.volume_min for s in specs], [s.volume_max for s in specs], [s.volume_step for s in specs],
+        )
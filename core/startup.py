@@ -0,0 +1,35 @@
+import logging
+import time
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class StartupTimer:
+    """
+    Wall-clock cost of each startup phase, up to the first completed scan.
+    mark() closes the phase that started at the previous mark; report()
+    logs the table once.
+    """
+    def __init__(self, started: Optional[float] = None):
+        self.started = time.perf_counter() if started is None else started
+        self._last = self.started
+        self.phases: List[Tuple[str, float]] = []
+        self.reported = False
+
+    def mark(self, phase: str):
+        now = time.perf_counter()
+        self.phases.append((phase, (now - self._last) * 1000.0))
+        self._last = now
+
+    @property
+    def total_ms(self) -> float:
+        return (self._last - self.started) * 1000.0
+
+    def report(self) -> str:
+        """Logs the phase table (first call only) and returns it."""
+        lines = [f"   {name:<16} {ms:8.1f} ms" for name, ms in self.phases]
+        text = "\n".join(["Startup time to first scan:", *lines, f"   {'TOTAL':<16} {self.total_ms:8.1f} ms"])
+        if not self.reported:
+            self.reported = True
+            logger.info(text)
+        return text
@@ -1,28 +1,29 @@
+import time
+_STARTED = time.perf_counter()
+
 import logging
 import threading
 import sys
-import time
-
-# Configure Logging first
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout)
-    ]
-)
 
 from config.config import Config
-from core.bot import ScalpMasterBot
-from modules.ui.telegram.bot import TelegramBot
+from core.startup import StartupTimer
+startup = StartupTimer(_STARTED)
+startup.mark("config")
+
+from core.logging_setup import setup_logging
 from modules.ui.telegram.notifier import TelegramLogHandler
 
-# Add Telegram Handler to Root Logger
+# Configure Logging first: the loop only enqueues records,
+# a listener thread writes stdout / rotating file / Telegram
 tg_handler = TelegramLogHandler()
 tg_handler.setLevel(logging.ERROR)
 formatter = logging.Formatter('%(name)s: %(message)s')
 tg_handler.setFormatter(formatter)
-logging.getLogger().addHandler(tg_handler)
+log_listener = setup_logging(extra_handlers=[tg_handler])
+
+from core.bot import ScalpMasterBot
+# python-telegram-bot is only imported when the Telegram UI is enabled (see main)
+startup.mark("imports")
 
 logger = logging.getLogger("Main")
 
@@ -39,15 +40,18 @@ def main():
         return
 
     # 2. Initialize Components
-    bot = ScalpMasterBot()
-    telegram = TelegramBot(engine=bot)
+    bot = ScalpMasterBot(startup=startup)
+    startup.mark("engine_init")
 
     # 3. Start Telegram (Daemon Thread)
     # Critical Audit Fix: Prevent blocking main loop
     if Config.TELEGRAM_TOKEN:
         logger.info("Starting Telegram Bot (Background Service)...")
+        from modules.ui.telegram.bot import TelegramBot
+        telegram = TelegramBot(engine=bot)
         ui_thread = threading.Thread(target=telegram.run, daemon=True)
         ui_thread.start()
+        startup.mark("telegram")
     else:
         logger.warning("Telegram Token missing. UI disabled.")
 
@@ -65,4 +69,8 @@ def main():
     logger.info("System Shutdown Complete.")
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    finally:
+        # Drains the log queue (the listener thread is a daemon)
+        log_listener.stop()
@@ -0,0 +1,610 @@
+import functools
+import logging
+import threading
+import time
+import zlib
+from collections import namedtuple
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Result types: the MetaTrader5 package returns named tuples with these fields
+Tick = namedtuple("Tick", "time bid ask last volume time_msc flags volume_real")
+SymbolInfo = namedtuple(
+    "SymbolInfo",
+    "name visible select spread point digits filling_mode trade_contract_size trade_tick_size "
+    "trade_tick_value volume_min volume_max volume_step bid ask",
+)
+AccountInfo = namedtuple("AccountInfo", "login balance equity profit margin margin_free leverage currency server")
+TerminalInfo = namedtuple("TerminalInfo", "connected trade_allowed name build")
+TradePosition = namedtuple(
+    "TradePosition",
+    "ticket time time_msc type magic identifier volume price_open sl tp price_current profit swap symbol comment",
+)
+TradeDeal = namedtuple(
+    "TradeDeal",
+    "ticket order time time_msc type entry magic reason position_id volume price commission swap profit symbol comment",
+)
+OrderSendResult = namedtuple("OrderSendResult", "retcode deal order volume price bid ask comment request_id request")
+
+# copy_rates_* record layout
+RATES_DTYPE = np.dtype([
+    ("time", "<i8"), ("open", "<f8"), ("high", "<f8"), ("low", "<f8"), ("close", "<f8"),
+    ("tick_volume", "<u8"), ("spread", "<i4"), ("real_volume", "<u8"),
+])
+
+# last_error() codes
+RES_S_OK = (1, "Success")
+RES_E_INVALID_PARAMS = (-2, "Invalid params")
+RES_E_NOT_FOUND = (-4, "Not found")
+RES_E_NO_IPC = (-10004, "No IPC connection")
+RES_E_IPC_TIMEOUT = (-10005, "IPC timeout")
+
+# order_send() return codes
+TRADE_RETCODE_REQUOTE = 10004
+TRADE_RETCODE_DONE = 10009
+TRADE_RETCODE_INVALID = 10013
+TRADE_RETCODE_INVALID_VOLUME = 10014
+TRADE_RETCODE_NO_MONEY = 10019
+TRADE_RETCODE_INVALID_FILL = 10030
+
+BAR_SECONDS = 60
+_EXTEND_BARS = 1440  # Synthetic bars are generated a day at a time
+_MAX_MATCH_SECONDS = 3600  # SL/TP scan after a long pause only covers the last hour
+
+def _ipc(method):
+    """Marks a terminal call: IPC latency, fault injection, clock and SL/TP matching."""
+    @functools.wraps(method)
+    def call(self, *args, **kwargs):
+        return self._call(method, args, kwargs)
+    return call
+
+class _Spec:
+    """Contract specification guessed from the symbol name."""
+    def __init__(self, symbol: str, spread_points: int):
+        name = symbol.upper()
+        if "XAU" in name:
+            self.digits, self.price, self.contract = 2, 2000.0, 100.0
+        elif "XAG" in name:
+            self.digits, self.price, self.contract = 3, 25.0, 5000.0
+        elif "BTC" in name:
+            self.digits, self.price, self.contract = 2, 60000.0, 1.0
+        elif "JPY" in name:
+            self.digits, self.price, self.contract = 3, 150.0, 100000.0
+        else:
+            self.digits, self.contract = 5, 100000.0
+            self.price = 1.0 + (zlib.crc32(name.encode()) % 500) / 1000.0
+        self.point = 10.0 ** -self.digits
+        self.spread = spread_points
+        # Account currency USD: quote-currency PnL converted at the start price
+        self.tick_value = self.contract * self.point
+        if name[:3] == "USD" and name[3:6] != "USD":
+            self.tick_value /= self.price
+
+class _Feed:
+    """
+    M1 bars of one symbol laid back to back on the terminal clock, plus
+    the tick path inside each bar: ticks every tick_interval seconds move
+    linearly through open -> low -> high -> close (up bars) or
+    open -> high -> low -> close (down bars), so ticks, the forming bar
+    and the completed bar always agree.
+    """
+    def __init__(self, start: int, current: int, spec: _Spec, rng: np.random.Generator,
+                 volatility: float, ticks_per_bar: int, recorded: Optional[pd.DataFrame] = None):
+        self.start = start          # Open time of bar 0
+        self.spec = spec
+        self.rng = rng
+        self.volatility = volatility
+        self.ticks_per_bar = ticks_per_bar
+        self.ohlc = np.empty((0, 4))
+        self.volume = np.empty(0, dtype=np.int64)
+        if recorded is not None and not recorded.empty:
+            self._append(recorded[["open", "high", "low", "close"]].to_numpy(float),
+                         recorded["tick_volume"].to_numpy(np.int64) if "tick_volume" in recorded
+                         else np.full(len(recorded), ticks_per_bar))
+        self.extend_to(current)
+
+    def __len__(self) -> int:
+        return len(self.ohlc)
+
+    def _append(self, ohlc: np.ndarray, volume: np.ndarray):
+        self.ohlc = np.concatenate([self.ohlc, ohlc])
+        self.volume = np.concatenate([self.volume, volume])
+
+    def extend_to(self, index: int):
+        """Generates synthetic bars (random walk of log prices) up to bar `index`."""
+        missing = index + 1 - len(self)
+        if missing <= 0:
+            return
+        count = max(missing, _EXTEND_BARS)
+        last = self.ohlc[-1, 3] if len(self) else self.spec.price
+        # Four sub-steps per bar give the high/low excursion
+        steps = self.rng.standard_normal((count, 4)) * (self.volatility / 2.0)
+        path = np.log(last) + np.cumsum(steps.ravel()).reshape(count, 4)
+        prices = np.exp(path)
+        opens = np.concatenate([[last], prices[:-1, -1]])
+        ohlc = np.column_stack([
+            opens,
+            np.maximum(opens, prices.max(axis=1)),
+            np.minimum(opens, prices.min(axis=1)),
+            prices[:, -1],
+        ])
+        self._append(np.round(ohlc, self.spec.digits), np.full(count, self.ticks_per_bar, dtype=np.int64))
+
+    def _knots(self, index: np.ndarray) -> np.ndarray:
+        o, h, l, c = self.ohlc[index].T
+        up = c >= o
+        return np.column_stack([o, np.where(up, l, h), np.where(up, h, l), c])
+
+    def bids(self, times: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(bar index, tick slot, bid) of the ticks quoted at `times`."""
+        offset = np.asarray(times, dtype=float) - self.start
+        index = (offset // BAR_SECONDS).astype(np.int64)
+        self.extend_to(int(index.max()) if len(index) else 0)
+        slot = ((offset - index * BAR_SECONDS) * self.ticks_per_bar // BAR_SECONDS).astype(np.int64)
+        knots = self._knots(index)
+        x = slot / self.ticks_per_bar * 3.0
+        segment = np.minimum(x.astype(np.int64), 2)
+        rows = np.arange(len(index))
+        left, right = knots[rows, segment], knots[rows, segment + 1]
+        bid = np.round(left + (right - left) * (x - segment), self.spec.digits)
+        return index, slot, bid
+
+    def forming(self, index: int, slot: int) -> Tuple[float, float, float, float, int]:
+        """OHLC + tick volume of bar `index` after its first `slot` + 1 ticks."""
+        _, _, bid = self.bids(np.array([self.start + index * BAR_SECONDS
+                                        + slot * BAR_SECONDS / self.ticks_per_bar]))
+        knots = self._knots(np.array([index]))[0]
+        seen = knots[:min(int(slot / self.ticks_per_bar * 3.0), 2) + 1]
+        return knots[0], max(seen.max(), bid[0]), min(seen.min(), bid[0]), bid[0], slot + 1
+
+class _Position:
+    __slots__ = ("ticket", "symbol", "type", "volume", "price_open", "sl", "tp", "magic", "comment", "time")
+
+    def __init__(self, **fields):
+        for name, value in fields.items():
+            setattr(self, name, value)
+
+class FakeTerminal:
+    """
+    In-process stand-in for the MetaTrader5 package (MT5_BACKEND=fake).
+
+    Implements the part of the API the bot calls, with the same constants,
+    named-tuple results and return codes, so the whole engine (data,
+    execution, position management) runs unchanged on Linux:
+      - Any symbol exists on first use. Bars are synthetic (seeded random
+        walk per symbol) or read from bars_path/<SYMBOL>.csv, replayed
+        back to back on the terminal clock; after the last recorded bar
+        the symbol continues synthetically.
+      - The clock starts now and runs at `speed` x real time. Orders fill
+        at the current bid/ask, open positions' SL/TP are matched against
+        every tick since the previous call.
+      - Every call costs latency_ms (+ uniform jitter_ms) of IPC time and
+        fails (None, last_error() = IPC timeout) with failure_rate.
+        Orders are requoted with requote_rate. inject() and disconnect()
+        script specific failures.
+    Thread-safe: calls sleep their latency concurrently, then run one at
+    a time, like the terminal's IPC.
+    """
+    TIMEFRAME_M1 = 1
+    TIMEFRAME_M5 = 5
+    TIMEFRAME_M15 = 15
+    TIMEFRAME_M30 = 30
+    TIMEFRAME_H1 = 16385
+    TIMEFRAME_H4 = 16388
+    TIMEFRAME_D1 = 16408
+    COPY_TICKS_ALL = -1
+    ORDER_TYPE_BUY = 0
+    ORDER_TYPE_SELL = 1
+    TRADE_ACTION_DEAL = 1
+    TRADE_ACTION_SLTP = 6
+    ORDER_FILLING_FOK = 0
+    ORDER_FILLING_IOC = 1
+    ORDER_FILLING_RETURN = 2
+    ORDER_TIME_GTC = 0
+    DEAL_ENTRY_IN = 0
+    DEAL_ENTRY_OUT = 1
+    DEAL_REASON_EXPERT = 3
+    DEAL_REASON_SL = 4
+    DEAL_REASON_TP = 5
+    SYMBOL_FILLING_FOK = 1
+    SYMBOL_FILLING_IOC = 2
+
+    def __init__(self, seed: int = 42, history_bars: int = 2000, tick_interval: float = 0.5,
+                 volatility: float = 0.0001, spread_points: int = 10, balance: float = 10000.0,
+                 leverage: int = 100, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 failure_rate: float = 0.0, requote_rate: float = 0.0, bars_path: str = "",
+                 speed: float = 1.0, start: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        self.seed = seed
+        self.history_bars = history_bars
+        self.ticks_per_bar = max(1, int(round(BAR_SECONDS / tick_interval)))
+        self.volatility = volatility
+        self.spread_points = spread_points
+        self.leverage = leverage
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self.requote_rate = requote_rate
+        self.bars_path = Path(bars_path) if bars_path else None
+        self.speed = speed
+        self.balance = float(balance)
+
+        # Terminal clock: bar 0 of every feed is history_bars before the start minute
+        start = time.time() if start is None else start
+        self._start = float(start)
+        self._origin = int(start // BAR_SECONDS) * BAR_SECONDS - history_bars * BAR_SECONDS
+        self._clock = clock
+        self._clock0 = clock()
+        self._sleep = sleep
+        self._faults = np.random.default_rng([seed, 1])
+
+        self._lock = threading.Lock()
+        self._feeds: Dict[str, _Feed] = {}
+        self._positions: Dict[int, _Position] = {}
+        self._deals: List[TradeDeal] = []
+        self._injected: Dict[str, List[tuple]] = {}
+        self._next_ticket = 1
+        self._matched_at = self._start
+        self._now = self._start
+        self._connected = False
+        self._last_error = RES_S_OK
+        self.calls = 0
+
+    @classmethod
+    def from_config(cls) -> "FakeTerminal":
+        return cls(
+            seed=Config.FAKE_SEED,
+            history_bars=Config.FAKE_HISTORY_BARS,
+            tick_interval=Config.FAKE_TICK_INTERVAL,
+            volatility=Config.FAKE_VOLATILITY,
+            spread_points=Config.FAKE_SPREAD_POINTS,
+            balance=Config.FAKE_BALANCE,
+            leverage=Config.FAKE_LEVERAGE,
+            latency_ms=Config.FAKE_LATENCY_MS,
+            jitter_ms=Config.FAKE_JITTER_MS,
+            failure_rate=Config.FAKE_FAILURE_RATE,
+            requote_rate=Config.FAKE_REQUOTE_RATE,
+            bars_path=Config.FAKE_BARS_PATH,
+            speed=Config.FAKE_SPEED,
+        )
+
+    # --- Clock & Fault Injection ---
+
+    def time(self) -> float:
+        """Current terminal (server) time, epoch seconds."""
+        return self._start + (self._clock() - self._clock0) * self.speed
+
+    def inject(self, function: str, count: int = 1, error: Tuple[int, str] = RES_E_IPC_TIMEOUT,
+               retcode: Optional[int] = None):
+        """Makes the next `count` calls of `function` fail: None + last_error, or order_send -> retcode."""
+        with self._lock:
+            self._injected.setdefault(function, []).extend([(error, retcode)] * count)
+
+    def disconnect(self):
+        """Drops the terminal connection; calls fail until initialize() (see ConnectionManager)."""
+        with self._lock:
+            self._connected = False
+
+    def _call(self, method, args, kwargs):
+        delay = self.latency_ms
+        if self.jitter_ms:
+            delay += float(self._faults.uniform(0.0, self.jitter_ms))
+        if delay > 0:
+            self._sleep(delay / 1000.0)
+
+        name = method.__name__
+        with self._lock:
+            self.calls += 1
+            if name != "initialize" and not self._connected:
+                self._last_error = RES_E_NO_IPC
+                return None
+            fault = self._injected.get(name)
+            if fault:
+                error, retcode = fault.pop(0)
+                if retcode is None:
+                    self._last_error = error
+                    return None
+                self._now = self.time()
+                return self._result(retcode, kwargs.get("request", args[0] if args else {}), comment="Injected")
+            if self.failure_rate and name != "initialize" and self._faults.random() < self.failure_rate:
+                self._last_error = RES_E_IPC_TIMEOUT
+                return None
+
+            self._now = self.time()
+            self._match_stops()
+            self._last_error = RES_S_OK
+            return method(self, *args, **kwargs)
+
+    # --- Terminal ---
+
+    @_ipc
+    def initialize(self, path: str = None, **kwargs) -> bool:
+        self._connected = True
+        return True
+
+    @_ipc
+    def login(self, login: int = 0, password: str = "", server: str = "", **kwargs) -> bool:
+        return True
+
+    def shutdown(self):
+        with self._lock:
+            self._connected = False
+        return True
+
+    def last_error(self) -> Tuple[int, str]:
+        return self._last_error
+
+    @_ipc
+    def terminal_info(self) -> TerminalInfo:
+        return TerminalInfo(connected=True, trade_allowed=True, name="FakeTerminal", build=0)
+
+    @_ipc
+    def account_info(self) -> AccountInfo:
+        profit = margin = 0.0
+        for position in self._positions.values():
+            spec = self._feed(position.symbol).spec
+            profit += self._profit(position, self._close_price(position), position.volume)
+            margin += position.volume * spec.contract * position.price_open / self.leverage
+        equity = self.balance + profit
+        return AccountInfo(login=Config.MT5_LOGIN, balance=round(self.balance, 2), equity=round(equity, 2),
+                           profit=round(profit, 2), margin=round(margin, 2), margin_free=round(equity - margin, 2),
+                           leverage=self.leverage, currency="USD", server="FakeTerminal")
+
+    # --- Market Data ---
+
+    @_ipc
+    def symbol_select(self, symbol: str, enable: bool = True) -> bool:
+        self._feed(symbol)
+        return True
+
+    @_ipc
+    def symbol_info(self, symbol: str) -> SymbolInfo:
+        spec = self._feed(symbol).spec
+        bid, ask, _ = self._quote(symbol, self._now)
+        return SymbolInfo(name=symbol, visible=True, select=True, spread=spec.spread, point=spec.point,
+                          digits=spec.digits, filling_mode=self.SYMBOL_FILLING_FOK | self.SYMBOL_FILLING_IOC,
+                          trade_contract_size=spec.contract, trade_tick_size=spec.point,
+                          trade_tick_value=spec.tick_value, volume_min=0.01, volume_max=100.0, volume_step=0.01,
+                          bid=bid, ask=ask)
+
+    @_ipc
+    def symbol_info_tick(self, symbol: str) -> Tick:
+        bid, ask, time_msc = self._quote(symbol, self._now)
+        return Tick(time=time_msc // 1000, bid=bid, ask=ask, last=0.0, volume=0, time_msc=time_msc, flags=6,
+                    volume_real=0.0)
+
+    @_ipc
+    def copy_rates_from_pos(self, symbol: str, timeframe: int, start_pos: int, count: int) -> Optional[np.ndarray]:
+        minutes = _timeframe_minutes(timeframe)
+        if minutes is None or count <= 0 or start_pos < 0:
+            self._last_error = RES_E_INVALID_PARAMS
+            return None
+        feed = self._feed(symbol)
+        period = minutes * BAR_SECONDS
+        current = int(self._now // period) * period
+        first = max(current - (start_pos + count - 1) * period, feed.start)
+        last = current - start_pos * period + period - BAR_SECONDS
+        now_index, now_slot, _ = feed.bids(np.array([self._now]))
+        a = (first - feed.start) // BAR_SECONDS
+        b = min((last - feed.start) // BAR_SECONDS, int(now_index[0]))
+        if b < a:
+            return np.empty(0, dtype=RATES_DTYPE)
+
+        ohlc = feed.ohlc[a:b + 1].copy()
+        volume = feed.volume[a:b + 1].copy()
+        if b == now_index[0]:
+            # The forming bar, as far as the clock has got
+            o, h, l, c, ticks = feed.forming(b, int(now_slot[0]))
+            ohlc[-1] = (o, h, l, c)
+            volume[-1] = ticks
+        times = feed.start + np.arange(a, b + 1) * BAR_SECONDS
+        groups = times // period * period
+        cuts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+
+        rates = np.zeros(len(cuts), dtype=RATES_DTYPE)
+        rates["time"] = groups[cuts]
+        rates["open"] = ohlc[cuts, 0]
+        rates["high"] = np.maximum.reduceat(ohlc[:, 1], cuts)
+        rates["low"] = np.minimum.reduceat(ohlc[:, 2], cuts)
+        rates["close"] = ohlc[np.r_[cuts[1:] - 1, len(ohlc) - 1], 3]
+        rates["tick_volume"] = np.add.reduceat(volume, cuts)
+        rates["spread"] = feed.spec.spread
+        return rates[-count:]
+
+    # --- Trading ---
+
+    @_ipc
+    def positions_get(self, symbol: str = None, group: str = None, ticket: int = None) -> tuple:
+        positions = []
+        for position in self._positions.values():
+            if (symbol is not None and position.symbol != symbol) or (ticket is not None and position.ticket != ticket):
+                continue
+            price = self._close_price(position)
+            positions.append(TradePosition(
+                ticket=position.ticket, time=int(position.time), time_msc=int(position.time * 1000),
+                type=position.type, magic=position.magic, identifier=position.ticket, volume=position.volume,
+                price_open=position.price_open, sl=position.sl, tp=position.tp, price_current=price,
+                profit=round(self._profit(position, price, position.volume), 2), swap=0.0,
+                symbol=position.symbol, comment=position.comment,
+            ))
+        return tuple(positions)
+
+    @_ipc
+    def history_deals_get(self, date_from=None, date_to=None, group: str = None, position: int = None,
+                          ticket: int = None) -> tuple:
+        if position is not None or ticket is not None:
+            return tuple(d for d in self._deals
+                         if (position is None or d.position_id == position) and (ticket is None or d.ticket == ticket))
+        start, end = _epoch(date_from), _epoch(date_to)
+        return tuple(d for d in self._deals if start <= d.time <= end)
+
+    @_ipc
+    def order_send(self, request: dict) -> OrderSendResult:
+        symbol = request.get("symbol", "")
+        action = request.get("action")
+        if action == self.TRADE_ACTION_SLTP:
+            position = self._positions.get(request.get("position"))
+            if position is None:
+                return self._result(TRADE_RETCODE_INVALID, request, comment="Position doesn't exist")
+            position.sl = float(request.get("sl", 0.0) or 0.0)
+            position.tp = float(request.get("tp", 0.0) or 0.0)
+            return self._result(TRADE_RETCODE_DONE, request, comment="Request executed")
+        if action != self.TRADE_ACTION_DEAL or request.get("type") not in (self.ORDER_TYPE_BUY, self.ORDER_TYPE_SELL):
+            return self._result(TRADE_RETCODE_INVALID, request, comment="Invalid request")
+        if request.get("type_filling", self.ORDER_FILLING_FOK) not in (self.ORDER_FILLING_FOK, self.ORDER_FILLING_IOC):
+            return self._result(TRADE_RETCODE_INVALID_FILL, request, comment="Unsupported filling mode")
+        volume = float(request.get("volume", 0.0))
+        if not 0.01 <= volume <= 100.0:
+            return self._result(TRADE_RETCODE_INVALID_VOLUME, request, comment="Invalid volume")
+
+        spec = self._feed(symbol).spec
+        bid, ask, _ = self._quote(symbol, self._now)
+        price = ask if request["type"] == self.ORDER_TYPE_BUY else bid
+        requested = request.get("price")
+        off = requested is not None and abs(price - requested) > request.get("deviation", 0) * spec.point + 1e-12
+        if off or (self.requote_rate and self._faults.random() < self.requote_rate):
+            return self._result(TRADE_RETCODE_REQUOTE, request, comment="Requote")
+
+        if request.get("position"):
+            position = self._positions.get(request["position"])
+            if position is None or position.symbol != symbol or position.type == request["type"]:
+                return self._result(TRADE_RETCODE_INVALID, request, comment="Position doesn't exist")
+            deal = self._close(position, min(volume, position.volume), price, self.DEAL_REASON_EXPERT)
+            return self._result(TRADE_RETCODE_DONE, request, deal=deal.ticket, order=deal.order, volume=deal.volume,
+                                price=price, comment="Request executed")
+
+        margin = volume * spec.contract * price / self.leverage
+        if margin > self._margin_free():
+            return self._result(TRADE_RETCODE_NO_MONEY, request, comment="No money")
+        ticket = self._ticket()
+        position = _Position(ticket=ticket, symbol=symbol, type=request["type"], volume=volume, price_open=price,
+                             sl=float(request.get("sl", 0.0) or 0.0), tp=float(request.get("tp", 0.0) or 0.0),
+                             magic=request.get("magic", 0), comment=request.get("comment", ""), time=self._now)
+        self._positions[ticket] = position
+        deal = self._deal(position, self.DEAL_ENTRY_IN, volume, price, 0.0, self.DEAL_REASON_EXPERT, self._now)
+        return self._result(TRADE_RETCODE_DONE, request, deal=deal.ticket, order=ticket, volume=volume, price=price,
+                            comment="Request executed")
+
+    # --- Internals (called with the lock held) ---
+
+    def _feed(self, symbol: str) -> _Feed:
+        feed = self._feeds.get(symbol)
+        if feed is None:
+            spec = _Spec(symbol, self.spread_points)
+            rng = np.random.default_rng([self.seed, zlib.crc32(symbol.encode())])
+            current = int((self._now - self._origin) // BAR_SECONDS)
+            feed = _Feed(self._origin, current, spec, rng, self.volatility, self.ticks_per_bar,
+                         self._recorded(symbol))
+            self._feeds[symbol] = feed
+        return feed
+
+    def _recorded(self, symbol: str) -> Optional[pd.DataFrame]:
+        if self.bars_path is None:
+            return None
+        suffix = Config.MT5_SUFFIX
+        for name in dict.fromkeys([symbol, symbol[:-len(suffix)] if suffix and symbol.endswith(suffix) else symbol]):
+            path = self.bars_path / f"{name}.csv"
+            if path.exists():
+                bars = pd.read_csv(path)
+                logger.info(f"FakeTerminal: {symbol} replays {len(bars)} recorded bars from {path}")
+                return bars
+        return None
+
+    def _quote(self, symbol: str, at: float) -> Tuple[float, float, int]:
+        feed = self._feed(symbol)
+        index, slot, bid = feed.bids(np.array([at]))
+        time_msc = int(round((feed.start + index[0] * BAR_SECONDS + slot[0] * BAR_SECONDS / feed.ticks_per_bar) * 1000))
+        bid = float(bid[0])
+        return bid, round(bid + feed.spec.spread * feed.spec.point, feed.spec.digits), time_msc
+
+    def _close_price(self, position: _Position) -> float:
+        bid, ask, _ = self._quote(position.symbol, self._now)
+        return bid if position.type == self.ORDER_TYPE_BUY else ask
+
+    def _profit(self, position: _Position, price: float, volume: float) -> float:
+        spec = self._feed(position.symbol).spec
+        sign = 1.0 if position.type == self.ORDER_TYPE_BUY else -1.0
+        return sign * (price - position.price_open) / spec.point * spec.tick_value * volume
+
+    def _margin_free(self) -> float:
+        used = sum(p.volume * self._feed(p.symbol).spec.contract * p.price_open / self.leverage
+                   for p in self._positions.values())
+        floating = sum(self._profit(p, self._close_price(p), p.volume) for p in self._positions.values())
+        return self.balance + floating - used
+
+    def _ticket(self) -> int:
+        ticket, self._next_ticket = self._next_ticket, self._next_ticket + 1
+        return ticket
+
+    def _deal(self, position: _Position, entry: int, volume: float, price: float, profit: float,
+              reason: int, at: float) -> TradeDeal:
+        closing = entry == self.DEAL_ENTRY_OUT
+        side = (1 - position.type) if closing else position.type
+        order = self._ticket() if closing else position.ticket
+        deal = TradeDeal(ticket=self._ticket(), order=order,
+                         time=int(at), time_msc=int(at * 1000), type=side, entry=entry, magic=position.magic,
+                         reason=reason, position_id=position.ticket, volume=volume, price=price, commission=0.0,
+                         swap=0.0, profit=round(profit, 2), symbol=position.symbol, comment=position.comment)
+        self._deals.append(deal)
+        return deal
+
+    def _close(self, position: _Position, volume: float, price: float, reason: int, at: float = None) -> TradeDeal:
+        profit = self._profit(position, price, volume)
+        self.balance += round(profit, 2)
+        position.volume = round(position.volume - volume, 2)
+        if position.volume <= 0:
+            del self._positions[position.ticket]
+        return self._deal(position, self.DEAL_ENTRY_OUT, volume, price, profit, reason,
+                          self._now if at is None else at)
+
+    def _match_stops(self):
+        """Closes positions whose SL/TP was touched by any tick since the previous call."""
+        start, self._matched_at = max(self._matched_at, self._now - _MAX_MATCH_SECONDS), self._now
+        for position in [p for p in self._positions.values() if p.sl or p.tp]:
+            feed = self._feed(position.symbol)
+            step = BAR_SECONDS / feed.ticks_per_bar
+            times = np.arange((start // step + 1) * step, self._now + 1e-9, step)
+            if not len(times):
+                continue
+            _, _, bid = feed.bids(times)
+            price = bid if position.type == self.ORDER_TYPE_BUY else bid + feed.spec.spread * feed.spec.point
+            sign = 1.0 if position.type == self.ORDER_TYPE_BUY else -1.0
+            sl_hit = (sign * (price - position.sl) <= 0) if position.sl else np.zeros(len(times), bool)
+            tp_hit = (sign * (price - position.tp) >= 0) if position.tp else np.zeros(len(times), bool)
+            hits = np.flatnonzero(sl_hit | tp_hit)
+            if len(hits):
+                i = hits[0]
+                reason = self.DEAL_REASON_SL if sl_hit[i] else self.DEAL_REASON_TP
+                self._close(position, position.volume, round(float(price[i]), feed.spec.digits), reason,
+                            float(times[i]))
+
+    def _result(self, retcode: int, request: dict, deal: int = 0, order: int = 0, volume: float = 0.0,
+                price: float = 0.0, comment: str = "") -> OrderSendResult:
+        bid = ask = 0.0
+        if request.get("symbol"):
+            bid, ask, _ = self._quote(request["symbol"], self._now)
+        return OrderSendResult(retcode=retcode, deal=deal, order=order, volume=volume, price=price, bid=bid,
+                               ask=ask, comment=comment, request_id=0, request=request)
+
+def _timeframe_minutes(timeframe: int) -> Optional[int]:
+    """TIMEFRAME_* constant -> bar length in minutes (M1..D1)."""
+    if 0 < timeframe < 0x4000:
+        return timeframe
+    if 0x4000 < timeframe <= 0x4018:
+        return (timeframe - 0x4000) * 60
+    return None
+
+def _epoch(value) -> float:
+    if value is None:
+        return 0.0
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return float(value)
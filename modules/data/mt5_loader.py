@@ -1,47 +1,87 @@
 import sys
 import platform
 import logging
-from unittest.mock import MagicMock
+from datetime import datetime
+from typing import Optional
+
+from config.config import Config
+from modules.data.mt5_profiler import CallProfile, MT5Profiler
+from modules.data.mt5_recorder import MT5Recorder
 
 logger = logging.getLogger(__name__)
 
 # Check OS
 IS_WINDOWS = platform.system() == 'Windows'
+IS_MOCK = False
 
-try:
-    if IS_WINDOWS:
-        import MetaTrader5 as mt5
-    else:
-        raise ImportError("Not on Windows")
-except ImportError:
-    logger.warning("MetaTrader5 package not found or not on Windows. Using MOCK object.")
+if Config.MT5_BACKEND == "fake":
+    # Deterministic stand-in terminal (synthetic/recorded feed, order matching, fault injection)
+    from modules.data.fake_mt5 import FakeTerminal
+    mt5 = FakeTerminal.from_config()
+    logger.warning("MT5_BACKEND=fake: using the FakeTerminal, no broker connection.")
+elif Config.MT5_BACKEND == "replay":
+    # A recorded session (see MT5Recorder) served back instead of a terminal
+    from modules.data.mt5_recorder import ReplayTerminal
+    mt5 = ReplayTerminal(Config.MT5_REPLAY_PATH, pace=Config.MT5_REPLAY_PACE)
+    logger.warning(f"MT5_BACKEND=replay: serving {Config.MT5_REPLAY_PATH}, no broker connection.")
+else:
+    try:
+        if IS_WINDOWS and Config.MT5_BACKEND != "mock":
+            import MetaTrader5 as mt5
+        else:
+            raise ImportError("Not on Windows")
+    except ImportError:
+        logger.warning("MetaTrader5 package not found or not on Windows. Using MOCK object.")
+        from unittest.mock import MagicMock  # Only needed without the real terminal
+        IS_MOCK = True
     
-    # Create a comprehensive Mock object
-    mt5 = MagicMock()
+        # Create a comprehensive Mock object
+        mt5 = MagicMock()
     
-    # Mock constants
-    mt5.TIMEFRAME_M1 = 1
-    mt5.TIMEFRAME_M5 = 5
-    mt5.TIMEFRAME_H1 = 16385
-    mt5.COPY_TICKS_ALL = -1
-    mt5.ORDER_TYPE_BUY = 0
-    mt5.ORDER_TYPE_SELL = 1
-    mt5.TRADE_ACTION_DEAL = 1
+        # Mock constants
+        mt5.TIMEFRAME_M1 = 1
+        mt5.TIMEFRAME_M5 = 5
+        mt5.TIMEFRAME_H1 = 16385
+        mt5.COPY_TICKS_ALL = -1
+        mt5.ORDER_TYPE_BUY = 0
+        mt5.ORDER_TYPE_SELL = 1
+        mt5.TRADE_ACTION_DEAL = 1
+        mt5.TRADE_ACTION_SLTP = 6
+        mt5.ORDER_FILLING_FOK = 0
+        mt5.ORDER_FILLING_IOC = 1
+        mt5.ORDER_FILLING_RETURN = 2
+        mt5.ORDER_TIME_GTC = 0
     
-    # Mock return values for success checks
-    mt5.initialize.return_value = True
-    mt5.login.return_value = True
+        # Mock return values for success checks
+        mt5.initialize.return_value = True
+        mt5.login.return_value = True
     
-    # Mock terminal info
-    mock_terminal_info = MagicMock()
-    mock_terminal_info.connected = True
-    mt5.terminal_info.return_value = mock_terminal_info
-
-    # Mock symbol info
-    mock_symbol_info = MagicMock()
-    mock_symbol_info.spread = 10
-    mock_symbol_info.visible = True
-    mt5.symbol_info.return_value = mock_symbol_info
-
-# Expose the mt5 object (either real or mock)
+        # Mock terminal info
+        mock_terminal_info = MagicMock()
+        mock_terminal_info.connected = True
+        mt5.terminal_info.return_value = mock_terminal_info
+
+        # Mock symbol info
+        mock_symbol_info = MagicMock()
+        mock_symbol_info.spread = 10
+        mock_symbol_info.visible = True
+        mock_symbol_info.point = 0.00001
+        mock_symbol_info.digits = 5
+        mock_symbol_info.filling_mode = 3  # FOK | IOC
+        mock_symbol_info.trade_contract_size = 100000.0
+        mock_symbol_info.trade_tick_size = 0.00001
+        mock_symbol_info.trade_tick_value = 1.0
+        mt5.symbol_info.return_value = mock_symbol_info
+
+# Session capture for replay (recording a replay would only copy it)
+if Config.MT5_RECORD_PATH and not IS_MOCK and Config.MT5_BACKEND != "replay":
+    mt5 = MT5Recorder(mt5, datetime.now().strftime(Config.MT5_RECORD_PATH))
+
+# Call counts / latency per function and call site (the unit-test mock stays bare)
+PROFILE: Optional[CallProfile] = None
+if Config.MT5_PROFILE and not IS_MOCK:
+    mt5 = MT5Profiler(mt5)
+    PROFILE = mt5.profile
+
+# Expose the mt5 object (real, mock, fake or replay; possibly recorded / profiled)
 MT5 = mt5
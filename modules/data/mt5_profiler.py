@@ -0,0 +1,174 @@
+import bisect
+import sys
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+# Latency histogram bucket upper bounds (ms); the last bucket is open-ended
+LATENCY_BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 50.0, 100.0, 250.0, 500.0, 1000.0)
+
+RETCODE_DONE = 10009
+
+# Functions whose None result is not a failure
+_NO_RESULT = frozenset({"shutdown"})
+
+class CallStats:
+    """Count, errors and latency histogram of one function (or one call site)."""
+    __slots__ = ("count", "errors", "total_ms", "max_ms", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def record(self, ms: float, error: bool):
+        self.count += 1
+        self.errors += error
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+
+    @property
+    def mean_ms(self) -> float:
+        return self.total_ms / self.count if self.count else 0.0
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (capped at the max seen)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank:
+                return min(LATENCY_BUCKETS_MS[i], self.max_ms) if i < len(LATENCY_BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+class CallProfile:
+    """
+    Terminal call accounting collected by MT5Profiler.
+
+    Per function and per calling site (module.function:line): counts,
+    failures and latency histograms; per function and code: errors
+    (last_error() code for None/False results, retcode for rejected
+    orders). loop() returns the calls and time spent in the terminal
+    since the previous loop() call.
+    """
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.started = clock()
+        self.calls = 0
+        self.ipc_ms = 0.0
+        self.functions: Dict[str, CallStats] = {}
+        self.sites: Dict[Tuple[str, str], CallStats] = {}
+        self.errors: Dict[Tuple[str, object], int] = {}
+        self._loop_calls = 0
+        self._loop_ms = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, function: str, site: str, ms: float, error=None):
+        with self._lock:
+            self.calls += 1
+            self.ipc_ms += ms
+            stats = self.functions.get(function)
+            if stats is None:
+                stats = self.functions[function] = CallStats()
+            stats.record(ms, error is not None)
+            key = (function, site)
+            stats = self.sites.get(key)
+            if stats is None:
+                stats = self.sites[key] = CallStats()
+            stats.record(ms, error is not None)
+            if error is not None:
+                self.errors[(function, error)] = self.errors.get((function, error), 0) + 1
+
+    def loop(self) -> Tuple[int, float]:
+        """(calls, ms in the terminal) since the previous loop() call."""
+        with self._lock:
+            calls, ms = self.calls - self._loop_calls, self.ipc_ms - self._loop_ms
+            self._loop_calls, self._loop_ms = self.calls, self.ipc_ms
+        return calls, ms
+
+    def rate(self) -> float:
+        """Average calls per second since the profile started."""
+        elapsed = self.clock() - self.started
+        return self.calls / elapsed if elapsed > 0 else 0.0
+
+    def report(self, top: int = 10) -> str:
+        """Human readable table: functions by total time, then the busiest call sites and errors."""
+        with self._lock:
+            functions = sorted(self.functions.items(), key=lambda kv: kv[1].total_ms, reverse=True)
+            sites = sorted(self.sites.items(), key=lambda kv: kv[1].total_ms, reverse=True)[:top]
+            errors = sorted(self.errors.items(), key=lambda kv: kv[1], reverse=True)[:top]
+            calls, ipc_ms = self.calls, self.ipc_ms
+        lines = [f"MT5 calls: {calls} ({self.rate():.1f}/s), {ipc_ms:.0f} ms in terminal",
+                 f"   {'function':<22} {'calls':>7} {'err':>5} {'mean':>8} {'p50':>8} {'p99':>8} {'max':>8}"]
+        lines += [f"   {name:<22} {s.count:>7} {s.errors:>5} {s.mean_ms:>8.2f} {s.percentile(0.5):>8.2f} "
+                  f"{s.percentile(0.99):>8.2f} {s.max_ms:>8.2f}" for name, s in functions]
+        if sites:
+            lines.append("   Busiest call sites (total ms):")
+            lines += [f"   {s.total_ms:>9.1f}  {s.count:>7}x {function} <- {site}" for (function, site), s in sites]
+        if errors:
+            lines.append("   Errors: " + ", ".join(f"{function} {code} x{n}" for (function, code), n in errors))
+        return "\n".join(lines)
+
+class MT5Profiler:
+    """
+    Transparent proxy around the MetaTrader5 module (or the fake terminal).
+
+    Constants are forwarded; every function is wrapped once (on first
+    access) with a timer that records into `profile`. The caller frame
+    gives the call site. A None/False result is attributed the
+    terminal's last_error() code, an order_send result its retcode
+    unless the order was done.
+    """
+    def __init__(self, target, profile: Optional[CallProfile] = None):
+        self._target = target
+        self.profile = profile or CallProfile()
+
+    def __getattr__(self, name: str):
+        value = getattr(self._target, name)
+        if callable(value) and not name.startswith("_") and not isinstance(value, type):
+            value = self._wrap(name, value)
+        # Cached on the instance: later lookups skip __getattr__
+        self.__dict__[name] = value
+        return value
+
+    def _wrap(self, name: str, function):
+        profile, target, clock = self.profile, self._target, self.profile.clock
+
+        def call(*args, **kwargs):
+            started = clock()
+            try:
+                result = function(*args, **kwargs)
+            except Exception as e:
+                profile.record(name, _site(), (clock() - started) * 1000.0, type(e).__name__)
+                raise
+            ms = (clock() - started) * 1000.0
+            error = None
+            if (result is None or result is False) and name not in _NO_RESULT:
+                error = _error_code(target)
+            elif name == "order_send":
+                retcode = getattr(result, "retcode", RETCODE_DONE)
+                error = None if retcode == RETCODE_DONE else retcode
+            profile.record(name, _site(), ms, error)
+            return result
+
+        call.__name__ = name
+        call.__wrapped__ = function
+        return call
+
+def _site() -> str:
+    """module.function:line of the code calling the terminal."""
+    frame = sys._getframe(2)
+    return f"{frame.f_globals.get('__name__', '?')}.{frame.f_code.co_name}:{frame.f_lineno}"
+
+def _error_code(target):
+    try:
+        error = target.last_error()
+    except Exception:
+        return "unknown"
+    return error[0] if isinstance(error, tuple) and error else error
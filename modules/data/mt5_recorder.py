@@ -0,0 +1,326 @@
+import atexit
+import gzip
+import io
+import logging
+import os
+import pickle
+import queue
+import struct
+import threading
+import time
+import zlib
+from collections import deque, namedtuple
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, Iterator, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"MT5REC1\n"
+FORMAT_VERSION = 1
+_LENGTH = struct.Struct("<I")
+
+# Functions recorded without their arguments (credentials, terminal path)
+_UNKEYED = frozenset({"initialize", "login", "shutdown"})
+# Keyword arguments that select what a call returns
+_KEY_KWARGS = ("symbol", "ticket", "position", "group")
+# Functions whose None result is not a failure
+_NO_RESULT = frozenset({"shutdown"})
+
+RES_E_NOT_FOUND = (-4, "Not found")
+
+_FLUSH = object()  # Writer: flush the stream now
+
+def call_key(name: str, args: tuple, kwargs: dict) -> tuple:
+    """
+    What a call asks for: function + symbol/timeframe/ticket-like
+    arguments. Prices, dates and credentials are left out, so a replay
+    matches calls that differ only in those.
+    """
+    if name in _UNKEYED:
+        return (name,)
+    parts = [name]
+    for value in args:
+        if isinstance(value, dict):
+            parts.append(value.get("symbol"))
+        elif isinstance(value, (str, int)):
+            parts.append(value)
+    for key in _KEY_KWARGS:
+        if key in kwargs:
+            parts.append((key, kwargs[key]))
+    return tuple(parts)
+
+# --- Portable encoding (builtins only: no MetaTrader5 package needed to read a log) ---
+
+def _encode(value):
+    if value is None or isinstance(value, (bool, int, float, str, bytes)):
+        return value
+    if isinstance(value, np.ndarray):
+        # descr keeps structured field names; a plain dtype would come back as a one-field record
+        dtype = value.dtype.descr if value.dtype.names is not None else value.dtype.str
+        return ("nd", dtype, value.shape, value.tobytes())
+    if isinstance(value, np.generic):
+        return value.item()
+    if hasattr(value, "_asdict"):
+        return ("nt", type(value).__name__, tuple(value._fields), [_encode(v) for v in value])
+    if isinstance(value, (tuple, list)):
+        return ("t" if isinstance(value, tuple) else "l", [_encode(v) for v in value])
+    if isinstance(value, dict):
+        return ("d", {k: _encode(v) for k, v in value.items()})
+    if isinstance(value, datetime):
+        return ("dt", value.timestamp())
+    return ("r", repr(value))
+
+_TYPES: Dict[Tuple[str, tuple], type] = {}
+
+def _decode(value):
+    if not isinstance(value, tuple):
+        return value
+    tag = value[0]
+    if tag == "nd":
+        _, descr, shape, data = value
+        return np.frombuffer(data, dtype=np.dtype(descr)).reshape(shape).copy()
+    if tag == "nt":
+        _, name, fields, items = value
+        cls = _TYPES.get((name, fields))
+        if cls is None:
+            cls = _TYPES[(name, fields)] = namedtuple(name, fields)
+        return cls(*(_decode(v) for v in items))
+    if tag in ("t", "l"):
+        items = [_decode(v) for v in value[1]]
+        return tuple(items) if tag == "t" else items
+    if tag == "d":
+        return {k: _decode(v) for k, v in value[1].items()}
+    if tag == "dt":
+        return datetime.fromtimestamp(value[1])
+    return value[1]
+
+class _RatesDelta:
+    """
+    copy_rates_* responses repeat the previous one shifted by a bar or
+    two: store only the rows that changed, against the previous response
+    of the same call key. Used in both directions, in file order.
+    """
+    def __init__(self):
+        self._last: Dict[tuple, np.ndarray] = {}
+
+    def encode(self, key: tuple, rates):
+        previous = self._last.get(key)
+        if not isinstance(rates, np.ndarray) or rates.dtype.names is None or "time" not in rates.dtype.names:
+            return _encode(rates)
+        self._last[key] = rates
+        if previous is None or previous.dtype != rates.dtype or not len(rates):
+            return _encode(rates)
+        skip = int(np.searchsorted(previous["time"], rates["time"][0]))
+        overlap = min(len(previous) - skip, len(rates))
+        same = previous[skip:skip + overlap] == rates[:overlap]
+        keep = int(np.argmin(same)) if not same.all() else overlap
+        return ("rd", skip, keep, _encode(rates[keep:]))
+
+    def decode(self, key: tuple, value):
+        if isinstance(value, tuple) and value and value[0] == "rd":
+            _, skip, keep, tail = value
+            rates = np.concatenate([self._last[key][skip:skip + keep], _decode(tail)])
+        else:
+            rates = _decode(value)
+        if isinstance(rates, np.ndarray) and rates.dtype.names is not None:
+            self._last[key] = rates
+        return rates
+
+def _write_frame(stream, payload):
+    data = pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)
+    stream.write(_LENGTH.pack(len(data)) + data)
+
+class _BuiltinsUnpickler(pickle.Unpickler):
+    """Frames only ever hold builtins: refuse anything that would import code."""
+    def find_class(self, module, name):
+        raise pickle.UnpicklingError(f"Unexpected type in recording: {module}.{name}")
+
+def read_frames(path: str) -> Iterator[Any]:
+    """Yields the header, then one (t, ms, key, result, error) tuple per call. Stops at a truncated tail."""
+    with gzip.open(path, "rb") as stream:
+        if stream.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not an MT5 recording")
+        try:
+            while True:
+                head = stream.read(_LENGTH.size)
+                if not head:
+                    return
+                if len(head) < _LENGTH.size:
+                    raise EOFError("incomplete frame header")
+                size = _LENGTH.unpack(head)[0]
+                data = stream.read(size)
+                if len(data) < size:
+                    raise EOFError("incomplete frame")
+                yield _BuiltinsUnpickler(io.BytesIO(data)).load()
+        except (EOFError, OSError, zlib.error) as e:
+            # The recorder died mid-write: keep everything before
+            logger.warning(f"Recording {path} ends with a truncated frame ({e})")
+
+class MT5Recorder:
+    """
+    Transparent proxy capturing every terminal response of a session.
+
+    The calling thread only timestamps the response and enqueues it; a
+    writer thread encodes it (builtins, rates as deltas) into a gzip
+    stream of length-prefixed frames, flushed at least every
+    flush_interval seconds. None/False results carry last_error().
+    shutdown() (ConnectionManager.shutdown) flushes; close() ends the file.
+    """
+    def __init__(self, target, path: str, flush_interval: float = 1.0):
+        self._target = target
+        self.path = path
+        self.flush_interval = flush_interval
+        self.started = time.time()
+        self._t0 = time.perf_counter()
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._stream = gzip.open(path, "wb", compresslevel=6)
+        self._stream.write(MAGIC)
+        names = [name for name in dir(target) if not name.startswith("_")]
+        constants = {name: getattr(target, name) for name in names
+                     if name.isupper() and isinstance(getattr(target, name, None), int)}
+        functions = [name for name in names if name.islower() and callable(getattr(target, name, None))]
+        _write_frame(self._stream, {"version": FORMAT_VERSION, "started": self.started,
+                                    "constants": constants, "functions": functions})
+        self._writer = threading.Thread(target=self._write, name="MT5Recorder", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+        logger.info(f"Recording MT5 responses to {path}")
+
+    def __getattr__(self, name: str):
+        value = getattr(self._target, name)
+        if callable(value) and not name.startswith("_") and not isinstance(value, type) and name != "last_error":
+            value = self._wrap(name, value)
+        self.__dict__[name] = value
+        return value
+
+    def _wrap(self, name: str, function):
+        target, put, clock, t0 = self._target, self._queue.put, time.perf_counter, self._t0
+
+        def call(*args, **kwargs):
+            started = clock()
+            result = function(*args, **kwargs)
+            finished = clock()
+            error = None
+            if (result is None or result is False) and name not in _NO_RESULT:
+                error = target.last_error()
+            put((finished - t0, (finished - started) * 1000.0, call_key(name, args, kwargs), result, error))
+            if name == "shutdown":
+                put(_FLUSH)
+            return result
+
+        call.__name__ = name
+        call.__wrapped__ = function
+        return call
+
+    def close(self):
+        """Writes everything queued and closes the file (idempotent)."""
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join(timeout=10)
+
+    def _write(self):
+        deltas = _RatesDelta()
+        last_flush = time.monotonic()
+        try:
+            while True:
+                try:
+                    item = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    item = _FLUSH
+                if item is None:
+                    break
+                if item is not _FLUSH:
+                    t, ms, key, result, error = item
+                    _write_frame(self._stream, (t, ms, key, deltas.encode(key, result), error))
+                if item is _FLUSH or time.monotonic() - last_flush >= self.flush_interval:
+                    self._stream.flush()
+                    last_flush = time.monotonic()
+        except Exception as e:
+            logger.error(f"MT5 recording stopped: {e}")
+        finally:
+            self._stream.close()
+
+
+class ReplayTerminal:
+    """
+    Terminal backend serving a recorded session (MT5_BACKEND=replay).
+
+    Responses are queued per call key (function + symbol/timeframe/ticket
+    arguments) in recorded order, so the engine gets the same data for
+    the same questions even if its threads interleave differently.
+    pace="realtime" holds each response until its recorded time since
+    the session start (data and broker latency as they happened);
+    "fast" serves everything immediately. A call with nothing (left)
+    recorded returns None with last_error() = (-4, "Not found").
+    """
+    def __init__(self, path: str, pace: str = "realtime", clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        if pace not in ("realtime", "fast"):
+            raise ValueError(f"Unknown replay pace '{pace}' (realtime | fast)")
+        self.path = path
+        self.pace = pace
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._queues: Dict[tuple, Deque[tuple]] = {}
+        self._deltas = _RatesDelta()
+        self._last_error = (1, "Success")
+        self.served = 0
+        self.missing = 0
+
+        frames = read_frames(path)
+        header = next(frames)
+        for name, value in header.get("constants", {}).items():
+            setattr(self, name, value)
+        self._functions = frozenset(header.get("functions", ()))
+        self.recorded_at = header.get("started", 0.0)
+        self.total = 0
+        for t, ms, key, result, error in frames:
+            self._queues.setdefault(tuple(key), deque()).append((t, result, error))
+            self.total += 1
+        self._start = clock()
+        logger.info(f"Replaying {self.total} MT5 responses from {path} ({pace})")
+
+    def __getattr__(self, name: str):
+        # Only what the recorded terminal offered
+        if name.startswith("_") or name not in self._functions:
+            raise AttributeError(name)
+
+        def call(*args, **kwargs):
+            return self._serve(name, args, kwargs)
+        call.__name__ = name
+        self.__dict__[name] = call
+        return call
+
+    def last_error(self) -> Tuple[int, str]:
+        return self._last_error
+
+    @property
+    def remaining(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    def _serve(self, name: str, args: tuple, kwargs: dict):
+        key = call_key(name, args, kwargs)
+        with self._lock:
+            pending = self._queues.get(key)
+            if not pending:
+                self.missing += 1
+                self._last_error = RES_E_NOT_FOUND
+                if self.missing == 1:
+                    logger.warning(f"Replay has no (more) recorded responses for {key}")
+                return None
+            t, result, error = pending.popleft()
+            # Decoded in recorded order per key (rates deltas chain on the previous response)
+            value = self._deltas.decode(key, result)
+            self.served += 1
+            # Set with the dequeue: it always belongs to the latest call served
+            self._last_error = tuple(error) if error is not None else (1, "Success")
+        if self.pace == "realtime":
+            wait = self._start + t - self._clock()
+            if wait > 0:
+                self._sleep(wait)
+        return value
@@ -1,141 +1,368 @@
 import logging
+import os
 import requests
 import json
+import threading
 import time
+from bisect import bisect_right
+from dataclasses import dataclass, field, replace
 from datetime import datetime, timedelta, timezone
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+
+from config.config import Config
 
 logger = logging.getLogger(__name__)
 
+# Resolved at import: tests patch the module's `datetime`
+_EPOCH = datetime(1970, 1, 1)
+_INF = float("inf")
+
+def _to_epoch(naive_utc: datetime) -> float:
+    return (naive_utc - _EPOCH).total_seconds()
+
+def _header(response, name: str) -> Optional[str]:
+    value = response.headers.get(name)
+    return value if isinstance(value, str) else None
+
+@dataclass(frozen=True)
+class BlackoutTimeline:
+    """
+    Merged, sorted blackout intervals of one currency (UTC epoch seconds).
+    Intervals never overlap, so starts and ends are both ascending.
+    """
+    starts: Tuple[float, ...]
+    ends: Tuple[float, ...]
+    titles: Tuple[str, ...]
+
+    def locate(self, now: float) -> Tuple[bool, float, float, str]:
+        """
+        Returns (active, since, until, title): the state at `now` holds at
+        least for since < t < until.
+        """
+        idx = bisect_right(self.starts, now) - 1
+        if idx >= 0 and now <= self.ends[idx]:
+            return True, self.starts[idx], self.ends[idx], self.titles[idx]
+        since = self.ends[idx] if idx >= 0 else -_INF
+        until = self.starts[idx + 1] if idx + 1 < len(self.starts) else _INF
+        return False, since, until, ""
+
+@dataclass(frozen=True)
+class NewsSnapshot:
+    """Immutable, pre-indexed view of one calendar fetch."""
+    events: Tuple[Dict, ...] = ()                        # High impact events, sorted by time
+    event_times: Tuple[float, ...] = ()                  # UTC epoch of each event
+    timelines: Dict[str, BlackoutTimeline] = field(default_factory=dict)  # currency -> timeline
+    fetched_at: float = 0.0                              # time.time() of the fetch, 0 = never
+
+    @classmethod
+    def build(cls, events: List[Dict], blackout_minutes: float, fetched_at: float = 0.0) -> "NewsSnapshot":
+        """Parses every event date once and merges blackout windows per currency."""
+        parsed = []
+        for event in events:
+            date_str = event.get('date')
+            try:
+                # Format usually: "2024-01-29T15:00:00+00:00" (offset aware)
+                event_time = datetime.fromisoformat(date_str)
+                if event_time.tzinfo is not None:
+                    event_time = event_time.astimezone(timezone.utc).replace(tzinfo=None)
+            except Exception:
+                continue
+            parsed.append((_to_epoch(event_time), event))
+        return cls.from_parsed(parsed, blackout_minutes, fetched_at)
+
+    @classmethod
+    def from_parsed(cls, parsed: List[Tuple[float, Dict]], blackout_minutes: float,
+                    fetched_at: float = 0.0) -> "NewsSnapshot":
+        """Indexes (UTC epoch, event) pairs, e.g. as stored in the disk cache."""
+        margin = blackout_minutes * 60.0
+        parsed = sorted(parsed, key=lambda x: x[0])
+
+        per_currency: Dict[str, List[List]] = {}
+        for ts, event in parsed:
+            merged = per_currency.setdefault(event.get('country'), [])
+            start, end = ts - margin, ts + margin
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+                merged[-1][2] += f", {event.get('title')}"
+            else:
+                merged.append([start, end, str(event.get('title'))])
+
+        timelines = {
+            ccy: BlackoutTimeline(tuple(m[0] for m in merged), tuple(m[1] for m in merged),
+                                  tuple(m[2] for m in merged))
+            for ccy, merged in per_currency.items()
+        }
+        return cls(
+            events=tuple(e for _, e in parsed),
+            event_times=tuple(ts for ts, _ in parsed),
+            timelines=timelines,
+            fetched_at=fetched_at,
+        )
+
 class NewsLoader:
+    """
+    High impact news calendar.
+
+    Refreshes run on a background thread (start()); the trading loop only
+    reads the latest NewsSnapshot, which is replaced by a single reference
+    swap. Without a running refresher, queries fall back to a synchronous
+    fetch when the cache has expired.
+    """
     # Forex Factory JSON feed (unofficial but stable)
     NEWS_URL = "https://nfs.faireconomy.media/ff_calendar_thisweek.json"
-    CACHE_DURATION = 4 * 3600  # 4 Hours
-    RETRY_DELAY = 300 # 5 minutes on failure
-    
-    def __init__(self):
+    CACHE_DURATION = Config.NEWS_REFRESH_INTERVAL  # 4 Hours
+    RETRY_DELAY = Config.NEWS_RETRY_DELAY  # 5 minutes on failure
+
+    def __init__(self, cache_path: Optional[str] = None, calendar_file: Optional[str] = None):
+        """
+        cache_path: JSON file the indexed calendar and its HTTP validators are
+            persisted to, and loaded from at startup.
+        calendar_file: Forex Factory formatted JSON used INSTEAD of the feed
+            (offline testing). Re-read whenever its mtime changes.
+        """
+        self.cache_path = cache_path
+        self.calendar_file = calendar_file
+        self._etag: Optional[str] = None
+        self._last_modified: Optional[str] = None
+        self._file_mtime: Optional[float] = None
         self.news_cache: List[Dict] = []
         self.last_fetch_time = 0
-        self.blackout_minutes = 15
+        self.blackout_minutes = Config.NEWS_BLACKOUT_MINUTES
+        # (snapshot, symbol -> (active, since, until)) swapped as ONE reference,
+        # so a boundary is never cached against a different snapshot.
+        # Boundaries are valid while since < now < until.
+        self._state: Tuple[NewsSnapshot, Dict[str, Tuple[bool, float, float]]] = (NewsSnapshot(), {})
+        self._currencies: Dict[str, Tuple[str, ...]] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        if cache_path and not calendar_file:
+            self._load_cache()
+
+    @property
+    def snapshot(self) -> NewsSnapshot:
+        return self._state[0]
+
+    def start(self):
+        """Starts the background refresher (first fetch happens immediately)."""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._refresh_loop, name="NewsRefresh", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def news_age(self) -> float:
+        """Seconds since the calendar in use was fetched (inf if never)."""
+        fetched_at = self.snapshot.fetched_at
+        return time.time() - fetched_at if fetched_at else _INF
+
+    def _refresh_loop(self):
+        # A calendar loaded from disk is used until it expires
+        if self._stop.wait(max(0.0, self.CACHE_DURATION - self.news_age())):
+            return
+        while not self._stop.is_set():
+            delay = self.CACHE_DURATION if self.refresh() else self.RETRY_DELAY
+            self._stop.wait(delay)
 
     def _fetch_news(self):
         """
-        Fetches news from the source if cache is expired.
+        Synchronous fallback: fetches news if the cache is expired and no
+        background refresher is running.
         """
+        if self._thread is not None:
+            return
         now = time.time()
-        
+
         # Check Cache Expiry (regardless of empty cache)
         if now - self.last_fetch_time < self.CACHE_DURATION:
             return
 
+        if not self.refresh():
+            # Prevent spamming on error: set last_fetch_time to now - cache + retry_delay
+            # So it waits RETRY_DELAY seconds before trying again
+            self.last_fetch_time = now - self.CACHE_DURATION + self.RETRY_DELAY
+
+    def refresh(self) -> bool:
+        """Downloads and indexes the calendar, then swaps it in. Returns success."""
+        now = time.time()
         try:
-            logger.info("Fetching News Data from Forex Factory...")
-            response = requests.get(self.NEWS_URL, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
+            data = self._read_calendar_file() if self.calendar_file else self._download()
+            if data is None:
+                # Unchanged since the last fetch: only the freshness moves
+                snapshot, boundaries = self._state
+                self._state = (replace(snapshot, fetched_at=now), boundaries)
+                self.last_fetch_time = now
+                self._save_cache()
+                return True
+
             # Filter solely for High Impact to save memory
             # "impact": "High" (Red), "Medium" (Orange), "Low" (Yellow)
-            self.news_cache = [
-                item for item in data 
+            high_impact = [
+                item for item in data
                 if item.get('impact') == 'High'
             ]
+            # Index off the hot path, then publish
+            snapshot = NewsSnapshot.build(high_impact, self.blackout_minutes, fetched_at=now)
+            self.news_cache = high_impact
+            self._set_snapshot(snapshot)
             self.last_fetch_time = now
-            logger.info(f"News Fetched. {len(self.news_cache)} High Impact events found.")
-            
+            self._save_cache()
+            logger.info(f"News Fetched. {len(high_impact)} High Impact events found.")
+            return True
+
         except Exception as e:
             logger.error(f"Failed to fetch news: {e}")
-            # Prevent spamming on error: set last_fetch_time to now - cache + retry_delay
-            # So it waits RETRY_DELAY seconds before trying again
-            self.last_fetch_time = now - self.CACHE_DURATION + self.RETRY_DELAY
+            return False
+
+    def _download(self) -> Optional[List[Dict]]:
+        """Conditional GET. Returns None if the feed is unchanged (304)."""
+        headers = {}
+        if self._etag:
+            headers["If-None-Match"] = self._etag
+        if self._last_modified:
+            headers["If-Modified-Since"] = self._last_modified
+
+        logger.info("Fetching News Data from Forex Factory...")
+        response = requests.get(self.NEWS_URL, headers=headers, timeout=10)
+        if response.status_code == 304:
+            logger.info("News calendar unchanged (304 Not Modified)")
+            return None
+        response.raise_for_status()
+        data = response.json()
+        self._etag = _header(response, "ETag")
+        self._last_modified = _header(response, "Last-Modified")
+        return data
+
+    def _read_calendar_file(self) -> Optional[List[Dict]]:
+        """Offline source. Returns None if the file has not changed since the last read."""
+        mtime = os.path.getmtime(self.calendar_file)
+        if mtime == self._file_mtime:
+            return None
+        logger.info(f"Loading News Calendar from {self.calendar_file}")
+        with open(self.calendar_file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self._file_mtime = mtime
+        return data
+
+    def _load_cache(self):
+        """Startup: publishes the calendar of the previous run (no network)."""
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable news cache {self.cache_path}: {e}")
+            return
+
+        if cached.get("source") != self.NEWS_URL:
+            logger.warning(f"Ignoring news cache {self.cache_path}: not from {self.NEWS_URL}")
+            return
+        events = cached.get("events", [])
+        fetched_at = cached.get("fetched_at", 0.0)
+        if cached.get("blackout_minutes") == self.blackout_minutes:
+            # Dates were parsed when the cache was written
+            snapshot = NewsSnapshot.from_parsed(
+                list(zip(cached.get("event_times", []), events)), self.blackout_minutes, fetched_at
+            )
+        else:
+            snapshot = NewsSnapshot.build(events, self.blackout_minutes, fetched_at)
+        self.news_cache = list(snapshot.events)
+        self._set_snapshot(snapshot)
+        self._etag = cached.get("etag")
+        self._last_modified = cached.get("last_modified")
+        self.last_fetch_time = fetched_at
+        logger.info(f"News Calendar loaded from cache: {len(events)} events, "
+                    f"{self.news_age() / 3600:.1f}h old")
+
+    def _save_cache(self):
+        # An offline calendar must never be picked up by a live run as the feed
+        if not self.cache_path or self.calendar_file:
+            return
+        snapshot = self.snapshot
+        cached = {
+            "source": self.NEWS_URL,
+            "fetched_at": snapshot.fetched_at,
+            "etag": self._etag,
+            "last_modified": self._last_modified,
+            "blackout_minutes": self.blackout_minutes,
+            "events": list(snapshot.events),
+            "event_times": list(snapshot.event_times),
+        }
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+            tmp_path = f"{self.cache_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(cached, f)
+            os.replace(tmp_path, self.cache_path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.error(f"Failed to write news cache: {e}")
+
+    def _set_snapshot(self, snapshot: NewsSnapshot):
+        self._state = (snapshot, {})
+
+    def _symbol_currencies(self, symbol: str) -> Tuple[str, ...]:
+        currencies = self._currencies.get(symbol)
+        if currencies is None:
+            # Standard FX only (e.g. "EURUSD" -> EUR, USD; XAUUSD -> XAU, USD)
+            if len(symbol) == 6:
+                currencies = (symbol[:3], symbol[3:])
+            elif "USD" in symbol:  # catch exotic
+                currencies = ("USD",)
+            else:
+                currencies = ()
+            self._currencies[symbol] = currencies
+        return currencies
 
     def is_news_imminent(self, symbol: str) -> bool:
         """
-        Checks if a High Impact news event is happening now 
+        Checks if a High Impact news event is happening now
         (or upcoming/recent) for the currencies in the pair.
+
+        O(1) while the clock stays inside the cached state of the symbol;
+        a bisect per currency when it crosses a blackout boundary.
         """
         # Ensure we have data
         self._fetch_news()
-        
-        if not self.news_cache:
-            return False
 
-        # Parse Symbol (e.g. "EURUSD" -> ["EUR", "USD"])
-        # Standard FX only. For XAUUSD -> ["XAU", "USD"]
-        # Very naive splitter, assumes 3+3 chars or matches. 
-        # Safer: Check containment.
-        
-        # Build set of relevant currencies
-        relevant = set()
-        # Common pairs logic
-        if len(symbol) == 6:
-            relevant.add(symbol[:3])
-            relevant.add(symbol[3:])
-        elif "USD" in symbol: # catch exotic
-            relevant.add("USD")
-            
-        now_utc = datetime.utcnow()
-        margin = timedelta(minutes=self.blackout_minutes)
-        window_start = now_utc - margin
-        window_end = now_utc + margin
-
-        for event in self.news_cache:
-            country = event.get('country') # e.g. "USD", "EUR"
-            if country not in relevant:
+        snapshot, boundaries = self._state
+        now = _to_epoch(datetime.utcnow())
+        cached = boundaries.get(symbol)
+        if cached is not None:
+            active, since, until = cached
+            if since < now < until:
+                return active
+
+        # Boundary crossed (or first query): bisect each currency's timeline.
+        # The result holds until the nearest boundary of any of them.
+        active, since, until, titles = False, -_INF, _INF, []
+        timelines = snapshot.timelines
+        for ccy in self._symbol_currencies(symbol):
+            timeline = timelines.get(ccy)
+            if timeline is None:
                 continue
+            c_active, c_since, c_until, c_title = timeline.locate(now)
+            since, until = max(since, c_since), min(until, c_until)
+            if c_active:
+                active = True
+                titles.append(f"{c_title} ({ccy})")
+        boundaries[symbol] = (active, since, until)
 
-            # Parse Event Time
-            # Format usually: "2024-01-24T14:30:00-04:00" or similar
-            # Actually the JSON feed usually has "date" like "2024-01-29T15:00:00+00:00"
-            date_str = event.get('date')
-            try:
-                # We need to handle offsets. 
-                # For robustness, we'll try standard ISO parsing
-                # Python 3.9+ handles 'Z' or offset if valid iso.
-                event_time = datetime.fromisoformat(date_str)
-                # Ensure events are UTC comparable. 
-                # If offset aware, convert to UTC (naive) or just compare aware.
-                # Assuming now_utc is naive, we might have issues.
-                # Let's clean offset 
-                # Strict UTC handling
-                if event_time.tzinfo is not None:
-                     # Convert to UTC then strip info to match utcnow()
-                     event_time = event_time.astimezone(timezone.utc).replace(tzinfo=None)
-                
-                if window_start <= event_time <= window_end:
-                    logger.warning(f"News Blackout: {event['title']} ({country}) at {date_str}")
-                    return True
+        if active:
+            logger.warning(f"News Blackout {symbol}: {'; '.join(titles)}")
+        return active
 
-            except Exception:
-                continue
-                
-        return False
     def get_upcoming_events(self, limit: int = 5) -> List[Dict]:
         """
         Returns the next upcoming high-impact events.
         """
         self._fetch_news()
-        
-        now_utc = datetime.utcnow()
-        if hasattr(datetime, "fromisoformat"):
-             # Simple filter for future events
-             pass
-             
-        future_events = []
-        for event in self.news_cache:
-            try:
-                date_str = event.get('date')
-                event_time = datetime.fromisoformat(date_str)
-                if event_time.tzinfo is not None:
-                     event_time = event_time.astimezone(timezone.utc).replace(tzinfo=None)
-                
-                if event_time > now_utc:
-                    future_events.append(event)
-            except:
-                continue
-                
-        # Sort by time just in case
-        # (Feed is usually sorted but not guaranteed)
-        future_events.sort(key=lambda x: x['date'])
-        
-        return future_events[:limit]
+
+        snapshot = self.snapshot
+        now = _to_epoch(datetime.utcnow())
+        start = bisect_right(snapshot.event_times, now)
+        return list(snapshot.events[start:start + limit])
@@ -0,0 +1,117 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class StateStore:
+    """
+    Durable key/value store for engine and risk state (SQLite, WAL mode).
+
+    put() only records the latest value per key in memory; a background
+    writer serializes and commits everything pending in one transaction
+    every flush_interval seconds, so the strategy loop never waits on disk.
+    Keys are scoped by namespace (e.g. LIVE / DRY-RUN share one file).
+    """
+    def __init__(self, path: str, namespace: str = "default", flush_interval: float = 1.0):
+        self.path = path
+        self.namespace = namespace
+        self.flush_interval = flush_interval
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self._db_lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS state ("
+            " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, updated_at REAL NOT NULL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Any] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Starts the background writer (idempotent)."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._writer, name="StateStore", daemon=True)
+            self._thread.start()
+
+    def put(self, key: str, value: Any):
+        """Queues a JSON-serializable value. The latest value per key wins."""
+        with self._lock:
+            self._pending[key] = value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            if key in self._pending:
+                return self._pending[key]
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT value FROM state WHERE namespace = ? AND key = ?", (self.namespace, key)
+            ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def load(self) -> Dict[str, Any]:
+        """Every key of the namespace in one query (used for warm restart)."""
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT key, value FROM state WHERE namespace = ?", (self.namespace,)
+            ).fetchall()
+        state = {key: json.loads(value) for key, value in rows}
+        with self._lock:
+            state.update(self._pending)
+        return state
+
+    def flush(self) -> int:
+        """Writes everything pending in a single transaction. Returns keys written."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        now = time.time()
+        rows = []
+        for key, value in pending.items():
+            try:
+                rows.append((self.namespace, key, json.dumps(value), now))
+            except (TypeError, ValueError) as e:
+                logger.error(f"State '{key}' is not serializable: {e}")
+        try:
+            with self._db_lock:
+                self._conn.execute("BEGIN")
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO state (namespace, key, value, updated_at) VALUES (?, ?, ?, ?)", rows
+                )
+                self._conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            logger.error(f"State flush failed: {e}")
+            with self._db_lock:
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+            # Keep the values for the next attempt unless newer ones arrived
+            with self._lock:
+                for key, value in pending.items():
+                    self._pending.setdefault(key, value)
+            return 0
+        return len(rows)
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.flush()
+        with self._db_lock:
+            self._conn.close()
+
+    def _writer(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
@@ -0,0 +1,150 @@
+import csv
+import logging
+import threading
+from collections import Counter, deque
+from dataclasses import asdict, dataclass, fields
+from datetime import datetime, timezone
+from typing import Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class ExecutionRecord:
+    """Timing and price quality of one order sent to the broker."""
+    timestamp: float          # Epoch seconds when the broker answered
+    symbol: str
+    direction: str            # Side of the order sent: "BUY" or "SELL"
+    success: bool
+    retcode: Optional[int]
+    queue_ms: float           # Enqueue -> picked up by a worker
+    send_ms: float            # Total order_send round-trip(s)
+    requested_price: float
+    fill_price: float
+    slippage_points: float    # Positive = worse than requested
+    retries: int = 0
+    attempt_retcodes: Tuple[Optional[int], ...] = ()  # Retcode of every attempt, in order
+
+    @property
+    def hour(self) -> int:
+        return datetime.fromtimestamp(self.timestamp, tz=timezone.utc).hour
+
+def slippage_points(direction: str, requested: float, filled: float, point: float) -> float:
+    """Adverse slippage in points: buys filled higher / sells filled lower are positive."""
+    if not point or not requested or not filled:
+        return 0.0
+    diff = (filled - requested) / point
+    return diff if direction == "BUY" else -diff
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+class ExecutionStats:
+    """
+    Rolling execution statistics, aggregated per symbol and per UTC hour.
+    Each bucket keeps the last `window` records, so memory and query cost
+    are bounded. Written from order worker threads, read from the UI thread.
+    """
+    def __init__(self, window: int = 500):
+        self.window = window
+        self._lock = threading.Lock()
+        self._records: Deque[ExecutionRecord] = deque(maxlen=window * 4)
+        self._by_symbol: Dict[str, Deque[ExecutionRecord]] = {}
+        self._by_hour: Dict[int, Deque[ExecutionRecord]] = {}
+        self._retcodes: Counter = Counter()
+
+    def record(self, rec: ExecutionRecord):
+        with self._lock:
+            self._records.append(rec)
+            self._by_symbol.setdefault(rec.symbol, deque(maxlen=self.window)).append(rec)
+            self._by_hour.setdefault(rec.hour, deque(maxlen=self.window)).append(rec)
+            # Count every attempt, so requotes show up even when the retry filled
+            for retcode in rec.attempt_retcodes or (rec.retcode,):
+                self._retcodes[retcode] += 1
+
+    def summary(self, symbol: Optional[str] = None, hour: Optional[int] = None) -> Dict:
+        with self._lock:
+            if symbol is not None:
+                records = list(self._by_symbol.get(symbol, ()))
+            elif hour is not None:
+                records = list(self._by_hour.get(hour, ()))
+            else:
+                records = list(self._records)
+        return self._summarize(records)
+
+    def by_symbol(self) -> Dict[str, Dict]:
+        with self._lock:
+            buckets = {k: list(v) for k, v in self._by_symbol.items()}
+        return {k: self._summarize(v) for k, v in sorted(buckets.items())}
+
+    def by_hour(self) -> Dict[int, Dict]:
+        with self._lock:
+            buckets = {k: list(v) for k, v in self._by_hour.items()}
+        return {k: self._summarize(v) for k, v in sorted(buckets.items())}
+
+    def retcode_distribution(self) -> Dict[Optional[int], int]:
+        with self._lock:
+            return dict(self._retcodes)
+
+    def export_csv(self, path: str) -> int:
+        """Writes the rolling record window to CSV. Returns rows written."""
+        with self._lock:
+            records = list(self._records)
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=[fl.name for fl in fields(ExecutionRecord)])
+            writer.writeheader()
+            for rec in records:
+                writer.writerow(asdict(rec))
+        logger.info(f"Exported {len(records)} execution records to {path}")
+        return len(records)
+
+    def format_report(self, symbol: Optional[str] = None) -> str:
+        """HTML summary for Telegram."""
+        title = f"EXECUTION STATS {symbol}" if symbol else "EXECUTION STATS"
+        overall = self.summary(symbol=symbol)
+        if not overall["count"]:
+            return f"<b>{title}</b>\nNo orders recorded yet."
+
+        lines = [f"<b>{title}</b>", self._format_line("All", overall)]
+        if symbol is None:
+            lines.append("\n<b>Per Symbol</b>")
+            lines.extend(self._format_line(sym, s) for sym, s in self.by_symbol().items())
+            lines.append("\n<b>Per Hour (UTC)</b>")
+            lines.extend(self._format_line(f"{hour:02d}h", s) for hour, s in self.by_hour().items())
+        codes = ", ".join(f"{k}:{v}" for k, v in self.retcode_distribution().items())
+        lines.append(f"\nRetcodes: <code>{codes}</code>")
+        return "\n".join(lines)
+
+    @staticmethod
+    def _format_line(label: str, s: Dict) -> str:
+        return (
+            f"<code>{label:<7}</code> n={s['count']} fill={s['fill_rate']:.0%} "
+            f"send p50/p95={s['send_ms_p50']:.0f}/{s['send_ms_p95']:.0f}ms "
+            f"queue={s['queue_ms_avg']:.0f}ms slip={s['slippage_avg']:.1f}pt "
+            f"retries={s['retries']}"
+        )
+
+    @staticmethod
+    def _summarize(records: List[ExecutionRecord]) -> Dict:
+        if not records:
+            return {
+                "count": 0, "fill_rate": 0.0, "send_ms_avg": 0.0, "send_ms_p50": 0.0,
+                "send_ms_p95": 0.0, "queue_ms_avg": 0.0, "slippage_avg": 0.0,
+                "slippage_max": 0.0, "retries": 0,
+            }
+        send = sorted(r.send_ms for r in records)
+        filled = [r for r in records if r.success]
+        slips = [r.slippage_points for r in filled]
+        return {
+            "count": len(records),
+            "fill_rate": len(filled) / len(records),
+            "send_ms_avg": sum(send) / len(send),
+            "send_ms_p50": _percentile(send, 50),
+            "send_ms_p95": _percentile(send, 95),
+            "queue_ms_avg": sum(r.queue_ms for r in records) / len(records),
+            "slippage_avg": (sum(slips) / len(slips)) if slips else 0.0,
+            "slippage_max": max(slips) if slips else 0.0,
+            "retries": sum(r.retries for r in records),
+        }
@@ -1,16 +1,49 @@
 import logging
 import time
-import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
 from modules.data.mt5_loader import MT5
+from modules.execution.analytics import ExecutionRecord, ExecutionStats, slippage_points
+from modules.execution.pipeline import BulkCloseReport, OrderAttempt, OrderPipeline, OrderRequest, OrderResult
+from modules.execution.position_cache import ClosedTrade, PositionCache, pair_name
 from config.config import Config
 
 logger = logging.getLogger(__name__)
 
+# MT5 trade server return codes
+RETCODE_REQUOTE = 10004
+RETCODE_DONE = 10009
+RETCODE_PRICE_CHANGED = 10020
+RETCODE_PRICE_OFF = 10021
+RETCODE_INVALID_FILL = 10030
+RETRYABLE_RETCODES = {RETCODE_REQUOTE, RETCODE_PRICE_CHANGED, RETCODE_PRICE_OFF}
+
+# symbol_info().filling_mode flags
+SYMBOL_FILLING_FOK = 1
+SYMBOL_FILLING_IOC = 2
+
 class OrderManager:
     def __init__(self):
         self.magic_number = Config.MAGIC_NUMBER
-        self.slippage = 10 
-        self._lock = threading.Lock() 
+        self.slippage = Config.DEVIATION_POINTS
+        # Orders run on a dedicated worker pool, serialized per symbol
+        self.pipeline = OrderPipeline(self._send_order, max_workers=Config.ORDER_WORKERS)
+        # Separate pool so a panic close never queues behind new entries
+        self._close_executor = ThreadPoolExecutor(max_workers=Config.CLOSE_WORKERS, thread_name_prefix="CloseAll")
+        self.close_rounds = 3
+        # Smart retry: bounded by count AND by a latency budget per order
+        self.max_retries = Config.MAX_RETRIES
+        self.retry_budget_ms = Config.RETRY_BUDGET_MS
+        # Per-order latency / slippage analytics
+        self.stats = ExecutionStats()
+        self._symbol_info_cache = {}
+        self._filling_modes = {}  # symbol -> ORDER_FILLING_* the broker accepted
+        # One positions/deals sync per loop instead of a query per symbol
+        self.position_cache = PositionCache(self.magic_number)
+
+    def account_info(self):
+        """Returns the live MT5 account info (balance, equity, margin...)."""
+        return MT5.account_info()
 
     def get_open_positions(self, symbol: str = None) -> list:
         """
@@ -36,96 +69,333 @@ class OrderManager:
         """Returns number of open trades for a symbol managed by this bot."""
         return len(self.get_open_positions(symbol))
 
+    def sync_positions(self) -> List[ClosedTrade]:
+        """Refreshes the position cache once per loop. Returns trades closed since the last sync."""
+        return self.position_cache.sync()
+
+    def cached_open_trades(self, symbol: str) -> int:
+        """Open trades for a symbol as of the last sync_positions() (no terminal call)."""
+        return self.position_cache.count(symbol)
+
+    def cached_positions(self, symbol: str = None) -> list:
+        """Open positions as of the last sync_positions() (no terminal call)."""
+        return self.position_cache.get(symbol)
+
+    def subscribe_closes(self, callback: Callable[[ClosedTrade], None]):
+        """Registers a callback fired for every closing deal detected by sync_positions()."""
+        self.position_cache.subscribe(callback)
+
     def execute_trade(self, symbol: str, direction: str, volume: float, sl: float, tp: float, comment: str = "") -> bool:
         """
-        Executes a market order.
+        Executes a market order synchronously (blocks until the broker answers).
         direction: "BUY" or "SELL"
         volume: Lots
         sl: Stop Loss Price
         tp: Take Profit Price
+        Prefer submit_trade() from the scanning thread.
         """
+        request = OrderRequest(symbol, direction, volume, sl, tp, comment)
+        # Thread Safety: serialize the position check + send per symbol
+        with self.pipeline.symbol_lock(symbol):
+            return self._send_order(request).success
+
+    def submit_trade(self, symbol: str, direction: str, volume: float, sl: float, tp: float,
+                     comment: str = "", meta: Optional[dict] = None) -> Optional[Future]:
+        """
+        Enqueues a market order on the order pipeline and returns immediately.
+        Returns None if the symbol already has an order in flight.
+        The OrderResult is available from the Future and from drain_order_results().
+        """
+        request = OrderRequest(symbol, direction, volume, sl, tp, comment, meta or {})
+        return self.pipeline.submit(request)
+
+    def has_pending_order(self, symbol: str) -> bool:
+        return self.pipeline.is_pending(symbol)
+
+    def pending_orders(self) -> List[Tuple[str, str]]:
+        """(symbol, direction) of every order still in flight."""
+        return [(r.symbol, r.direction) for r in self.pipeline.pending()]
+
+    def drain_order_results(self) -> List[OrderResult]:
+        return self.pipeline.drain()
+
+    def shutdown(self):
+        self.pipeline.shutdown(wait=True)
+        self._close_executor.shutdown(wait=True)
+
+    def _send_order(self, request: OrderRequest) -> OrderResult:
+        """Pipeline handler. Caller must hold the symbol lock."""
+        symbol, direction, volume = request.symbol, request.direction, request.volume
+        picked = time.perf_counter()
+        queue_ms = (picked - request.queued_at) * 1000.0 if request.queued_at else 0.0
+
         # 1. Check existing positions (One trade per symbol rule)
-        # Note: Depending on strategy, we might allow scaling. For now, strict 1 trade.
-        # This check might be done upstream in logic, but good as a safety guard here.
-        # But maybe we want to allow multiple? The spec said "One trade per symbol".
-        # 1. Check existing positions (One trade per symbol rule)
-        # Thread Safety: Lock this check + execution block
-        with self._lock:
-            if self.count_open_trades(symbol) > 0:
-                logger.warning(f"Trade rejected: Position already exists for {symbol}")
-                return False
+        # This check is also done upstream in logic, but good as a safety guard here.
+        if self.count_open_trades(symbol) > 0:
+            logger.warning(f"Trade rejected: Position already exists for {symbol}")
+            return OrderResult(request, success=False, comment="POSITION_EXISTS")
 
-            # 2. Get current price for filling info
-            mt_symbol = Config.get_mt5_symbol(symbol)
-            tick = MT5.symbol_info_tick(mt_symbol)
-            if tick is None:
-                logger.error(f"Trade failed: No tick data for {mt_symbol}")
-                return False
-
-            if direction == "BUY":
-                order_type = MT5.ORDER_TYPE_BUY
-                price = tick.ask
-            elif direction == "SELL":
-                order_type = MT5.ORDER_TYPE_SELL
-                price = tick.bid
-            else:
-                logger.error(f"Invalid direction: {direction}")
-                return False
-
-            # 3. Construct Request
-            request = {
-                "action": MT5.TRADE_ACTION_DEAL,
-                "symbol": mt_symbol,
-                "volume": float(volume),
-                "type": order_type,
-                "price": price,
-                "sl": float(sl),
-                "tp": float(tp),
-                "deviation": self.slippage,
-                "magic": self.magic_number,
-                "comment": comment or "ScalpMaster v1.2",
-                "type_time": MT5.ORDER_TIME_GTC,
-                "type_filling": MT5.ORDER_FILLING_IOC, # Immediate or Cancel often safer than FOK
-            }
+        # 2. Get current price for filling info
+        mt_symbol = Config.get_mt5_symbol(symbol)
+        tick = MT5.symbol_info_tick(mt_symbol)
+        if tick is None:
+            logger.error(f"Trade failed: No tick data for {mt_symbol}")
+            return OrderResult(request, success=False, comment="NO_TICK")
+
+        if direction == "BUY":
+            order_type = MT5.ORDER_TYPE_BUY
+            price = tick.ask
+        elif direction == "SELL":
+            order_type = MT5.ORDER_TYPE_SELL
+            price = tick.bid
+        else:
+            logger.error(f"Invalid direction: {direction}")
+            return OrderResult(request, success=False, comment="INVALID_DIRECTION")
+
+        # 3. Construct Request (filling mode is chosen per symbol by _send_with_retry)
+        order = {
+            "action": MT5.TRADE_ACTION_DEAL,
+            "symbol": mt_symbol,
+            "volume": float(volume),
+            "type": order_type,
+            "price": price,
+            "sl": float(request.sl),
+            "tp": float(request.tp),
+            "deviation": self.slippage,
+            "magic": self.magic_number,
+            "comment": request.comment or "ScalpMaster v1.2",
+            "type_time": MT5.ORDER_TIME_GTC,
+        }
+
+        # 4. Send Order (requote / filling-mode aware)
+        started = time.perf_counter()
+        result, attempts = self._send_with_retry(order, symbol)
+        finished = time.perf_counter()
+        send_ms = (finished - started) * 1000.0
+        fill_price = self._record_execution(symbol, direction, result, queue_ms, send_ms, price, attempts)
 
-            # 4. Send Order
-            result = MT5.order_send(request)
-        
         # 5. Check Result
         if result is None:
             logger.error("Order send failed: Result is None")
-            return False
-            
-        if result.retcode != 10009: # 10009 is TRADE_RETCODE_DONE
-            logger.error(f"Order failed: {result.retcode} ({result.comment})")
-            return False
-            
-        logger.info(f"Trade Executed: {direction} {volume} {symbol} @ {price}. Ticket: {result.order}")
-        return True
+            return OrderResult(request, success=False, price=price, comment="NO_RESULT", attempts=attempts,
+                               started_at=picked, finished_at=finished)
+
+        if result.retcode != RETCODE_DONE:
+            logger.error(f"Order failed: {result.retcode} ({result.comment}) after {len(attempts)} attempt(s)")
+            return OrderResult(request, success=False, retcode=result.retcode, price=price,
+                               comment=str(result.comment), attempts=attempts,
+                               started_at=picked, finished_at=finished)
+
+        logger.info(
+            f"Trade Executed: {direction} {volume} {symbol} @ {fill_price} (requested {price}, "
+            f"{send_ms:.0f} ms, {len(attempts)} attempt(s)). Ticket: {result.order}"
+        )
+        return OrderResult(request, success=True, retcode=result.retcode, price=price, ticket=result.order,
+                           fill_price=fill_price, attempts=attempts, started_at=picked, finished_at=finished)
+
+    def _send_with_retry(self, order: dict, symbol: str) -> Tuple[object, List[OrderAttempt]]:
+        """
+        Sends an order with a bounded retry loop (max_retries and retry_budget_ms):
+          - requote / price changed / price off -> resend at a freshly read price
+          - unsupported filling mode            -> fall back to the next mode and cache it
+        Runs on an order worker, never on the scanning thread.
+        """
+        attempts: List[OrderAttempt] = []
+        deadline = time.perf_counter() + self.retry_budget_ms / 1000.0
+        candidates = self._filling_candidates(symbol)
+        tried = set()
+        order = dict(order, type_filling=candidates[0])
+
+        while True:
+            tried.add(order["type_filling"])
+            t0 = time.perf_counter()
+            result = MT5.order_send(order)
+            retcode = result.retcode if result is not None else None
+            attempts.append(OrderAttempt(retcode, order["price"], order["type_filling"], (time.perf_counter() - t0) * 1000.0))
+
+            if retcode == RETCODE_DONE:
+                self._filling_modes[symbol] = order["type_filling"]
+                break
+            if result is None or len(attempts) > self.max_retries or time.perf_counter() >= deadline:
+                break
+
+            if retcode == RETCODE_INVALID_FILL:
+                remaining = [m for m in candidates if m not in tried]
+                if not remaining:
+                    break
+                logger.warning(f"{symbol}: filling mode {order['type_filling']} rejected, trying {remaining[0]}")
+                order = dict(order, type_filling=remaining[0])
+            elif retcode in RETRYABLE_RETCODES:
+                tick = MT5.symbol_info_tick(order["symbol"])
+                if tick is None:
+                    break
+                order = dict(order, price=tick.ask if order["type"] == MT5.ORDER_TYPE_BUY else tick.bid)
+            else:
+                break
+
+        return result, attempts
+
+    def _filling_candidates(self, symbol: str) -> list:
+        """
+        ORDER_FILLING_* modes to try, best first: the mode that last worked,
+        then whatever symbol_info().filling_mode advertises, RETURN last.
+        """
+        modes = []
+        cached = self._filling_modes.get(symbol)
+        if cached is not None:
+            modes.append(cached)
+
+        info = self._symbol_info(symbol)
+        flags = getattr(info, "filling_mode", None) if info else None
+        if not isinstance(flags, int) or flags <= 0:
+            flags = SYMBOL_FILLING_IOC | SYMBOL_FILLING_FOK  # Unknown: keep the historic IOC default first
+        if flags & SYMBOL_FILLING_IOC:
+            modes.append(MT5.ORDER_FILLING_IOC) # Immediate or Cancel often safer than FOK
+        if flags & SYMBOL_FILLING_FOK:
+            modes.append(MT5.ORDER_FILLING_FOK)
+        modes.append(MT5.ORDER_FILLING_RETURN)
+
+        unique = []
+        for mode in modes:
+            if mode not in unique:
+                unique.append(mode)
+        return unique
+
+    def _record_execution(self, symbol: str, direction: str, result, queue_ms: float, send_ms: float,
+                          requested: float, attempts: Optional[List[OrderAttempt]] = None) -> float:
+        """Feeds ExecutionStats. Returns the fill price (requested price if the broker gave none)."""
+        done = result is not None and result.retcode == RETCODE_DONE
+        fill_price = getattr(result, "price", None) if result is not None else None
+        if not isinstance(fill_price, (int, float)) or fill_price <= 0:
+            fill_price = requested if done else 0.0
+        point = self._symbol_point(symbol)
+        self.stats.record(ExecutionRecord(
+            timestamp=time.time(),
+            symbol=symbol,
+            direction=direction,
+            success=done,
+            retcode=result.retcode if result is not None else None,
+            queue_ms=queue_ms,
+            send_ms=send_ms,
+            requested_price=requested,
+            fill_price=fill_price,
+            slippage_points=slippage_points(direction, requested, fill_price, point) if done else 0.0,
+            retries=max(0, len(attempts) - 1) if attempts else 0,
+            attempt_retcodes=tuple(a.retcode for a in attempts) if attempts else (),
+        ))
+        return fill_price
+
+    def _symbol_info(self, symbol: str):
+        """Symbol metadata, cached (it does not change during a session)."""
+        info = self._symbol_info_cache.get(symbol)
+        if info is None:
+            info = MT5.symbol_info(Config.get_mt5_symbol(symbol))
+            if info is not None:
+                self._symbol_info_cache[symbol] = info
+        return info
+
+    def _symbol_point(self, symbol: str) -> float:
+        info = self._symbol_info(symbol)
+        point = getattr(info, "point", None) if info else None
+        return point if isinstance(point, (int, float)) and point > 0 else 0.00001
 
     def close_trade(self, ticket: int, symbol: str) -> bool:
         """
         Closes a specific trade by ticket.
         """
-        # To close, we open an opposite order with position ticket specified? 
-        # Or usually just TRADE_ACTION_DEAL with TYPE_OPPOSITE.
-        # Actually simpler is usually just SELL for BUY position.
-        
+        # To close, we send an opposite TRADE_ACTION_DEAL with the position ticket specified.
         # We need position info to get volume
         positions = MT5.positions_get(ticket=ticket)
         if not positions:
             logger.error(f"Cannot close trade {ticket}: Position not found")
             return False
-            
-        position = positions[0]
-        
+
         position = positions[0]
-        
-        mt_symbol = Config.get_mt5_symbol(symbol)
-        tick = MT5.symbol_info_tick(mt_symbol)
+        tick = MT5.symbol_info_tick(position.symbol)
         if not tick:
             return False
-            
+
+        result = self._send_close(self._build_close_request(position, tick), symbol)
+        if result is None or result.retcode != RETCODE_DONE:
+            logger.error(f"Close failed: {result.retcode if result else 'No result'}")
+            return False
+
+        logger.info(f"Trade Closed: {ticket} for {symbol}")
+        return True
+
+    def modify_sltp(self, ticket: int, symbol: str, sl: float, tp: float) -> bool:
+        """Moves the SL/TP of an open position (TRADE_ACTION_SLTP)."""
+        request = {
+            "action": MT5.TRADE_ACTION_SLTP,
+            "position": ticket,
+            "symbol": Config.get_mt5_symbol(symbol),
+            "sl": sl,
+            "tp": tp,
+            "magic": self.magic_number,
+        }
+        result = MT5.order_send(request)
+        if result is None or result.retcode != RETCODE_DONE:
+            logger.error(f"SL/TP modify failed for {ticket} ({symbol}): {result.retcode if result else 'No result'}")
+            return False
+        return True
+
+    def close_all_trades(self) -> BulkCloseReport:
+        """
+        Emergency flatten. Takes ONE positions snapshot and ONE tick per symbol,
+        builds every close request up front and dispatches them concurrently.
+        Requotes are retried with a fresh price. Positions that appear while
+        closing (e.g. an order that was in flight) are swept in a follow-up round.
+        """
+        started = time.perf_counter()
+        report = BulkCloseReport()
+        seen = set()
+
+        for _ in range(self.close_rounds):
+            positions = self.get_open_positions()
+            if not positions:
+                break
+            seen.update(p.ticket for p in positions)
+            report.requested = len(seen)
+
+            # One tick per symbol, not per position
+            ticks = {}
+            for sym in {p.symbol for p in positions}:
+                ticks[sym] = MT5.symbol_info_tick(sym)
+
+            requests = []
+            for position in positions:
+                tick = ticks.get(position.symbol)
+                if tick is None:
+                    report.failed[position.ticket] = "NO_TICK"
+                    continue
+                requests.append(self._build_close_request(position, tick))
+
+            futures = {
+                self._close_executor.submit(self._send_close, req, self._pair_name(req["symbol"])): req
+                for req in requests
+            }
+            for future, req in futures.items():
+                ticket = req["position"]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    report.failed[ticket] = str(e)
+                    continue
+                if result is not None and result.retcode == RETCODE_DONE:
+                    report.closed.append(ticket)
+                    report.failed.pop(ticket, None)
+                else:
+                    report.failed[ticket] = str(result.retcode) if result is not None else "NO_RESULT"
+
+        report.remaining = len(self.get_open_positions())
+        report.elapsed_ms = (time.perf_counter() - started) * 1000.0
+        logger.warning(
+            f"Close All: {len(report.closed)} closed, {len(report.failed)} failed, "
+            f"{report.remaining} remaining. Time to flat: {report.elapsed_ms:.1f} ms"
+        )
+        return report
+
+    def _build_close_request(self, position, tick) -> dict:
         if position.type == MT5.ORDER_TYPE_BUY:
             type_close = MT5.ORDER_TYPE_SELL
             price = tick.bid
@@ -133,23 +403,26 @@ class OrderManager:
             type_close = MT5.ORDER_TYPE_BUY
             price = tick.ask
 
-        request = {
+        return {
             "action": MT5.TRADE_ACTION_DEAL,
-            "symbol": mt_symbol,
+            "symbol": position.symbol,
             "volume": position.volume, # Close full volume
             "type": type_close,
-            "position": ticket, # Important!
+            "position": position.ticket, # Important!
             "price": price,
             "deviation": self.slippage,
             "magic": self.magic_number,
             "type_time": MT5.ORDER_TIME_GTC,
-            "type_filling": MT5.ORDER_FILLING_IOC,
         }
 
-        result = MT5.order_send(request)
-        if result.retcode != 10009:
-            logger.error(f"Close failed: {result.retcode}")
-            return False
-            
-        logger.info(f"Trade Closed: {ticket} for {symbol}")
-        return True
+    def _send_close(self, request: dict, symbol: str):
+        """Sends a close through the same retry loop as entries and records it."""
+        started = time.perf_counter()
+        result, attempts = self._send_with_retry(request, symbol)
+        send_ms = (time.perf_counter() - started) * 1000.0
+        # Slippage sign follows the closing side
+        side = "SELL" if request["type"] == MT5.ORDER_TYPE_SELL else "BUY"
+        self._record_execution(symbol, side, result, 0.0, send_ms, request["price"], attempts)
+        return result
+
+    _pair_name = staticmethod(pair_name)
@@ -0,0 +1,147 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class OrderRequest:
+    """A confirmed signal waiting to be sent to the broker."""
+    symbol: str
+    direction: str  # "BUY" or "SELL"
+    volume: float
+    sl: float
+    tp: float
+    comment: str = ""
+    meta: Dict[str, Any] = field(default_factory=dict)  # Carried through to the result (e.g. risk %)
+    queued_at: float = 0.0  # perf_counter() when enqueued
+
+@dataclass(frozen=True)
+class OrderAttempt:
+    """One order_send call inside the retry loop."""
+    retcode: Optional[int]
+    price: float
+    filling: int       # ORDER_FILLING_* used
+    elapsed_ms: float
+
+@dataclass
+class OrderResult:
+    """Outcome of an OrderRequest, reconciled back into the engine thread."""
+    request: OrderRequest
+    success: bool
+    retcode: Optional[int] = None
+    price: float = 0.0        # Requested price
+    fill_price: float = 0.0   # Price reported by the broker
+    ticket: Optional[int] = None
+    comment: str = ""
+    attempts: List[OrderAttempt] = field(default_factory=list)
+    started_at: float = 0.0   # perf_counter() when a worker picked it up
+    finished_at: float = 0.0  # perf_counter() when the broker answered
+
+@dataclass
+class BulkCloseReport:
+    """Summary of a close_all_trades() sweep."""
+    requested: int = 0
+    closed: List[int] = field(default_factory=list)
+    failed: Dict[int, str] = field(default_factory=dict)  # ticket -> reason / retcode
+    remaining: int = 0       # Positions still open after the sweep
+    elapsed_ms: float = 0.0  # Time until the account was flat (or gave up)
+
+    @property
+    def is_flat(self) -> bool:
+        return self.remaining == 0
+
+class OrderPipeline:
+    """
+    Decouples order latency from scan latency.
+
+    Signals are submitted from the scanning thread and executed by a
+    dedicated worker pool. Orders for the same symbol are serialized
+    (one in flight at a time, which also enforces the one-trade-per-symbol
+    guard), while different symbols proceed in parallel. Results are
+    queued and drained by the engine loop, so engine state is only ever
+    touched from its own thread.
+
+    max_workers=0 runs every order inline (used by the simulator).
+    """
+    def __init__(self, handler: Callable[[OrderRequest], OrderResult], max_workers: int = 2):
+        self._handler = handler
+        self._executor = (
+            ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="OrderPipeline")
+            if max_workers > 0 else None
+        )
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, OrderRequest] = {}
+        self._symbol_locks: Dict[str, threading.Lock] = {}
+        self._results: "queue.SimpleQueue[OrderResult]" = queue.SimpleQueue()
+
+    def submit(self, request: OrderRequest) -> Optional[Future]:
+        """
+        Enqueues an order. Returns None if an order for the same symbol
+        is already in flight, otherwise a Future resolving to OrderResult.
+        """
+        with self._lock:
+            if request.symbol in self._in_flight:
+                logger.warning(f"Order rejected: {request.symbol} already has an order in flight")
+                return None
+            self._in_flight[request.symbol] = request
+        request.queued_at = time.perf_counter()
+
+        if self._executor is None:
+            future: Future = Future()
+            future.set_result(self._run(request))
+            return future
+        return self._executor.submit(self._run, request)
+
+    def symbol_lock(self, symbol: str) -> threading.Lock:
+        with self._lock:
+            lock = self._symbol_locks.get(symbol)
+            if lock is None:
+                lock = self._symbol_locks[symbol] = threading.Lock()
+            return lock
+
+    def is_pending(self, symbol: str) -> bool:
+        return symbol in self._in_flight
+
+    def pending(self) -> List[OrderRequest]:
+        """Requests submitted but not yet answered by the broker."""
+        with self._lock:
+            return list(self._in_flight.values())
+
+    def pending_count(self) -> int:
+        return len(self._in_flight)
+
+    def drain(self) -> List[OrderResult]:
+        """Returns every result completed since the last call (non-blocking)."""
+        results = []
+        while True:
+            try:
+                results.append(self._results.get_nowait())
+            except queue.Empty:
+                return results
+
+    def shutdown(self, wait: bool = True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+
+    def _run(self, request: OrderRequest) -> OrderResult:
+        started = time.perf_counter()
+        try:
+            with self.symbol_lock(request.symbol):
+                result = self._handler(request)
+        except Exception as e:
+            logger.exception(f"Order pipeline error for {request.symbol}: {e}")
+            result = OrderResult(request=request, success=False, comment=str(e))
+        finally:
+            with self._lock:
+                self._in_flight.pop(request.symbol, None)
+        if not result.started_at:
+            result.started_at = started
+        if not result.finished_at:
+            result.finished_at = time.perf_counter()
+        self._results.put(result)
+        return result
@@ -0,0 +1,176 @@
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Set
+
+from config.config import Config
+from modules.data.mt5_loader import MT5
+
+logger = logging.getLogger(__name__)
+
+# deal.entry values
+DEAL_ENTRY_IN = 0
+DEAL_ENTRY_OUT = 1
+DEAL_ENTRY_INOUT = 2
+DEAL_ENTRY_OUT_BY = 3
+_EXIT_ENTRIES = {DEAL_ENTRY_OUT, DEAL_ENTRY_INOUT, DEAL_ENTRY_OUT_BY}
+
+@dataclass(frozen=True)
+class ClosedTrade:
+    """A (full or partial) position exit, emitted once per closing deal."""
+    position_id: int
+    symbol: str        # Pair name without broker suffix
+    volume: float
+    close_price: float
+    profit: float      # Net: profit + commission + swap
+    time: float        # Deal time (epoch seconds)
+    reason: str = ""   # e.g. "SL", "TP", "MANUAL"
+
+def pair_name(mt_symbol: str) -> str:
+    """Strips the broker suffix: "EURUSD.a" -> "EURUSD"."""
+    suffix = Config.MT5_SUFFIX
+    return mt_symbol[:-len(suffix)] if suffix and mt_symbol.endswith(suffix) else mt_symbol
+
+class PositionCache:
+    """
+    Open positions and closed-deal history for our Magic Number.
+
+    sync() makes exactly two terminal calls per loop: one positions_get()
+    for every symbol at once, and one history_deals_get() covering only
+    the deals since the last one seen. Per-symbol lookups are then O(1)
+    dict reads. Each newly seen closing deal is emitted to subscribers
+    (risk streaks, adaptor, notifications).
+    """
+    # Deals are re-queried with this overlap; duplicates are filtered by ticket.
+    # Covers terminal/server clock skew in history_deals_get.
+    OVERLAP_SECONDS = 300
+    SEEN_DEALS = 5000
+
+    def __init__(self, magic_number: int = None):
+        self.magic = Config.MAGIC_NUMBER if magic_number is None else magic_number
+        self._by_symbol: Dict[str, list] = {}
+        self._by_ticket: Dict[int, object] = {}
+        self._known_positions: Set[int] = set()
+        self._seen_deals: Set[int] = set()
+        self._seen_order: Deque[int] = deque()
+        self._cursor = time.time()  # Latest deal time seen (epoch seconds)
+        self._primed = False
+        self._listeners: List[Callable[[ClosedTrade], None]] = []
+        self.last_sync = 0.0
+
+    def subscribe(self, callback: Callable[[ClosedTrade], None]):
+        self._listeners.append(callback)
+
+    # --- Lookups (O(1), no terminal calls) ---
+
+    def count(self, symbol: str) -> int:
+        return len(self._by_symbol.get(symbol, ()))
+
+    def get(self, symbol: str = None) -> list:
+        if symbol:
+            return list(self._by_symbol.get(symbol, ()))
+        return list(self._by_ticket.values())
+
+    def total(self) -> int:
+        return len(self._by_ticket)
+
+    # --- Persistence ---
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            'cursor': self._cursor,
+            'seen_deals': list(self._seen_order),
+            'known_positions': list(self._known_positions),
+        }
+
+    def restore_state(self, state: Dict[str, Any]):
+        """
+        Resumes deal tracking where the last run stopped: deals that closed
+        while the bot was down are emitted on the next sync, none twice.
+        """
+        self._cursor = state.get('cursor', self._cursor)
+        self._seen_order = deque(state.get('seen_deals', ()))
+        self._seen_deals = set(self._seen_order)
+        self._known_positions = set(state.get('known_positions', ()))
+        self._primed = True
+
+    # --- Sync ---
+
+    def sync(self) -> List[ClosedTrade]:
+        """Refreshes the open-position snapshot and emits newly closed trades."""
+        self._sync_positions()
+        closed = self._sync_deals()
+        self.last_sync = time.time()
+        for trade in closed:
+            for callback in self._listeners:
+                try:
+                    callback(trade)
+                except Exception as e:
+                    logger.error(f"Trade close listener failed: {e}")
+        return closed
+
+    def _sync_positions(self):
+        positions = MT5.positions_get()
+        if positions is None:
+            # Terminal error: keep the last good snapshot
+            return
+        by_symbol: Dict[str, list] = {}
+        by_ticket: Dict[int, object] = {}
+        for p in positions:
+            if p.magic != self.magic:
+                continue
+            by_symbol.setdefault(pair_name(p.symbol), []).append(p)
+            by_ticket[p.ticket] = p
+        self._known_positions.update(by_ticket)
+        # Swap whole dicts so readers never see a half-built snapshot
+        self._by_symbol, self._by_ticket = by_symbol, by_ticket
+
+    def _sync_deals(self) -> List[ClosedTrade]:
+        date_from = datetime.fromtimestamp(max(0.0, self._cursor - self.OVERLAP_SECONDS))
+        # Server time can run ahead of local time
+        date_to = datetime.fromtimestamp(time.time() + 86400)
+        deals = MT5.history_deals_get(date_from, date_to)
+        if deals is None:
+            return []
+
+        closed = []
+        for deal in sorted(deals, key=lambda d: (d.time_msc, d.ticket)):
+            if deal.ticket in self._seen_deals:
+                continue
+            self._remember(deal.ticket)
+            self._cursor = max(self._cursor, float(deal.time))
+
+            # First sync only marks existing history as seen
+            if not self._primed or deal.entry not in _EXIT_ENTRIES:
+                continue
+            if deal.magic != self.magic and deal.position_id not in self._known_positions:
+                continue
+
+            closed.append(ClosedTrade(
+                position_id=deal.position_id,
+                symbol=pair_name(deal.symbol),
+                volume=deal.volume,
+                close_price=deal.price,
+                profit=deal.profit + getattr(deal, "commission", 0.0) + getattr(deal, "swap", 0.0),
+                time=float(deal.time),
+                reason=_deal_reason(deal),
+            ))
+            if deal.position_id not in self._by_ticket:
+                self._known_positions.discard(deal.position_id)
+
+        self._primed = True
+        return closed
+
+    def _remember(self, ticket: int):
+        self._seen_deals.add(ticket)
+        self._seen_order.append(ticket)
+        if len(self._seen_order) > self.SEEN_DEALS:
+            self._seen_deals.discard(self._seen_order.popleft())
+
+# deal.reason values
+_DEAL_REASONS = {3: "EXPERT", 4: "SL", 5: "TP", 6: "STOP_OUT"}
+
+def _deal_reason(deal) -> str:
+    return _DEAL_REASONS.get(getattr(deal, "reason", None), "MANUAL")
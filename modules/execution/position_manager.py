@@ -0,0 +1,136 @@
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from config.config import Config
+from modules.data.mt5_loader import MT5
+from modules.execution.position_cache import pair_name
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class StopUpdate:
+    """A SL modification decided by the PositionManager."""
+    ticket: int
+    symbol: str
+    sl: float
+    tp: float
+    reason: str  # "BREAK_EVEN" or "TRAIL"
+
+class PositionManager:
+    """
+    Break-even and trailing-stop management for every open position.
+
+    Levels are computed in one vectorized pass over all positions, from
+    one quote per symbol and the entry ATR. A TRADE_ACTION_SLTP request is
+    only sent when the new stop improves the current one by at least
+    min_step_points, so broker traffic grows with price movement rather
+    than with the number of positions x loops.
+    """
+    def __init__(self,
+                 break_even_atr: float = None,
+                 break_even_lock_points: float = None,
+                 trail_start_atr: float = None,
+                 trail_distance_atr: float = None,
+                 min_step_points: float = None):
+        self.break_even_atr = Config.BREAK_EVEN_ATR if break_even_atr is None else break_even_atr
+        self.break_even_lock_points = (
+            Config.BREAK_EVEN_LOCK_POINTS if break_even_lock_points is None else break_even_lock_points
+        )
+        self.trail_start_atr = Config.TRAIL_START_ATR if trail_start_atr is None else trail_start_atr
+        self.trail_distance_atr = Config.TRAIL_DISTANCE_ATR if trail_distance_atr is None else trail_distance_atr
+        self.min_step_points = Config.MIN_STEP_POINTS if min_step_points is None else min_step_points
+        # Entry stop is 1.5 x ATR (see ScalpMasterBot._build_signal); used to
+        # recover the ATR of positions opened before a restart
+        self.sl_atr_mult = 1.5
+        self._atr: Dict[str, float] = {}    # symbol -> ATR at entry
+        self._points: Dict[str, float] = {}
+
+    def set_atr(self, symbol: str, atr: float):
+        self._atr[symbol] = atr
+
+    def compute_updates(self, positions: Sequence, quotes: Dict[str, Tuple[float, float]]) -> List[StopUpdate]:
+        """
+        positions: MT5 positions (or SimPosition); quotes: pair -> (bid, ask).
+        Positions without a quote are left untouched.
+        """
+        rows = []
+        for p in positions:
+            symbol = pair_name(p.symbol)
+            quote = quotes.get(symbol)
+            if quote is None:
+                continue
+            atr = self._atr.get(symbol)
+            if atr is None:
+                if not p.sl:
+                    continue
+                # Recover from the initial stop, before it is ever moved
+                atr = self._atr[symbol] = abs(p.price_open - p.sl) / self.sl_atr_mult
+            rows.append((p, symbol, quote, atr))
+        if not rows:
+            return []
+
+        n = len(rows)
+        direction = np.fromiter((1.0 if r[0].type == MT5.ORDER_TYPE_BUY else -1.0 for r in rows), float, n)
+        entry = np.fromiter((r[0].price_open for r in rows), float, n)
+        sl = np.fromiter((r[0].sl for r in rows), float, n)
+        bid = np.fromiter((r[2][0] for r in rows), float, n)
+        ask = np.fromiter((r[2][1] for r in rows), float, n)
+        atr = np.fromiter((r[3] for r in rows), float, n)
+        point = np.fromiter((self._point(r[1]) for r in rows), float, n)
+
+        is_buy = direction > 0
+        # Longs are closed at the bid, shorts at the ask
+        market = np.where(is_buy, bid, ask)
+        # Half a point of slack so exact price levels are not lost to float error
+        gain = (market - entry) * direction + 0.5 * point
+        # No stop yet: treat as infinitely far so any level is an improvement
+        current = np.where(sl > 0, sl, np.where(is_buy, -np.inf, np.inf))
+
+        be_level = entry + direction * self.break_even_lock_points * point
+        trail_level = market - direction * self.trail_distance_atr * atr
+
+        be_hit = (gain >= self.break_even_atr * atr) & ((be_level - current) * direction > 0)
+        target = np.where(be_hit, be_level, current)
+        trailing = (gain >= self.trail_start_atr * atr) & ((trail_level - target) * direction > 0)
+        target = np.where(trailing, trail_level, target)
+        target = np.round(target / point) * point
+
+        improvement = (target - current) * direction + 0.5 * point
+        send = np.isfinite(target) & (improvement >= self.min_step_points * point)
+
+        updates = []
+        for i in np.flatnonzero(send):
+            p, symbol, _, _ = rows[i]
+            reason = "TRAIL" if trailing[i] else "BREAK_EVEN"
+            updates.append(StopUpdate(p.ticket, symbol, float(target[i]), p.tp, reason))
+        return updates
+
+    def run(self, execution, positions: Sequence, quotes: Dict[str, Tuple[float, float]]) -> List[StopUpdate]:
+        """Computes updates and sends them through execution.modify_sltp(). Returns the accepted ones."""
+        applied = []
+        for update in self.compute_updates(positions, quotes):
+            if execution.modify_sltp(update.ticket, update.symbol, update.sl, update.tp):
+                logger.info(f"{update.reason}: {update.symbol} #{update.ticket} SL -> {update.sl}")
+                applied.append(update)
+        return applied
+
+    def to_state(self) -> Dict[str, float]:
+        return {'atr': dict(self._atr)}
+
+    def restore_state(self, state: Dict):
+        self._atr.update(state.get('atr', {}))
+
+    def forget(self, symbol: str):
+        """Drops the entry ATR once the symbol has no position left."""
+        self._atr.pop(symbol, None)
+
+    def _point(self, symbol: str) -> float:
+        point = self._points.get(symbol)
+        if point is None:
+            info = MT5.symbol_info(Config.get_mt5_symbol(symbol))
+            point = info.point if info else 0.00001
+            self._points[symbol] = point
+        return point
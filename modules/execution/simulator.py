@@ -1,10 +1,25 @@
 import logging
 import random
-from dataclasses import dataclass
-from typing import List
+import time
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from config.config import Config
+from modules.execution.analytics import ExecutionRecord, ExecutionStats, slippage_points
+from modules.execution.pipeline import BulkCloseReport, OrderPipeline, OrderRequest, OrderResult
+from modules.execution.position_cache import ClosedTrade
 
 logger = logging.getLogger(__name__)
 
+# MT5 constants: BUY=0, SELL=1
+TYPE_BUY = 0
+TYPE_SELL = 1
+
+_INF = float("inf")
+
 @dataclass
 class SimPosition:
     ticket: int
@@ -15,24 +30,345 @@ class SimPosition:
     sl: float
     tp: float
     magic: int
+    time_msc: float = 0.0
 
-class SimulatedExecution:
+    @property
+    def price_open(self) -> float:
+        # MT5 TradePosition naming
+        return self.price
+
+@dataclass
+class SimOrder:
+    """Market order waiting for the latency model to release it."""
+    ticket: int
+    symbol: str
+    type: int
+    volume: float
+    sl: float
+    tp: float
+    fill_after_msc: float
+
+@dataclass
+class SimExit:
+    """Record of a position closed by the simulator (SL, TP or manual)."""
+    ticket: int
+    symbol: str
+    type: int
+    volume: float
+    open_price: float
+    close_price: float
+    reason: str  # "SL", "TP", "MANUAL"
+    time_msc: float
+    profit: float = 0.0
+
+    def as_closed_trade(self) -> ClosedTrade:
+        return ClosedTrade(
+            position_id=self.ticket,
+            symbol=self.symbol,
+            volume=self.volume,
+            close_price=self.close_price,
+            profit=self.profit,
+            time=self.time_msc / 1000.0,
+            reason=self.reason,
+        )
+
+@dataclass
+class SymbolSpec:
+    """Contract metadata needed to price simulated fills and PnL."""
+    point: float = 0.00001
+    contract_size: float = 100000.0
+    tick_size: float = 0.00001
+    tick_value: float = 1.0
+
+    @property
+    def value_per_price_unit(self) -> float:
+        """Account-currency PnL of 1 lot for a 1.0 price move."""
+        return self.tick_value / self.tick_size
+
+@dataclass
+class FillModel:
+    """
+    Spread, slippage and latency applied to every simulated fill.
+    All distances are in points (symbol.point).
+    """
+    spread_points: float = 0.0
+    slippage_points: float = 0.0
+    latency_ms: float = 0.0
+    seed: Optional[int] = None
+    _rng: random.Random = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self._rng = random.Random(self.seed)
+
+    @classmethod
+    def from_config(cls) -> "FillModel":
+        return cls(
+            spread_points=float(Config.SIM_SPREAD_POINTS),
+            slippage_points=float(Config.SIM_SLIPPAGE_POINTS),
+            latency_ms=float(Config.SIM_LATENCY_MS),
+            seed=Config.SIM_SEED,
+        )
+
+    def quote(self, bid: float, ask: float, point: float) -> Tuple[float, float]:
+        """Widens the quoted spread symmetrically by spread_points."""
+        if self.spread_points:
+            half = self.spread_points * point / 2.0
+            return bid - half, ask + half
+        return bid, ask
+
+    def slip(self, price: float, order_type: int, point: float) -> float:
+        """Applies adverse slippage: buys fill higher, sells fill lower."""
+        if not self.slippage_points:
+            return price
+        offset = self._rng.uniform(0.0, self.slippage_points) * point
+        return price + offset if order_type == TYPE_BUY else price - offset
+
+class _SymbolBook:
     """
-    Mock Execution Engine for Dry-Run mode.
-    Mimics MT5 behavior but stores trades in memory.
+    Open positions of one symbol, indexed by their trigger levels.
+
+    Each list is sorted by (level, ticket) so the positions triggered by a
+    tick are always a contiguous slice found with a single bisect:
+      - long_sl:  BUY  stop   -> hit when bid <= level (tail slice)
+      - long_tp:  BUY  target -> hit when bid >= level (head slice)
+      - short_sl: SELL stop   -> hit when ask >= level (head slice)
+      - short_tp: SELL target -> hit when ask <= level (tail slice)
     """
+    __slots__ = ("positions", "long_sl", "long_tp", "short_sl", "short_tp")
+
     def __init__(self):
-        self.positions: List[SimPosition] = []
+        self.positions: Dict[int, SimPosition] = {}
+        self.long_sl: List[Tuple[float, int]] = []
+        self.long_tp: List[Tuple[float, int]] = []
+        self.short_sl: List[Tuple[float, int]] = []
+        self.short_tp: List[Tuple[float, int]] = []
+
+    def _lists(self, pos: SimPosition):
+        if pos.type == TYPE_BUY:
+            return self.long_sl, self.long_tp
+        return self.short_sl, self.short_tp
+
+    def add(self, pos: SimPosition):
+        self.positions[pos.ticket] = pos
+        sl_list, tp_list = self._lists(pos)
+        if pos.sl > 0:
+            insort(sl_list, (pos.sl, pos.ticket))
+        if pos.tp > 0:
+            insort(tp_list, (pos.tp, pos.ticket))
+
+    def remove(self, pos: SimPosition):
+        self.positions.pop(pos.ticket, None)
+        sl_list, tp_list = self._lists(pos)
+        if pos.sl > 0:
+            _discard(sl_list, (pos.sl, pos.ticket))
+        if pos.tp > 0:
+            _discard(tp_list, (pos.tp, pos.ticket))
+
+    def triggered(self, bid: float, ask: float) -> List[Tuple[int, str]]:
+        """Returns (ticket, reason) for every position whose SL or TP is hit."""
+        hits: List[Tuple[int, str]] = []
+        if self.long_sl:
+            hits.extend((t, "SL") for _, t in self.long_sl[bisect_left(self.long_sl, (bid, -1)):])
+        if self.long_tp:
+            hits.extend((t, "TP") for _, t in self.long_tp[:bisect_right(self.long_tp, (bid, _INF))])
+        if self.short_sl:
+            hits.extend((t, "SL") for _, t in self.short_sl[:bisect_right(self.short_sl, (ask, _INF))])
+        if self.short_tp:
+            hits.extend((t, "TP") for _, t in self.short_tp[bisect_left(self.short_tp, (ask, -1)):])
+        return hits
+
+class _Exposure:
+    """Aggregated open volume of one symbol, kept so marking is O(1)."""
+    __slots__ = ("buy_volume", "buy_cost", "sell_volume", "sell_cost", "floating", "bid", "ask", "value")
+
+    def __init__(self, value: float):
+        self.buy_volume = 0.0
+        self.buy_cost = 0.0     # sum(volume * open_price)
+        self.sell_volume = 0.0
+        self.sell_cost = 0.0
+        self.floating = 0.0
+        self.bid = 0.0
+        self.ask = 0.0
+        self.value = value      # SymbolSpec.value_per_price_unit
+
+    def revalue(self) -> float:
+        long_pnl = self.buy_volume * self.bid - self.buy_cost if self.buy_volume else 0.0
+        short_pnl = self.sell_cost - self.sell_volume * self.ask if self.sell_volume else 0.0
+        return (long_pnl + short_pnl) * self.value
+
+class SimAccount:
+    """
+    Simulated account ledger. Exposes the same fields the bot reads from
+    MT5.account_info() (balance, equity, profit, margin, margin_free).
+    Opening, closing and marking a symbol are all O(1).
+    """
+    def __init__(self, balance: float, leverage: float = 100.0):
+        self.balance = float(balance)
+        self.leverage = float(leverage) if leverage else 1.0
+        self.profit = 0.0   # Floating PnL of all open positions
+        self.margin = 0.0
+        self._exposure: Dict[str, _Exposure] = {}
+
+    @property
+    def equity(self) -> float:
+        return self.balance + self.profit
+
+    @property
+    def margin_free(self) -> float:
+        return self.equity - self.margin
+
+    @property
+    def margin_level(self) -> float:
+        return (self.equity / self.margin * 100.0) if self.margin else 0.0
+
+    def open(self, pos: SimPosition, spec: SymbolSpec):
+        exp = self._exposure.get(pos.symbol)
+        if exp is None:
+            exp = self._exposure[pos.symbol] = _Exposure(spec.value_per_price_unit)
+        if pos.type == TYPE_BUY:
+            exp.buy_volume += pos.volume
+            exp.buy_cost += pos.volume * pos.price
+        else:
+            exp.sell_volume += pos.volume
+            exp.sell_cost += pos.volume * pos.price
+        self.margin += pos.volume * spec.contract_size * pos.price / self.leverage
+        if exp.bid and exp.ask:
+            self._revalue(exp)
+
+    def close(self, pos: SimPosition, close_price: float, spec: SymbolSpec) -> float:
+        """Realizes a position into balance and returns its profit."""
+        if pos.type == TYPE_BUY:
+            profit = (close_price - pos.price) * pos.volume * spec.value_per_price_unit
+        else:
+            profit = (pos.price - close_price) * pos.volume * spec.value_per_price_unit
+        self.balance += profit
+        self.margin = max(0.0, self.margin - pos.volume * spec.contract_size * pos.price / self.leverage)
+
+        exp = self._exposure.get(pos.symbol)
+        if exp is not None:
+            if pos.type == TYPE_BUY:
+                exp.buy_volume -= pos.volume
+                exp.buy_cost -= pos.volume * pos.price
+            else:
+                exp.sell_volume -= pos.volume
+                exp.sell_cost -= pos.volume * pos.price
+            if exp.buy_volume <= 1e-12 and exp.sell_volume <= 1e-12:
+                self.profit -= exp.floating
+                del self._exposure[pos.symbol]
+            else:
+                self._revalue(exp)
+        return profit
+
+    def mark(self, symbol: str, bid: float, ask: float):
+        exp = self._exposure.get(symbol)
+        if exp is None:
+            return
+        exp.bid, exp.ask = bid, ask
+        self._revalue(exp)
+
+    def _revalue(self, exp: _Exposure):
+        floating = exp.revalue()
+        self.profit += floating - exp.floating
+        exp.floating = floating
+
+def _discard(sorted_list: List[Tuple[float, int]], item: Tuple[float, int]):
+    idx = bisect_left(sorted_list, item)
+    if idx < len(sorted_list) and sorted_list[idx] == item:
+        del sorted_list[idx]
+
+class SimulatedExecution:
+    """
+    Mock Execution Engine for Dry-Run mode and backtests.
+    Mimics MT5 behavior but stores trades in memory and closes them
+    on SL/TP as ticks arrive (see on_tick).
+    """
+    def __init__(self, fill_model: Optional[FillModel] = None, use_terminal_ticks: bool = True,
+                 risk_manager=None, initial_balance: Optional[float] = None):
+        self.fill_model = fill_model or FillModel.from_config()
+        # Fed with the realized profit of every simulated close (standalone
+        # backtests; the bot routes closes through subscribe_closes instead)
+        self.risk_manager = risk_manager
+        self.account = SimAccount(
+            Config.SIM_INITIAL_BALANCE if initial_balance is None else initial_balance,
+            Config.SIM_LEVERAGE,
+        )
+        # False for backtests: prices come only from on_tick(), never from MT5
+        self.use_terminal_ticks = use_terminal_ticks
+        self.magic_number = Config.MAGIC_NUMBER
+
+        self.positions: Dict[int, SimPosition] = {}
+        self._books: Dict[str, _SymbolBook] = {}
+        self._pending: Dict[str, Deque[SimOrder]] = {}
+        self._last_tick: Dict[str, Tuple[float, float, float]] = {}  # symbol -> (bid, ask, time_msc)
+        self._specs: Dict[str, SymbolSpec] = {}
+        self.closed: List[SimExit] = []
+        self._close_listeners: List[Callable[[ClosedTrade], None]] = []
         self._ticket_counter = 1000
+        # Same interface as the live OrderManager, but orders run inline
+        self.pipeline = OrderPipeline(self._send_order, max_workers=0)
+        self.stats = ExecutionStats()
         logger.warning("[SIMULATION] ScalpMaster running in DRY-RUN mode. No real orders will be sent.")
 
+    # --- Queries ---
+
+    def account_info(self) -> SimAccount:
+        """Simulated counterpart of MT5.account_info()."""
+        return self.account
+
     def get_open_positions(self, symbol: str = None) -> list:
         if symbol:
-            return [p for p in self.positions if p.symbol == symbol]
-        return self.positions
+            book = self._books.get(symbol)
+            return list(book.positions.values()) if book else []
+        return list(self.positions.values())
 
     def count_open_trades(self, symbol: str) -> int:
-        return len(self.get_open_positions(symbol))
+        book = self._books.get(symbol)
+        open_count = len(book.positions) if book else 0
+        return open_count + len(self._pending.get(symbol, ()))
+
+    def cached_open_trades(self, symbol: str) -> int:
+        # The in-memory book is already O(1) per symbol
+        return self.count_open_trades(symbol)
+
+    def cached_positions(self, symbol: str = None) -> list:
+        return self.get_open_positions(symbol)
+
+    def sync_positions(self) -> List[ClosedTrade]:
+        """Loop hook, same as OrderManager: marks positions to market and returns closed trades."""
+        return [e.as_closed_trade() for e in self.poll_ticks()]
+
+    def subscribe_closes(self, callback: Callable[[ClosedTrade], None]):
+        """Registers a callback fired for every simulated close."""
+        self._close_listeners.append(callback)
+
+    # --- Persistence ---
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            'balance': self.account.balance,
+            'ticket_counter': self._ticket_counter,
+            'positions': [asdict(pos) for pos in self.positions.values()],
+        }
+
+    def restore_state(self, state: Dict[str, Any]):
+        """
+        Warm restart: the ledger and open positions of the last run, so a
+        restored daily loss is measured against the same simulated balance.
+        Latency-delayed orders are not restored (they never filled).
+        """
+        self.account.balance = float(state.get('balance', self.account.balance))
+        self._ticket_counter = max(self._ticket_counter, state.get('ticket_counter', 0))
+        for fields in state.get('positions', ()):
+            pos = SimPosition(**fields)
+            if pos.ticket in self.positions:
+                continue
+            self.positions[pos.ticket] = pos
+            self._books.setdefault(pos.symbol, _SymbolBook()).add(pos)
+            self.account.open(pos, self._spec(pos.symbol))
+        logger.info(f"[SIMULATION] Ledger restored: Balance = {self.account.balance:.2f}, "
+                    f"{len(self.positions)} open position(s)")
+
+    # --- Orders ---
 
     def execute_trade(self, symbol: str, direction: str, volume: float, sl: float, tp: float, comment: str = "") -> bool:
         # Check rule (mimic OrderManager)
@@ -40,49 +376,288 @@ class SimulatedExecution:
             logger.warning(f"[SIMULATION] Trade rejected: Position already exists for {symbol}")
             return False
 
+        if direction not in ("BUY", "SELL"):
+            logger.error(f"[SIMULATION] Invalid direction: {direction}")
+            return False
+        type_int = TYPE_BUY if direction == "BUY" else TYPE_SELL
+
+        quote = self._current_quote(symbol)
+        if quote is None:
+            logger.error(f"[SIMULATION] Trade failed: No tick data for {symbol}")
+            return False
+        bid, ask, now_msc = quote
+
         self._ticket_counter += 1
         ticket = self._ticket_counter
-        
-        # Determine Type
-        # MT5 constants: BUY=0, SELL=1
-        type_int = 0 if direction == "BUY" else 1
-        
-        # Assume perfect fill at requested price (or 1 pip slippage sim?)
-        # For now, simplistic perfect fill.
-        # But wait, execute_trade DOES NOT take Price as input in OrderManager override?
-        # Ah, OrderManager gets it from Tick. We should probably simulate getting tick or just use a dummy price.
-        # Let's say we assume the caller logic checks price. But execute_trade signature is (symbol, dir, vol, sl, tp).
-        # We need a price.
-        
-        # We can't fetch real tick in simulation if MT5 is offline? 
-        # Actually dry_run usually connects to MT5 for Data, just mocks Execution.
-        # So we SHOULD fetch price to be realistic.
-        from modules.data.mt5_loader import MT5
-        tick = MT5.symbol_info_tick(symbol)
-        fill_price = tick.ask if direction == "BUY" else tick.bid if tick else 1.0
 
-        pos = SimPosition(
-            ticket=ticket,
-            symbol=symbol,
-            type=type_int,
-            volume=float(volume),
-            price=fill_price,
-            sl=float(sl),
-            tp=float(tp),
-            magic=123456 # Config.MAGIC_NUMBER
-        )
-        
-        self.positions.append(pos)
-        logger.info(f"[SIMULATION] Trade EXECUTED: {direction} {volume} {symbol} @ {fill_price}. Ticket: {ticket}")
+        if self.fill_model.latency_ms > 0:
+            # Released by the first tick at or after the latency deadline
+            order = SimOrder(ticket, symbol, type_int, float(volume), float(sl), float(tp),
+                             fill_after_msc=now_msc + self.fill_model.latency_ms)
+            self._pending.setdefault(symbol, deque()).append(order)
+            logger.info(f"[SIMULATION] Order QUEUED: {direction} {volume} {symbol}. Ticket: {ticket}")
+            return True
+
+        pos = self._fill(ticket, symbol, type_int, float(volume), float(sl), float(tp), bid, ask, now_msc)
+        logger.info(f"[SIMULATION] Trade EXECUTED: {direction} {volume} {symbol} @ {pos.price}. Ticket: {ticket}")
         return True
 
+    def submit_trade(self, symbol: str, direction: str, volume: float, sl: float, tp: float,
+                     comment: str = "", meta: Optional[dict] = None) -> Optional[Future]:
+        request = OrderRequest(symbol, direction, volume, sl, tp, comment, meta or {})
+        return self.pipeline.submit(request)
+
+    def has_pending_order(self, symbol: str) -> bool:
+        return self.pipeline.is_pending(symbol)
+
+    def pending_orders(self) -> List[Tuple[str, str]]:
+        """(symbol, direction) of every order not filled yet (latency model included)."""
+        pending = [(r.symbol, r.direction) for r in self.pipeline.pending()]
+        pending.extend((o.symbol, "BUY" if o.type == TYPE_BUY else "SELL")
+                       for orders in self._pending.values() for o in orders)
+        return pending
+
+    def drain_order_results(self) -> List[OrderResult]:
+        return self.pipeline.drain()
+
+    def shutdown(self):
+        self.pipeline.shutdown(wait=True)
+
+    def _send_order(self, request: OrderRequest) -> OrderResult:
+        ticket_before = self._ticket_counter
+        success = self.execute_trade(request.symbol, request.direction, request.volume,
+                                     request.sl, request.tp, request.comment)
+        ticket = self._ticket_counter if success and self._ticket_counter != ticket_before else None
+        pos = self.positions.get(ticket) if ticket else None
+        return OrderResult(request, success=success, ticket=ticket, price=pos.price if pos else 0.0)
+
     def close_trade(self, ticket: int, symbol: str) -> bool:
-        # Find position
-        pos = next((p for p in self.positions if p.ticket == ticket), None)
+        pos = self.positions.get(ticket)
         if not pos:
             logger.error(f"[SIMULATION] Close failed: Ticket {ticket} not found")
             return False
-            
-        self.positions.remove(pos)
+
+        self._close_at_market(pos, self._current_quote(pos.symbol))
         logger.info(f"[SIMULATION] Trade CLOSED: Ticket {ticket}")
         return True
+
+    def modify_sltp(self, ticket: int, symbol: str, sl: float, tp: float) -> bool:
+        pos = self.positions.get(ticket)
+        if not pos:
+            logger.error(f"[SIMULATION] Modify failed: Ticket {ticket} not found")
+            return False
+        # Re-index the trigger levels
+        book = self._books[pos.symbol]
+        book.remove(pos)
+        pos.sl, pos.tp = sl, tp
+        book.add(pos)
+        return True
+
+    def close_all_trades(self) -> BulkCloseReport:
+        """Flattens every simulated position using one quote per symbol."""
+        started = time.perf_counter()
+        report = BulkCloseReport(requested=len(self.positions))
+        # Latency-delayed orders are cancelled, not filled
+        self._pending.clear()
+
+        quotes = {}
+        for pos in list(self.positions.values()):
+            if pos.symbol not in quotes:
+                quotes[pos.symbol] = self._current_quote(pos.symbol)
+            self._close_at_market(pos, quotes[pos.symbol])
+            report.closed.append(pos.ticket)
+
+        report.remaining = len(self.positions)
+        report.elapsed_ms = (time.perf_counter() - started) * 1000.0
+        logger.warning(f"[SIMULATION] Close All: {len(report.closed)} closed in {report.elapsed_ms:.1f} ms")
+        return report
+
+    def _close_at_market(self, pos: SimPosition, quote: Optional[Tuple[float, float, float]]) -> SimExit:
+        if quote is None:
+            # No price available: close flat at entry rather than invent one
+            bid = ask = pos.price
+            now_msc = time.time() * 1000.0
+        else:
+            bid, ask, now_msc = quote
+            bid, ask = self.fill_model.quote(bid, ask, self._spec(pos.symbol).point)
+
+        market = bid if pos.type == TYPE_BUY else ask
+        close_type = TYPE_SELL if pos.type == TYPE_BUY else TYPE_BUY
+        close_price = self.fill_model.slip(market, close_type, self._spec(pos.symbol).point)
+        return self._close(pos, close_price, "MANUAL", now_msc)
+
+    # --- Tick Engine ---
+
+    def on_tick(self, symbol: str, bid: float, ask: float, time_msc: Optional[float] = None) -> List[SimExit]:
+        """
+        Marks a symbol to market. Releases latency-delayed orders and closes
+        every position whose SL or TP is crossed by this tick.
+        Cost is O(log n) in the number of open positions on the symbol,
+        plus the number of positions actually filled.
+        """
+        if time_msc is None:
+            time_msc = time.time() * 1000.0
+        bid, ask = float(bid), float(ask)
+        self._last_tick[symbol] = (bid, ask, time_msc)
+
+        pending = self._pending.get(symbol)
+        if pending:
+            while pending and pending[0].fill_after_msc <= time_msc:
+                order = pending.popleft()
+                pos = self._fill(order.ticket, symbol, order.type, order.volume, order.sl, order.tp, bid, ask, time_msc,
+                                 delay_ms=time_msc - (order.fill_after_msc - self.fill_model.latency_ms))
+                logger.info(f"[SIMULATION] Trade EXECUTED: {symbol} @ {pos.price}. Ticket: {pos.ticket}")
+
+        book = self._books.get(symbol)
+        if not book or not book.positions:
+            return []
+
+        point = self._spec(symbol).point
+        eff_bid, eff_ask = self.fill_model.quote(bid, ask, point)
+        self.account.mark(symbol, eff_bid, eff_ask)
+        exits = []
+        for ticket, reason in book.triggered(eff_bid, eff_ask):
+            pos = book.positions.get(ticket)
+            if pos is None:  # Both SL and TP hit on the same tick
+                continue
+            if pos.type == TYPE_BUY:
+                market, close_type = eff_bid, TYPE_SELL
+            else:
+                market, close_type = eff_ask, TYPE_BUY
+            if reason == "SL":
+                # Stops become market orders and slip
+                price = self.fill_model.slip(market, close_type, point)
+            else:
+                # Targets are limit orders: filled at the level or better
+                price = max(pos.tp, market) if pos.type == TYPE_BUY else min(pos.tp, market)
+            exits.append(self._close(pos, price, reason, time_msc))
+            logger.info(f"[SIMULATION] {reason} HIT: Ticket {ticket} {symbol} @ {price}. PnL: {exits[-1].profit:.2f}")
+        return exits
+
+    def poll_ticks(self) -> List[SimExit]:
+        """
+        Dry-Run helper: pulls the latest terminal tick for every symbol with
+        open or pending positions and feeds it through on_tick.
+        """
+        exits = []
+        symbols = {s for s, b in self._books.items() if b.positions}
+        symbols.update(s for s, q in self._pending.items() if q)
+        for symbol in symbols:
+            tick = self._terminal_tick(symbol)
+            if tick is not None:
+                exits.extend(self.on_tick(symbol, *tick))
+        return exits
+
+    # --- Internals ---
+
+    def _fill(self, ticket: int, symbol: str, type_int: int, volume: float, sl: float, tp: float,
+              bid: float, ask: float, time_msc: float, delay_ms: float = 0.0) -> SimPosition:
+        spec = self._spec(symbol)
+        bid, ask = self.fill_model.quote(bid, ask, spec.point)
+        market = ask if type_int == TYPE_BUY else bid
+        fill_price = self.fill_model.slip(market, type_int, spec.point)
+        direction = "BUY" if type_int == TYPE_BUY else "SELL"
+        self.stats.record(ExecutionRecord(
+            timestamp=time_msc / 1000.0,
+            symbol=symbol,
+            direction=direction,
+            success=True,
+            retcode=None,
+            queue_ms=0.0,
+            send_ms=delay_ms,
+            requested_price=market,
+            fill_price=fill_price,
+            slippage_points=slippage_points(direction, market, fill_price, spec.point),
+        ))
+
+        pos = SimPosition(
+            ticket=ticket,
+            symbol=symbol,
+            type=type_int,
+            volume=volume,
+            price=fill_price,
+            sl=sl,
+            tp=tp,
+            magic=self.magic_number,
+            time_msc=time_msc,
+        )
+        self.positions[ticket] = pos
+        self._books.setdefault(symbol, _SymbolBook()).add(pos)
+        self.account.open(pos, spec)
+        self.account.mark(symbol, bid, ask)
+        return pos
+
+    def _close(self, pos: SimPosition, price: float, reason: str, time_msc: float) -> SimExit:
+        self.positions.pop(pos.ticket, None)
+        self._books[pos.symbol].remove(pos)
+        profit = self.account.close(pos, price, self._spec(pos.symbol))
+        record = SimExit(
+            ticket=pos.ticket,
+            symbol=pos.symbol,
+            type=pos.type,
+            volume=pos.volume,
+            open_price=pos.price,
+            close_price=price,
+            reason=reason,
+            time_msc=time_msc,
+            profit=profit,
+        )
+        self.closed.append(record)
+        if self.risk_manager is not None:
+            self.risk_manager.update_metrics(profit)
+        if self._close_listeners:
+            trade = record.as_closed_trade()
+            for callback in self._close_listeners:
+                try:
+                    callback(trade)
+                except Exception as e:
+                    logger.error(f"[SIMULATION] Trade close listener failed: {e}")
+        return record
+
+    def _current_quote(self, symbol: str) -> Optional[Tuple[float, float, float]]:
+        if self.use_terminal_ticks:
+            tick = self._terminal_tick(symbol)
+            if tick is not None:
+                return tick
+        return self._last_tick.get(symbol)
+
+    def _terminal_tick(self, symbol: str) -> Optional[Tuple[float, float, float]]:
+        if not self.use_terminal_ticks:
+            return None
+        # Dry-run still connects to MT5 for data, it only mocks execution.
+        from modules.data.mt5_loader import MT5
+        tick = MT5.symbol_info_tick(Config.get_mt5_symbol(symbol))
+        if tick is None:
+            return None
+        try:
+            bid, ask = float(tick.bid), float(tick.ask)
+        except (TypeError, ValueError, AttributeError):
+            return None
+        if bid <= 0 or ask <= 0:
+            return None
+        time_msc = getattr(tick, "time_msc", None)
+        if not isinstance(time_msc, (int, float)) or time_msc <= 0:
+            time_msc = time.time() * 1000.0
+        return bid, ask, float(time_msc)
+
+    def _spec(self, symbol: str) -> SymbolSpec:
+        spec = self._specs.get(symbol)
+        if spec is None:
+            spec = SymbolSpec()
+            if self.use_terminal_ticks:
+                from modules.data.mt5_loader import MT5
+                info = MT5.symbol_info(Config.get_mt5_symbol(symbol))
+                if info:
+                    for attr, source in (("point", "point"),
+                                         ("contract_size", "trade_contract_size"),
+                                         ("tick_size", "trade_tick_size"),
+                                         ("tick_value", "trade_tick_value")):
+                        value = getattr(info, source, None)
+                        if isinstance(value, (int, float)) and value > 0:
+                            setattr(spec, attr, float(value))
+            self._specs[symbol] = spec
+        return spec
+
+    def set_symbol_spec(self, symbol: str, **kwargs):
+        """Backtest hook: overrides contract metadata (point, contract_size, tick_size, tick_value)."""
+        self._specs[symbol] = SymbolSpec(**{k: float(v) for k, v in kwargs.items()})
@@ -1,23 +1,131 @@
+import atexit
 import logging
+import shutil
 import sys
+import time
 from datetime import datetime
+from typing import Dict, List, Optional, TextIO
+
+from config.config import Config
 
 logger = logging.getLogger(__name__)
 
+SEPARATOR = "-" * 60
+
+class Dashboard:
+    """
+    Frame renderer behind ConsoleUI.
+
+    Rows are buffered during the scan and written with a single write()
+    when the frame ends.
+      - plain (stdout is not a TTY): the frame is appended as lines, as before.
+      - live: the table is pinned to the top of the terminal (logs keep
+        scrolling in a region below it) and only rows whose text changed
+        are rewritten. Redraws are throttled to refresh_interval seconds;
+        the latest values are kept and drawn on the next allowed frame.
+    """
+    def __init__(self, stream: Optional[TextIO] = None, live: Optional[bool] = None,
+                 refresh_interval: float = None):
+        self.stream = stream or sys.stdout
+        if live is None:
+            mode = Config.UI_DASHBOARD
+            live = mode == "live" or (mode == "auto" and _isatty(self.stream))
+        self.live = live
+        self.refresh_interval = Config.UI_REFRESH_INTERVAL if refresh_interval is None else refresh_interval
+
+        self.header = ""
+        self.rows: Dict[str, str] = {}
+        self._plain: List[str] = []
+        self._drawn: List[str] = []
+        self._last_draw = float("-inf")
+        self._exit_hook = False
+
+    def begin(self, header: str):
+        self.header = header
+        if not self.live:
+            self._plain = [f"\n{header}", SEPARATOR]
+
+    def row(self, symbol: str, text: str):
+        self.rows[symbol] = text
+        if not self.live:
+            self._plain.append(text)
+
+    def remove(self, symbol: str):
+        self.rows.pop(symbol, None)
+
+    def end(self, now: float = None):
+        if not self.live:
+            self._plain.append("")
+            self._write("\n".join(self._plain) + "\n")
+            self._plain = []
+            return
+        now = time.monotonic() if now is None else now
+        if now - self._last_draw < self.refresh_interval:
+            return
+        self._last_draw = now
+        self._write(self.render_diff())
+
+    def render_diff(self) -> str:
+        """Escape sequences updating the screen from the last drawn frame."""
+        size = shutil.get_terminal_size()
+        lines = [line[:size.columns] for line in (self.header, SEPARATOR, *self.rows.values(), SEPARATOR)]
+        out = []
+        if len(lines) != len(self._drawn):
+            # Layout changed: clear, pin the table, logs scroll below it
+            out.append(f"\x1b[2J\x1b[{len(lines) + 1};{size.lines}r\x1b[{size.lines};1H")
+            changed = range(len(lines))
+            if not self._exit_hook:
+                atexit.register(self.reset)
+                self._exit_hook = True
+        else:
+            changed = [i for i, line in enumerate(lines) if line != self._drawn[i]]
+        if not changed:
+            return ""
+
+        out.append("\x1b7")  # Save the log cursor
+        for i in changed:
+            out.append(f"\x1b[{i + 1};1H{lines[i]}\x1b[K")
+        out.append("\x1b8")
+        self._drawn = lines
+        return "".join(out)
+
+    def reset(self):
+        """Releases the scroll region (process exit)."""
+        if self.live and self._drawn:
+            self._write("\x1b[r\n")
+            self._drawn = []
+
+    def _write(self, text: str):
+        if text:
+            self.stream.write(text)
+            self.stream.flush()
+
+def _isatty(stream) -> bool:
+    try:
+        return stream.isatty()
+    except (AttributeError, ValueError):
+        return False
+
 class ConsoleUI:
     """
     Handles pretty terminal output for the ScalpMaster dashboard.
     """
-    
-    @staticmethod
-    def print_header(count: int, timestamp: datetime):
-        print(f"\n🔍 Scanning {count} assets at {timestamp.strftime('%H:%M:%S')}...")
-        print("-" * 60)
+    _dashboard: Optional[Dashboard] = None
+
+    @classmethod
+    def dashboard(cls) -> Dashboard:
+        if cls._dashboard is None:
+            cls._dashboard = Dashboard()
+        return cls._dashboard
+
+    @classmethod
+    def print_header(cls, count: int, timestamp: datetime):
+        cls.dashboard().begin(f"🔍 Scanning {count} assets at {timestamp.strftime('%H:%M:%S')}...")
 
     @staticmethod
-    def print_row(symbol: str, bias: str, rsi: float, status: str, error: bool = False):
+    def format_row(symbol: str, bias: str, rsi: float, status: str, error: bool = False) -> str:
         """
-        Prints a formatted row.
+        Formats a row.
         Example: 📊 BTCUSDT: SHORT | RSI: 66.0 | Wait Pullback...
         """
         icon = "📊"
@@ -25,15 +133,22 @@ class ConsoleUI:
             icon = "⚠️"
         elif "TRADE FOUND" in status or "ZONE" in status:
             icon = "🔥"
-        
+
         # Simple ASCII formatting
-        # Using simple print to avoid logger prefixes for dashboard view
         # We assume bias/status are short text
         # truncating floats
-        
-        row = f"   {icon} {symbol:<7}: {bias:<5} | RSI: {rsi:.1f} | {status}"
-        print(row)
-        
-    @staticmethod
-    def print_section_end():
-        print("") # Newline
+        return f"   {icon} {symbol:<7}: {bias:<5} | RSI: {rsi:.1f} | {status}"
+
+    @classmethod
+    def print_row(cls, symbol: str, bias: str, rsi: float, status: str, error: bool = False):
+        """Buffers the symbol's row; written when the frame ends."""
+        cls.dashboard().row(symbol, cls.format_row(symbol, bias, rsi, status, error))
+
+    @classmethod
+    def remove_row(cls, symbol: str):
+        """Drops a symbol that is no longer monitored from the dashboard."""
+        cls.dashboard().remove(symbol)
+
+    @classmethod
+    def print_section_end(cls):
+        cls.dashboard().end()
@@ -27,9 +27,12 @@ class TelegramBot:
         commands_list = [
             ("status", "System Overview & PnL"),
             ("scan", "Force Market Scan"),
+            ("pause", "Pause New Entries"),
+            ("resume", "Resume New Entries"),
             ("panic", "🚨 CLOSE ALL TRADES"),
             ("mode", "Show Current Mode"),
             ("news", "Check News Status"),
+            ("execstats", "Order Latency & Slippage"),
             ("risk", "View/Set Risk Settings"),
             ("help", "Show All Commands")
         ]
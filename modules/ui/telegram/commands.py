@@ -1,7 +1,9 @@
 from telegram import Update
 from telegram.constants import ParseMode
 from telegram.ext import ContextTypes
+import asyncio
 import logging
+from config.config import BASE_DIR, Config
 
 logger = logging.getLogger(__name__)
 
@@ -9,6 +11,31 @@ logger = logging.getLogger(__name__)
 def code(text): return f"<code>{text}</code>"
 def bold(text): return f"<b>{text}</b>"
 
+async def ask_engine(engine, name: str, **args):
+    """
+    Queues a command for the strategy loop and waits for its result.
+    Raises asyncio.TimeoutError if the loop does not answer in time
+    (the command is then cancelled) and re-raises command errors.
+    """
+    future = engine.commands.submit(name, **args)
+    return await asyncio.wait_for(asyncio.wrap_future(future), timeout=Config.TELEGRAM_COMMAND_TIMEOUT)
+
+async def _reply_command(update: Update, engine, name: str, **args):
+    """ask_engine with the error replies shared by all control commands. None on failure."""
+    if not engine:
+        await update.message.reply_text("Error: Engine not connected.")
+        return None
+    try:
+        return await ask_engine(engine, name, **args)
+    except asyncio.TimeoutError:
+        await update.message.reply_text(f"⏳ Engine did not answer within {Config.TELEGRAM_COMMAND_TIMEOUT}s. Command cancelled.")
+    except ValueError as e:
+        await update.message.reply_text(f"⚠️ {e}")
+    except Exception as e:
+        logger.error("Command %s failed: %s", name, e)
+        await update.message.reply_text(f"⚠️ Command failed: {e}")
+    return None
+
 async def cmd_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(f"ScalpMaster v1.2 Command Centre.\nUse /help for commands.")
 
@@ -16,11 +43,14 @@ async def cmd_help(update: Update, context: ContextTypes.DEFAULT_TYPE):
     msg = (
         f"{bold('COMMANDS')}\n"
         f"/status - System Overview\n"
-        f"/scan - Force Market Scan\n"
         f"/panic - {bold('CLOSE ALL TRADES')}\n"
-        f"/mode [dry/live] - Switch Mode\n"
-        f"/risk [val] - Set Risk %\n"
-        f"/news - Check News Status"
+        f"/scan [SYM] - Scan now, report decisions\n"
+        f"/pause [SYM] - Stop new entries (all or one pair)\n"
+        f"/resume [SYM] - Resume new entries\n"
+        f"/mode - Show Current Mode\n"
+        f"/risk [val] - Show/Set Risk %\n"
+        f"/news - Check News Status\n"
+        f"/execstats [SYM|export] - Order Latency & Slippage"
     )
     await update.message.reply_text(msg, parse_mode=ParseMode.HTML)
 
@@ -31,12 +61,17 @@ async def cmd_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     state = engine.get_state_summary()
+    age = state.get('state_age')
+    last_loop = f"{state.get('loop_ms', 0.0):.0f} ms, {age:.0f}s ago" if age is not None else "n/a"
+    broker = f"{state.get('broker_calls', 0)} calls, {state.get('broker_ms', 0.0):.0f} ms"
     
     msg = (
         f"{bold('SYSTEM STATUS')}\n"
         f"Mode: {code(state['mode'])}\n"
         f"Uptime: {state['uptime']}\n"
-        f"State: {'🟢 RUNNING' if state['is_running'] else '🔴 STOPPED'}\n\n"
+        f"State: {'🟢 RUNNING' if state['is_running'] else '🔴 STOPPED'}\n"
+        f"Last Loop: {last_loop}\n"
+        f"Broker: {broker}\n\n"
         f"{bold('ACCOUNT')}\n"
         f"Balance: ${state['balance']:.2f}\n"
         f"Equity: ${state['equity']:.2f}\n"
@@ -49,22 +84,80 @@ async def cmd_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def cmd_health(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text("System Healthy. Tick Loop Active.")
 
+_PANIC_ENGINE_DOWN = (f"⛔ {bold('PANIC NOT EXECUTED')}\nThe engine loop is not running: NOTHING was closed.\n"
+                      f"Close the positions in the terminal.")
+
 async def cmd_panic(update: Update, context: ContextTypes.DEFAULT_TYPE):
     engine = context.bot_data.get("engine")
-    if engine:
-        engine.panic_close()
-        await update.message.reply_text(f"🚨 {bold('PANIC EXECUTED')} 🚨\nClose all signal sent.")
-    else:
+    if not engine:
         await update.message.reply_text("Error: Engine not connected.")
+        return
+    if not engine.is_running:
+        await update.message.reply_text(_PANIC_ENGINE_DOWN, parse_mode=ParseMode.HTML)
+        return
+    # Runs on the engine thread like every control command, but a slow loop
+    # only delays the close (the report follows as a notification)
+    future = engine.commands.submit("panic")
+    try:
+        report = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)),
+                                        timeout=Config.TELEGRAM_COMMAND_TIMEOUT)
+    except asyncio.TimeoutError:
+        # A loop that stopped meanwhile will never drain the queue
+        if not engine.is_running and future.cancel():
+            await update.message.reply_text(_PANIC_ENGINE_DOWN, parse_mode=ParseMode.HTML)
+        else:
+            await update.message.reply_text(f"🚨 {bold('PANIC QUEUED')} 🚨\nEngine busy: closes at its next loop.",
+                                            parse_mode=ParseMode.HTML)
+        return
+    except Exception as e:
+        logger.error("Command panic failed: %s", e)
+        await update.message.reply_text(f"⚠️ Panic close failed: {e}")
+        return
+    status = "Account FLAT" if report.is_flat else f"{report.remaining} position(s) STILL OPEN"
+    await update.message.reply_text(f"🚨 {bold('PANIC EXECUTED')} 🚨\nClosed {len(report.closed)}/{report.requested}. {status}.",
+                                    parse_mode=ParseMode.HTML)
 
 async def cmd_scan(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    engine = context.bot_data.get("engine")
+    symbol = context.args[0] if context.args else None
     await update.message.reply_text("🔍 Scanning markets...")
+    decisions = await _reply_command(update, engine, "scan", symbol=symbol)
+    if decisions is None:
+        return
+
+    msg = f"{bold('SCAN RESULT')}\n"
+    for sym, decision in decisions.items():
+        if decision is None:
+            msg += f"• {sym}: no data\n"
+        else:
+            msg += f"• {sym}: {decision.bias} | RSI {decision.rsi:.1f} | {decision.status}\n"
+    await update.message.reply_text(msg, parse_mode=ParseMode.HTML)
+
+async def cmd_pause(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    engine = context.bot_data.get("engine")
+    paused = await _reply_command(update, engine, "pause", symbol=context.args[0] if context.args else None)
+    if paused is not None:
+        await update.message.reply_text(f"⏸ Paused: {code(', '.join(paused))}", parse_mode=ParseMode.HTML)
+
+async def cmd_resume(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    engine = context.bot_data.get("engine")
+    paused = await _reply_command(update, engine, "resume", symbol=context.args[0] if context.args else None)
+    if paused is not None:
+        still = ', '.join(paused) if paused else 'none'
+        await update.message.reply_text(f"▶️ Resumed. Still paused: {code(still)}", parse_mode=ParseMode.HTML)
 
 async def cmd_open(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text("Usage: /open [SYM] [BUY/SELL] [LOTS]")
 
 async def cmd_mode(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    await update.message.reply_text(f"Current Mode: DRY-RUN")
+    engine = context.bot_data.get("engine")
+    if not engine:
+        await update.message.reply_text("Engine not connected.")
+        return
+    msg = f"Current Mode: {code(engine.get_state_summary()['mode'])}"
+    if context.args:
+        msg += "\nSwitching mode requires a restart (system.dry_run in settings.yaml)."
+    await update.message.reply_text(msg, parse_mode=ParseMode.HTML)
 
 async def cmd_news(update: Update, context: ContextTypes.DEFAULT_TYPE):
     engine = context.bot_data.get("engine")
@@ -96,8 +189,42 @@ async def cmd_news(update: Update, context: ContextTypes.DEFAULT_TYPE):
              
     await update.message.reply_text(msg, parse_mode=ParseMode.HTML)
 
+async def cmd_execstats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    engine = context.bot_data.get("engine")
+    if not engine:
+        await update.message.reply_text("Engine not connected.")
+        return
+
+    stats = engine.execution.stats
+    args = context.args or []
+
+    if args and args[0].lower() == "export":
+        log_dir = BASE_DIR / "logs"
+        log_dir.mkdir(exist_ok=True)
+        path = log_dir / "execution_stats.csv"
+        rows = stats.export_csv(str(path))
+        await update.message.reply_text(f"📁 Exported {rows} orders to {code(path)}", parse_mode=ParseMode.HTML)
+        return
+
+    symbol = args[0].upper() if args else None
+    await update.message.reply_text(stats.format_report(symbol), parse_mode=ParseMode.HTML)
+
+# --- Config ---
+async def cmd_risk(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    engine = context.bot_data.get("engine")
+    pct = None
+    if context.args:
+        try:
+            pct = float(context.args[0])
+        except ValueError:
+            await update.message.reply_text("Usage: /risk [percent], e.g. /risk 0.25")
+            return
+    risk = await _reply_command(update, engine, "risk", pct=pct)
+    if risk is not None:
+        verb = "set to" if pct is not None else "is"
+        await update.message.reply_text(f"Risk per trade {verb} {code(f'{risk}%')}", parse_mode=ParseMode.HTML)
+
 # --- Config & Debug Stubs ---
-async def cmd_risk(update: Update, context: ContextTypes.DEFAULT_TYPE): await update.message.reply_text("Risk set.")
 async def cmd_trail(update: Update, context: ContextTypes.DEFAULT_TYPE): await update.message.reply_text("Trailing updated.")
 async def cmd_maxloss(update: Update, context: ContextTypes.DEFAULT_TYPE): await update.message.reply_text("MaxLoss updated.")
 async def cmd_test(update: Update, context: ContextTypes.DEFAULT_TYPE): await update.message.reply_text("Test executed.")
@@ -16,9 +16,12 @@ def register_handlers(app: Application, security_filter: filters.BaseFilter):
     add("status", commands.cmd_status)
     add("health", commands.cmd_health)
     add("news", commands.cmd_news)
+    add("execstats", commands.cmd_execstats)
     
     # Control
     add("scan", commands.cmd_scan)
+    add("pause", commands.cmd_pause)
+    add("resume", commands.cmd_resume)
     add("open", commands.cmd_open)
     add("panic", commands.cmd_panic)
     add("mode", commands.cmd_mode)
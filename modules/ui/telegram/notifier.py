@@ -1,58 +1,418 @@
+import html
 import logging
+import re
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
 import requests
 from config.config import Config
 
 logger = logging.getLogger(__name__)
 
+# Message priorities (higher is more important)
+LOW = 0       # Forwarded error logs
+NORMAL = 1    # Trade notifications
+HIGH = 2      # Start / Stop / Panic
+
+MAX_MESSAGE_LENGTH = 4096
+
+# Telegram's supported tags only: text such as "<module>" is never tracked as markup
+_TAG = re.compile(r"<(/?)(b|strong|i|em|u|ins|s|strike|del|code|pre|a|span|tg-spoiler|blockquote)(?:\s[^>]*)?>")
+_TAG_RESERVE = 100  # Room to close and reopen the tags a split cuts through
+
+def split_message(text: str, limit: int = MAX_MESSAGE_LENGTH) -> List[str]:
+    """
+    Splits an HTML message into parts of at most `limit` characters, at
+    line boundaries where possible and never inside a tag or an entity.
+    Tags open at a split are closed and reopened, so every part parses.
+    """
+    if len(text) <= limit:
+        return [text]
+    budget = limit - _TAG_RESERVE
+    parts: List[str] = []
+    open_tags: List[Tuple[str, str]] = []  # (name, opening tag)
+    current = ""
+    for piece in _pieces(text, budget):
+        if current and len(current) + len(piece) > budget:
+            parts.append(current + "".join(f"</{name}>" for name, _ in reversed(open_tags)))
+            current = "".join(tag for _, tag in open_tags)
+        current += piece
+        for match in _TAG.finditer(piece):
+            name = match.group(2)
+            if not match.group(1):
+                open_tags.append((name, match.group(0)))
+            else:
+                for i in range(len(open_tags) - 1, -1, -1):
+                    if open_tags[i][0] == name:
+                        del open_tags[i]
+                        break
+    parts.append(current)
+    return parts
+
+def _pieces(text: str, budget: int):
+    """Lines of text; a line longer than budget is cut where no tag or entity is open."""
+    for line in text.splitlines(keepends=True):
+        while len(line) > budget:
+            cut = budget
+            lt = line.rfind("<", 0, cut)
+            if lt > line.rfind(">", 0, cut):
+                cut = lt
+            amp = line.rfind("&", 0, cut)
+            if amp > line.rfind(";", 0, cut):
+                cut = amp
+            if cut <= 0:
+                cut = budget
+            yield line[:cut]
+            line = line[cut:]
+        yield line
+
+class TelegramOutbox:
+    """
+    Outbound Telegram queue drained by a background sender thread.
+
+    Callers only append to an in-memory queue, so the trading loop never
+    waits on HTTP. The sender posts through one pooled requests.Session at
+    most once every min_interval seconds; everything queued in between is
+    merged into a single message (highest priority first, up to Telegram's
+    4096 character limit; longer messages are split by split_message).
+    Forwarded logs (LOW) are never merged with other priorities, and a
+    merged post Telegram rejects (400) is resent part by part. When more than max_queue messages are pending,
+    the oldest message of the lowest priority is dropped and the drop count
+    is reported with the next delivery. 429 responses honour retry_after.
+    """
+    def __init__(self, token: str, chat_id: str, max_queue: int = None, min_interval: float = None,
+                 timeout: float = None, session: Optional[requests.Session] = None):
+        self.url = f"https://api.telegram.org/bot{token}/sendMessage"
+        self.chat_id = chat_id
+        self.max_queue = Config.TELEGRAM_QUEUE_SIZE if max_queue is None else max_queue
+        self.min_interval = Config.TELEGRAM_MIN_INTERVAL if min_interval is None else min_interval
+        self.timeout = Config.TELEGRAM_TIMEOUT if timeout is None else timeout
+        self.session = session or requests.Session()
+
+        self._queues: Tuple[Deque[str], ...] = tuple(deque() for _ in range(HIGH + 1))
+        self._cond = threading.Condition()
+        self._pending = 0
+        self._in_flight = 0
+        self.dropped = 0
+        self._next_send = 0.0
+        self._stop = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Starts the sender thread (idempotent)."""
+        with self._cond:
+            if self._thread is None:
+                self._stop = False
+                self._thread = threading.Thread(target=self._run, name="TelegramSender", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Delivers what is pending (within timeout), then stops the sender."""
+        self.flush(timeout)
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout=1.0)
+
+    def put(self, message: str, priority: int = NORMAL):
+        # Oversized messages (tracebacks, panic reports) are queued as valid parts
+        parts = split_message(message)
+        with self._cond:
+            for part in parts:
+                self._queues[priority].append(part)
+                self._pending += 1
+                if self._pending > self.max_queue:
+                    self._drop_one()
+            self._cond.notify_all()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Waits until the queue is empty. Returns False on timeout."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._pending or self._in_flight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._thread is None:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _drop_one(self):
+        for queue in self._queues[:HIGH]:
+            if queue:
+                queue.popleft()
+                self._pending -= 1
+                self.dropped += 1
+                return
+        # Only HIGH priority left: never dropped, the queue grows instead
+
+    def take_batch(self) -> List[str]:
+        """Pops the next message group (highest priority first) within the size limit."""
+        with self._cond:
+            return self._take_batch()
+
+    def _take_batch(self) -> List[str]:
+        batch: List[str] = []
+        size = 0
+        if self.dropped:
+            note = f"<i>… {self.dropped} lower priority message(s) dropped</i>"
+            batch.append(note)
+            size = len(note)
+            self.dropped = 0
+        urgent = False
+        for priority in range(HIGH, LOW - 1, -1):
+            queue = self._queues[priority]
+            # Log forwards go out on their own: one bad part fails its whole post
+            if priority == LOW and urgent:
+                return batch
+            while queue:
+                extra = len(queue[0]) + (2 if batch else 0)
+                if batch and size + extra > MAX_MESSAGE_LENGTH:
+                    return batch
+                batch.append(queue.popleft())
+                self._pending -= 1
+                size += extra
+                urgent = True
+        return batch
+
+    def _requeue(self, batch: List[str]):
+        # Retried as HIGH so a rate-limited group keeps its place
+        with self._cond:
+            self._queues[HIGH].extendleft(reversed(batch))
+            self._pending += len(batch)
+
+    def deliver(self, batch: List[str]) -> float:
+        """Posts one merged message. Returns seconds to wait before the next send."""
+        # Parts were split by put() and merged within the limit by _take_batch()
+        text = "\n\n".join(batch)
+        try:
+            response = self._post(text)
+            if response.status_code == 429:
+                return self._rate_limited(response, batch)
+            if response.status_code == 400:
+                # Usually "can't parse entities": keep the valid parts
+                logger.warning(f"Telegram rejected a merged message ({_description(response)}), "
+                               f"resending {len(batch)} part(s) separately", extra={"is_telegram": True})
+                return self._deliver_parts(batch)
+            response.raise_for_status()
+        except Exception as e:
+            logger.error(f"Failed to send Telegram notification: {e}", extra={"is_telegram": True})
+        return self.min_interval
+
+    def _deliver_parts(self, batch: List[str]) -> float:
+        """One post per part; a part Telegram cannot parse is sent as plain text."""
+        for i, part in enumerate(batch):
+            response = self._post(part)
+            if response.status_code == 400:
+                response = self._post(_plain_text(part), parse_html=False)
+            if response.status_code == 429:
+                return self._rate_limited(response, batch[i:])
+            if response.status_code >= 400:
+                logger.error(f"Failed to send Telegram notification: {response.status_code} "
+                             f"{_description(response)}", extra={"is_telegram": True})
+        return self.min_interval
+
+    def _post(self, text: str, parse_html: bool = True):
+        payload = {"chat_id": self.chat_id, "text": text}
+        if parse_html:
+            payload["parse_mode"] = "HTML"
+        return self.session.post(self.url, json=payload, timeout=self.timeout)
+
+    def _rate_limited(self, response, batch: List[str]) -> float:
+        retry_after = _retry_after(response)
+        logger.warning(f"Telegram rate limit hit, retrying in {retry_after}s", extra={"is_telegram": True})
+        self._requeue(batch)
+        return max(retry_after, self.min_interval)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stop:
+                    self._cond.wait()
+                if self._stop and not self._pending:
+                    return
+                # Rate limit; messages arriving meanwhile join this batch
+                delay = self._next_send - time.monotonic()
+                if delay > 0 and not self._stop:
+                    self._cond.wait(delay)
+                    continue
+                batch = self._take_batch()
+                self._in_flight = len(batch)
+
+            wait = self.deliver(batch) if batch else 0.0
+
+            with self._cond:
+                self._in_flight = 0
+                self._next_send = time.monotonic() + wait
+                self._cond.notify_all()
+
+def _plain_text(text: str) -> str:
+    """Message without its markup, for a plain text resend."""
+    return html.unescape(_TAG.sub("", text))
+
+def _description(response) -> str:
+    try:
+        return str(response.json().get("description", ""))
+    except Exception:
+        return ""
+
+def _retry_after(response) -> float:
+    try:
+        return float(response.json().get("parameters", {}).get("retry_after", 1))
+    except Exception:
+        return 1.0
+
 class TelegramNotifier:
     """
-    Simple synchronous Telegram notifier using requests.
-    Used for sending alerts from the main thread (Startup, Trade, Error).
+    Fire-and-forget Telegram notifier.
+    Used for sending alerts from the main thread (Startup, Trade, Error);
+    messages are queued and delivered by a background TelegramOutbox.
     """
-    
-    @staticmethod
-    def send(message: str):
+    _outbox: Optional[TelegramOutbox] = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def outbox(cls) -> Optional[TelegramOutbox]:
+        """The shared outbox, created and started on first use."""
+        if cls._outbox is None:
+            token = Config.TELEGRAM_TOKEN
+            chat_id = Config.TELEGRAM_CHAT_ID
+            if not token or not chat_id:
+                return None
+            with cls._lock:
+                if cls._outbox is None:
+                    outbox = TelegramOutbox(token, chat_id)
+                    outbox.start()
+                    cls._outbox = outbox
+        return cls._outbox
+
+    @classmethod
+    def send(cls, message: str, priority: int = NORMAL):
         """
-        Sends a message to the configured Telegram Chat.
+        Queues a message for the configured Telegram Chat. Never blocks.
         """
-        token = Config.TELEGRAM_TOKEN
-        chat_id = Config.TELEGRAM_CHAT_ID
-        
-        if not token or not chat_id:
+        outbox = cls.outbox()
+        if outbox is None:
             logger.warning("Telegram Notification skipped: Token or Chat ID missing.")
             return
+        outbox.put(message, priority)
 
-        url = f"https://api.telegram.org/bot{token}/sendMessage"
-        payload = {
-            "chat_id": chat_id,
-            "text": message,
-            "parse_mode": "HTML"
-        }
-        
-        try:
-            response = requests.post(url, json=payload, timeout=5)
-            response.raise_for_status()
-        except Exception as e:
-            logger.error(f"Failed to send Telegram notification: {e}", extra={"is_telegram": True})
+    @classmethod
+    def flush(cls, timeout: float = 5.0) -> bool:
+        """Waits (bounded) for queued messages to go out, e.g. before shutdown."""
+        if cls._outbox is None:
+            return True
+        return cls._outbox.flush(timeout)
+
+class _Repeat:
+    __slots__ = ("sent_at", "count", "last")
+
+    def __init__(self, sent_at: float, last: logging.LogRecord):
+        self.sent_at = sent_at
+        self.count = 0
+        self.last = last
 
 class TelegramLogHandler(logging.Handler):
     """
     Custom Logging Handler to forward ERRORS to Telegram.
+
+    Records are fingerprinted by logger, message template (record.msg, so
+    log with %-style arguments) and exception type. The first record of a
+    fingerprint is sent; repeats within `window` seconds are only counted
+    (no formatting, no I/O) and reported every `digest_interval` seconds
+    as one digest message. An outage failing every pair on every tick
+    therefore costs one message per distinct error plus one digest.
+    Expired fingerprints are swept from emit() once per window, so one-off
+    errors do not accumulate over a long session.
     """
+    def __init__(self, level=logging.NOTSET, window: float = None, digest_interval: float = None):
+        super().__init__(level)
+        self.window = Config.TELEGRAM_ERROR_WINDOW if window is None else window
+        self.digest_interval = Config.TELEGRAM_DIGEST_INTERVAL if digest_interval is None else digest_interval
+        self._seen: Dict[Tuple, _Repeat] = {}
+        self._next_sweep = 0.0
+        self._timer: Optional[threading.Timer] = None
+
+    @staticmethod
+    def fingerprint(record: logging.LogRecord) -> Tuple:
+        exc_type = record.exc_info[0] if record.exc_info else None
+        if exc_type is None and isinstance(record.args, tuple):
+            exc_type = next((type(a) for a in record.args if isinstance(a, BaseException)), None)
+        return record.name, str(record.msg), exc_type.__name__ if exc_type else None
+
     def emit(self, record):
         # Prevent infinite loops if telegram itself errors
         if getattr(record, "is_telegram", False):
             return
-            
+
         try:
-            msg = self.format(record)
-            if record.levelno >= logging.ERROR:
-                # Add Emoji based on level
-                prefix = "⚠️ <b>WARNING</b>" if record.levelno == logging.WARNING else "🚨 <b>SYSTEM ERROR</b>"
-                if record.levelno >= logging.CRITICAL:
-                    prefix = "🔥 <b>CRITICAL FAILURE</b>"
-                
-                formatted_msg = f"{prefix}\n<pre>{msg}</pre>"
-                TelegramNotifier.send(formatted_msg)
+            if record.levelno < logging.ERROR:
+                return
+            now = time.monotonic()
+            if now >= self._next_sweep:
+                self._sweep(now)
+            key = self.fingerprint(record)
+            repeat = self._seen.get(key)
+            if repeat is not None and now - repeat.sent_at < self.window:
+                repeat.count += 1
+                repeat.last = record
+                self._schedule_digest()
+                return
+            self._seen[key] = _Repeat(now, record)
+            TelegramNotifier.send(self._render(record), priority=LOW)
         except Exception:
             self.handleError(record)
+
+    def _sweep(self, now: float):
+        """Forgets fingerprints whose window expired with nothing left to digest (caller holds the lock)."""
+        for key, repeat in list(self._seen.items()):
+            if not repeat.count and now - repeat.sent_at >= self.window:
+                del self._seen[key]
+        # At most one sweep per window: emit stays O(1) amortized
+        self._next_sweep = now + max(self.window, 1.0)
+
+    def _render(self, record: logging.LogRecord) -> str:
+        # Add Emoji based on level
+        prefix = "🚨 <b>SYSTEM ERROR</b>"
+        if record.levelno >= logging.CRITICAL:
+            prefix = "🔥 <b>CRITICAL FAILURE</b>"
+        return f"{prefix}\n<pre>{html.escape(self.format(record), quote=False)}</pre>"
+
+    def _schedule_digest(self):
+        if self._timer is None:
+            self._timer = threading.Timer(self.digest_interval, self.send_digest)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def send_digest(self) -> int:
+        """Sends the suppressed repeat counts. Returns the number of fingerprints reported."""
+        self.acquire()
+        try:
+            self._timer = None
+            now = time.monotonic()
+            lines = []
+            for key, repeat in list(self._seen.items()):
+                if repeat.count:
+                    lines.append(f"x{repeat.count} {self.format(repeat.last)}")
+                    repeat.count = 0
+            self._sweep(now)
+        finally:
+            self.release()
+        if lines:
+            body = html.escape("\n".join(lines), quote=False)
+            TelegramNotifier.send(f"🔁 <b>REPEATED ERRORS</b> (last {self.digest_interval:g}s)\n<pre>{body}</pre>", priority=LOW)
+        return len(lines)
+
+    def close(self):
+        timer = self._timer
+        if timer is not None:
+            timer.cancel()
+            self.send_digest()
+        super().close()
@@ -1,7 +1,11 @@
+import logging
 from dataclasses import dataclass
 from typing import List, Tuple
+from config.config import Config
 from core.context import TradeContext
 
+logger = logging.getLogger(__name__)
+
 @dataclass
 class TradingDecision:
     can_trade: bool
@@ -15,6 +19,9 @@ class StrategyChecklist:
 
     MAX_SPREAD_POINTS = 20  # Configurable later
     MIN_ATR = 0.00005       # Minimal volatility requirement
+    NEWS_STALE_AFTER = Config.NEWS_STALE_AFTER    # Seconds
+    NEWS_STALE_POLICY = Config.NEWS_STALE_POLICY  # "block", "warn" or "ignore"
+    _news_stale = False  # Last seen staleness (transitions are logged)
 
     def run(self, ctx: TradeContext) -> TradingDecision:
         reasons = []
@@ -73,6 +80,9 @@ class StrategyChecklist:
         # 'risk_status' dict should contain 'can_trade' flag from RiskManager
         if not ctx.risk_status.get('can_trade', False):
             return False, "RISK_LIMIT_HIT"
+        # Portfolio gate (currency exposure / correlation), precomputed per loop
+        if not ctx.risk_status.get('exposure_ok', True):
+            return False, ctx.risk_status.get('exposure_reason', "PORTFOLIO_EXPOSURE")
         return True, ""
 
     def _check_market_quality(self, ctx: TradeContext) -> Tuple[bool, str]:
@@ -130,6 +140,17 @@ class StrategyChecklist:
     def _check_time_constraints(self, ctx: TradeContext) -> Tuple[bool, str]:
         if ctx.is_news_event:
             return False, "NEWS_EVENT_ACTIVE"
+        stale = ctx.news_age_seconds > self.NEWS_STALE_AFTER and self.NEWS_STALE_POLICY != "ignore"
+        if stale != self._news_stale:
+            # Logged on the transition only, not per symbol and tick
+            self._news_stale = stale
+            if not stale:
+                logger.info("News calendar is fresh again")
+            elif self.NEWS_STALE_POLICY == "warn":
+                logger.warning(f"News calendar is stale ({_age_text(ctx.news_age_seconds)}), trading on (policy: warn)")
+        # A stale calendar may be missing today's events
+        if stale and self.NEWS_STALE_POLICY == "block":
+            return False, f"NEWS_DATA_STALE: {_age_text(ctx.news_age_seconds)}"
         if ctx.cooldown_remaining > 0:
             return False, f"COOLDOWN_ACTIVE: {ctx.cooldown_remaining}s"
         return True, ""
@@ -141,3 +162,6 @@ class StrategyChecklist:
         if ctx.current_price <= 0:
             return False, "INVALID_PRICE"
         return True, ""
+
+def _age_text(age: float) -> str:
+    return "never fetched" if age == float("inf") else f"{age / 3600:.1f}h old"
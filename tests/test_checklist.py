@@ -1,4 +1,5 @@
 import unittest
+from dataclasses import replace
 from datetime import datetime
 from core.context import TradeContext
 from strategies.checklist import StrategyChecklist
@@ -50,6 +51,36 @@ class TestStrategyChecklist(unittest.TestCase):
         self.assertFalse(decision.can_trade)
         self.assertIn("RISK_LIMIT_HIT", decision.reasons[0])
 
+    def test_fail_portfolio_exposure(self):
+        ctx = replace(self.valid_ctx, risk_status={
+            "can_trade": True, "exposure_ok": False, "exposure_reason": "CURRENCY_EXPOSURE: USD -3"
+        })
+        decision = self.checklist.run(ctx)
+        self.assertFalse(decision.can_trade)
+        self.assertEqual(decision.reasons, ["CURRENCY_EXPOSURE: USD -3"])
+
+    def test_stale_news_policy(self):
+        ctx = replace(self.valid_ctx, news_age_seconds=self.checklist.NEWS_STALE_AFTER + 1)
+        self.checklist.NEWS_STALE_POLICY = "block"
+        decision = self.checklist.run(ctx)
+        self.assertFalse(decision.can_trade)
+        self.assertIn("NEWS_DATA_STALE", decision.reasons[0])
+
+        self.checklist.NEWS_STALE_POLICY = "ignore"
+        self.assertTrue(self.checklist.run(ctx).can_trade)
+
+    def test_stale_news_warned_once(self):
+        stale = replace(self.valid_ctx, news_age_seconds=self.checklist.NEWS_STALE_AFTER + 1)
+        self.checklist.NEWS_STALE_POLICY = "warn"
+        with self.assertLogs('strategies.checklist', 'INFO') as logs:
+            for symbol in ("EURUSD", "GBPUSD", "USDJPY") * 3:
+                self.assertTrue(self.checklist.run(replace(stale, symbol=symbol)).can_trade)
+            self.checklist.run(self.valid_ctx)
+            self.checklist.run(self.valid_ctx)
+        self.assertEqual(len(logs.records), 2)
+        self.assertIn("stale", logs.records[0].getMessage())
+        self.assertIn("fresh again", logs.records[1].getMessage())
+
     def test_fail_regime(self):
         ctx = TradeContext(
             symbol="EURUSD", timestamp=datetime.now(), current_price=1.1, spread=10,
@@ -1,5 +1,19 @@
+import os
+import shutil
+import tempfile
 import unittest
-from config.config import Config
+from unittest.mock import MagicMock, patch
+import pandas as pd
+import yaml
+from config.config import _NUMERIC_SETTINGS, HOT_RELOAD_KEYS, SETTINGS_PATH, Config, ConfigSnapshot, load_settings, settings_values
+from config.watcher import ConfigWatcher
+from core.bot import ScalpMasterBot
+from core.correlation import RollingCorrelation
+from core.exposure import PortfolioExposure
+from core.risk import RiskManager
+from core.startup import StartupTimer
+from modules.execution.position_manager import PositionManager
+from strategies.checklist import StrategyChecklist
 
 class TestConfigValidation(unittest.TestCase):
     def setUp(self):
@@ -69,5 +83,158 @@ class TestConfigValidation(unittest.TestCase):
             Config.validate()
         self.assertIn("trading.pairs", str(cm.exception))
 
+class TestConfigReload(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        self.settings = load_settings(SETTINGS_PATH)
+        self.path = os.path.join(self.tmp, "settings.yaml")
+        self._write(self.settings)
+        # Every test leaves Config as loaded from the repo settings
+        self.addCleanup(Config.apply, dict(Config.snapshot().values))
+
+    def _write(self, settings, mtime=None):
+        with open(self.path, "w") as f:
+            yaml.safe_dump(settings, f)
+        if mtime is not None:
+            os.utime(self.path, (mtime, mtime))
+
+    def test_repo_settings_are_valid(self):
+        self.assertEqual(Config.check_settings(settings_values(self.settings)), [])
+
+    def test_check_settings_reports_problems(self):
+        values = settings_values(self.settings)
+        values.update(TRADING_PAIRS=[], LOOP_INTERVAL=0, NEWS_STALE_POLICY="panic")
+        problems = "; ".join(Config.check_settings(values))
+        for key in ("trading.pairs", "LOOP_INTERVAL", "stale_policy"):
+            self.assertIn(key, problems)
+
+        values = settings_values(self.settings)
+        values.update(RISK_PER_TRADE_PERCENT=values['MAX_RISK_PER_TRADE_PERCENT'] + 1)
+        self.assertIn("exceeds", Config.check_settings(values)[0])
+
+    def test_check_settings_covers_hot_keys(self):
+        values = settings_values(self.settings)
+        values.update(BREAK_EVEN_ATR="1.0", TRAIL_START_ATR=-1, MIN_STEP_POINTS=-5, MAX_OPEN_TRADES=1.5,
+                      MAX_CURRENCY_EXPOSURE=0, UI_REFRESH_INTERVAL=None, TELEGRAM_COMMAND_TIMEOUT=0,
+                      CONFIG_RELOAD_INTERVAL="2", MANAGE_POSITIONS="yes")
+        problems = "; ".join(Config.check_settings(values))
+        for key in ("BREAK_EVEN_ATR", "TRAIL_START_ATR", "MIN_STEP_POINTS", "MAX_OPEN_TRADES", "MAX_CURRENCY_EXPOSURE",
+                    "UI_REFRESH_INTERVAL", "TELEGRAM_COMMAND_TIMEOUT", "CONFIG_RELOAD_INTERVAL", "enabled"):
+            self.assertIn(key, problems)
+
+        # Every hot-reloadable key is checked before it reaches the engine
+        checked = set(_NUMERIC_SETTINGS) | {"TRADING_PAIRS", "LOG_LEVEL", "NEWS_STALE_POLICY", "MANAGE_POSITIONS"}
+        self.assertEqual(checked, set(HOT_RELOAD_KEYS))
+
+    def test_watcher_publishes_valid_edit_once(self):
+        watcher = ConfigWatcher(self.path)
+        self.assertIsNone(watcher.poll())
+
+        self.settings['trading']['pairs'] = ["EURUSD", "XAUUSD"]
+        self._write(self.settings, mtime=watcher._mtime + 5)
+        snapshot = watcher.poll()
+        self.assertEqual(snapshot.version, 1)
+        self.assertEqual(snapshot.values['TRADING_PAIRS'], ["EURUSD", "XAUUSD"])
+        self.assertIn('TRADING_PAIRS', snapshot.changed(Config.snapshot()))
+        self.assertIs(watcher.take(), snapshot)
+        self.assertIsNone(watcher.take())
+        self.assertIsNone(watcher.poll())
+
+    def test_watcher_rejects_invalid_edit(self):
+        watcher = ConfigWatcher(self.path)
+        self.settings['trading']['pairs'] = []
+        self._write(self.settings, mtime=watcher._mtime + 5)
+        with self.assertLogs('config.watcher', 'ERROR'):
+            self.assertIsNone(watcher.poll())
+        self.assertIsNone(watcher.take())
+
+        with open(self.path, "w") as f:
+            f.write("trading: [unclosed")
+        os.utime(self.path, (watcher._mtime + 10,) * 2)
+        with self.assertLogs('config.watcher', 'ERROR'):
+            self.assertIsNone(watcher.poll())
+
+    def test_watcher_stops_when_interval_set_to_zero(self):
+        watcher = ConfigWatcher(self.path)
+        with patch.object(Config, 'CONFIG_RELOAD_INTERVAL', 0.01):
+            watcher.start()
+            self.addCleanup(watcher.stop)
+            thread = watcher._thread
+            Config.CONFIG_RELOAD_INTERVAL = 0
+            thread.join(1)
+        self.assertFalse(thread.is_alive())
+
+    def test_snapshot_changed_keys(self):
+        current = Config.snapshot()
+        values = dict(current.values, LOOP_INTERVAL=current.values['LOOP_INTERVAL'] + 1)
+        self.assertEqual(ConfigSnapshot.of(values).changed(current), ['LOOP_INTERVAL'])
+        with self.assertRaises(TypeError):
+            ConfigSnapshot.of(values).values['LOOP_INTERVAL'] = 0
+
+class TestEngineConfigApply(unittest.TestCase):
+    def setUp(self):
+        self.addCleanup(Config.apply, dict(Config.snapshot().values))
+        Config.apply({'TRADING_PAIRS': ["EURUSD", "GBPUSD"]})
+        # Only the state apply_config touches (no MT5, no threads)
+        self.bot = ScalpMasterBot.__new__(ScalpMasterBot)
+        self.bot.paused = {"GBPUSD"}
+        self.bot._decisions = {"GBPUSD": MagicMock()}
+        self.bot._correlation_version = 3
+        self.bot.risk_manager = RiskManager()
+        self.bot.position_manager = PositionManager()
+        self.bot.checklist = StrategyChecklist()
+        self.bot.correlation = RollingCorrelation(Config.TRADING_PAIRS, window=10, min_periods=1)
+        for t, (eur, gbp) in enumerate([(1.10, 1.30), (1.11, 1.29), (1.12, 1.31), (1.13, 1.30)]):
+            self.bot.correlation.on_bar("EURUSD", t, eur)
+            self.bot.correlation.on_bar("GBPUSD", t, gbp)
+        self.bot.correlation.on_bar("EURUSD", 4, 1.14)  # Commits bar 3
+        self.bot.exposure = PortfolioExposure(Config.TRADING_PAIRS, self.bot.correlation)
+
+    def _snapshot(self, **changes):
+        return ConfigSnapshot.of(dict(Config.snapshot().values, **changes), version=1)
+
+    @patch('core.bot.ConsoleUI')
+    def test_hot_keys_applied(self, _ui):
+        history = pd.DataFrame({"XAUUSD": [2000.0, 2010.0, 2005.0, 2020.0]}, index=range(4))
+        self.bot._history_closes = MagicMock(return_value=history)
+        snapshot = self._snapshot(TRADING_PAIRS=["EURUSD", "XAUUSD"], RISK_PER_TRADE_PERCENT=0.3, TRAIL_START_ATR=2.5)
+
+        applied = self.bot.apply_config(snapshot)
+
+        self.assertEqual(set(applied), {'TRADING_PAIRS', 'RISK_PER_TRADE_PERCENT', 'TRAIL_START_ATR'})
+        self.bot._history_closes.assert_called_once_with(["XAUUSD"])
+        self.assertEqual(self.bot.risk_manager.base_risk, 0.3)
+        self.assertEqual(self.bot.position_manager.trail_start_atr, 2.5)
+        self.assertEqual(self.bot.correlation.symbols, ["EURUSD", "XAUUSD"])
+        self.assertIs(self.bot.exposure.correlation, self.bot.correlation)
+        self.assertEqual(self.bot.correlation.count, 3)  # EURUSD returns kept
+        self.assertEqual(self.bot._correlation_version, -1)
+        self.assertEqual((self.bot.paused, self.bot._decisions), (set(), {}))
+        _ui.remove_row.assert_called_once_with("GBPUSD")
+
+    def test_restart_keys_deferred(self):
+        snapshot = self._snapshot(TIMEFRAME="M5")
+        with self.assertLogs('core.bot', 'WARNING') as logs:
+            self.assertEqual(self.bot.apply_config(snapshot), [])
+        self.assertIn("TIMEFRAME", logs.output[0])
+        self.assertNotEqual(Config.TIMEFRAME, "M5")
+
+class TestStartupTimer(unittest.TestCase):
+    @patch('core.startup.time.perf_counter')
+    def test_phases_and_single_report(self, clock):
+        clock.side_effect = [10.0, 10.2]
+        startup = StartupTimer(started=9.99)
+        startup.mark("config")
+        startup.mark("mt5_connect")
+        self.assertEqual([name for name, _ in startup.phases], ["config", "mt5_connect"])
+        self.assertAlmostEqual(startup.phases[1][1], 200.0)
+        self.assertAlmostEqual(startup.total_ms, 210.0)
+        with self.assertLogs('core.startup', level='INFO') as logs:
+            text = startup.report()
+            startup.report()
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn("mt5_connect", text)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,72 @@
+import io
+import unittest
+from unittest.mock import MagicMock
+from modules.ui.console import ConsoleUI, Dashboard
+
+class TestDashboard(unittest.TestCase):
+    def _stream(self):
+        stream = io.StringIO()
+        stream.write = MagicMock(side_effect=stream.write)
+        return stream
+
+    def test_plain_frame_is_one_write(self):
+        stream = self._stream()
+        dashboard = Dashboard(stream, live=False)
+        dashboard.begin("🔍 Scanning 2 assets at 12:00:00...")
+        dashboard.row("EURUSD", ConsoleUI.format_row("EURUSD", "LONG", 55.0, "Wait Pullback"))
+        dashboard.row("GBPUSD", ConsoleUI.format_row("GBPUSD", "ERR", 0.0, "Error: timeout", error=True))
+        dashboard.end()
+
+        stream.write.assert_called_once()
+        self.assertEqual(stream.getvalue(), (
+            "\n🔍 Scanning 2 assets at 12:00:00...\n" + "-" * 60 + "\n"
+            "   📊 EURUSD : LONG  | RSI: 55.0 | Wait Pullback\n"
+            "   ⚠️ GBPUSD : ERR   | RSI: 0.0 | Error: timeout\n\n"
+        ))
+
+    def test_live_redraws_changed_rows_only(self):
+        stream = self._stream()
+        dashboard = Dashboard(stream, live=True, refresh_interval=0.0)
+        dashboard.begin("header")
+        dashboard.row("EURUSD", "eur 1")
+        dashboard.row("GBPUSD", "gbp 1")
+        dashboard.end(now=1.0)
+        self.assertIn("\x1b[2J", stream.getvalue())  # First frame: full draw
+
+        stream.seek(0)
+        stream.truncate()
+        dashboard.begin("header")
+        dashboard.row("EURUSD", "eur 1")
+        dashboard.row("GBPUSD", "gbp 2")
+        dashboard.end(now=2.0)
+        output = stream.getvalue()
+        self.assertNotIn("\x1b[2J", output)
+        self.assertIn("\x1b[4;1Hgbp 2\x1b[K", output)
+        self.assertNotIn("eur 1", output)
+
+        # Nothing changed: nothing written
+        stream.write.reset_mock()
+        dashboard.end(now=3.0)
+        stream.write.assert_not_called()
+        dashboard.reset()
+
+    def test_live_refresh_is_throttled(self):
+        stream = self._stream()
+        dashboard = Dashboard(stream, live=True, refresh_interval=1.0)
+        dashboard.begin("header")
+        dashboard.row("EURUSD", "eur 1")
+        dashboard.end(now=10.0)
+        stream.write.reset_mock()
+
+        dashboard.row("EURUSD", "eur 2")
+        dashboard.end(now=10.5)
+        stream.write.assert_not_called()
+        dashboard.end(now=11.0)
+        self.assertIn("eur 2", stream.write.call_args[0][0])
+        dashboard.reset()
+
+    def test_auto_mode_falls_back_when_not_a_tty(self):
+        self.assertFalse(Dashboard(io.StringIO()).live)
+
+if __name__ == '__main__':
+    unittest.main()
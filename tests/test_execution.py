@@ -1,6 +1,11 @@
+import threading
 import unittest
 from unittest.mock import MagicMock
 from modules.execution.order_manager import OrderManager
+from modules.execution.pipeline import OrderPipeline, OrderRequest, OrderResult
+from modules.execution.analytics import ExecutionRecord, ExecutionStats, slippage_points
+from modules.execution.position_cache import DEAL_ENTRY_IN, DEAL_ENTRY_OUT, PositionCache
+from modules.execution.position_manager import PositionManager
 from modules.data.mt5_loader import MT5
 from config.config import Config
 
@@ -56,6 +61,11 @@ class TestOrderManager(unittest.TestCase):
         self.assertEqual(args['type'], MT5.ORDER_TYPE_BUY)
         self.assertEqual(args['price'], 1.1005) # Ask
 
+        # Instrumented: requested vs filled, slippage in points
+        summary = self.om.stats.summary("EURUSD")
+        self.assertEqual(summary['count'], 1)
+        self.assertEqual(summary['fill_rate'], 1.0)
+
     def test_execute_trade_duplicate_prevention(self):
         # Mock existing trade
         p1 = MagicMock(magic=123456)
@@ -79,5 +89,267 @@ class TestOrderManager(unittest.TestCase):
         success = self.om.execute_trade("EURUSD", "BUY", 0.1, 0.9, 1.1)
         self.assertFalse(success)
 
+    def test_submit_trade_async(self):
+        MT5.positions_get.return_value = []
+        MT5.symbol_info_tick.return_value = MagicMock(ask=1.1005, bid=1.1000)
+        MT5.order_send.return_value = MagicMock(retcode=10009, order=778)
+
+        future = self.om.submit_trade("EURUSD", "BUY", 0.1, 1.0900, 1.1100, meta={'risk_pct': 0.5})
+        result = future.result(timeout=5)
+
+        self.assertTrue(result.success)
+        self.assertEqual(result.ticket, 778)
+        self.assertEqual(result.request.meta['risk_pct'], 0.5)
+        self.assertEqual(self.om.drain_order_results(), [result])
+        self.assertFalse(self.om.has_pending_order("EURUSD"))
+        self.om.shutdown()
+
+    def test_close_all_trades_single_snapshot(self):
+        positions = [
+            MagicMock(magic=123456, ticket=1, symbol="EURUSD", type=MT5.ORDER_TYPE_BUY, volume=0.1),
+            MagicMock(magic=123456, ticket=2, symbol="EURUSD", type=MT5.ORDER_TYPE_SELL, volume=0.2),
+            MagicMock(magic=123456, ticket=3, symbol="GBPUSD", type=MT5.ORDER_TYPE_BUY, volume=0.3),
+        ]
+        self.addCleanup(MT5.reset_mock, side_effect=True)
+        # First snapshot has positions, the follow-up sweep and verification are flat
+        MT5.positions_get.side_effect = [positions, [], []]
+        MT5.symbol_info_tick.return_value = MagicMock(ask=1.1005, bid=1.1000)
+        MT5.order_send.return_value = MagicMock(retcode=10009)
+
+        report = self.om.close_all_trades()
+
+        self.assertTrue(report.is_flat)
+        self.assertEqual(sorted(report.closed), [1, 2, 3])
+        self.assertEqual(report.requested, 3)
+        # One tick per symbol, one order per position
+        self.assertEqual(MT5.symbol_info_tick.call_count, 2)
+        self.assertEqual(MT5.order_send.call_count, 3)
+
+    def test_close_retries_requote(self):
+        position = MagicMock(magic=123456, ticket=9, symbol="EURUSD", type=MT5.ORDER_TYPE_BUY, volume=0.1)
+        self.addCleanup(MT5.reset_mock, side_effect=True)
+        MT5.positions_get.side_effect = [[position], [], []]
+        MT5.symbol_info_tick.side_effect = [MagicMock(ask=1.1005, bid=1.1000), MagicMock(ask=1.1003, bid=1.0998)]
+        MT5.order_send.side_effect = [MagicMock(retcode=10004), MagicMock(retcode=10009)]
+
+        report = self.om.close_all_trades()
+
+        self.assertEqual(report.closed, [9])
+        self.assertEqual(MT5.order_send.call_count, 2)
+        # Retry used the refreshed bid
+        self.assertEqual(MT5.order_send.call_args[0][0]['price'], 1.0998)
+
+    def test_execution_records_broker_fill_price(self):
+        MT5.positions_get.return_value = []
+        MT5.symbol_info_tick.return_value = MagicMock(ask=1.10050, bid=1.10000)
+        MT5.order_send.return_value = MagicMock(retcode=10009, order=5, price=1.10053)
+
+        self.om.execute_trade("EURUSD", "BUY", 0.1, 1.0900, 1.1100)
+
+        self.assertAlmostEqual(self.om.stats.summary("EURUSD")['slippage_avg'], 3.0)
+
+    def test_entry_retries_requote_with_fresh_price(self):
+        self.addCleanup(MT5.reset_mock, side_effect=True)
+        MT5.positions_get.return_value = []
+        MT5.symbol_info_tick.side_effect = [MagicMock(ask=1.1005, bid=1.1000), MagicMock(ask=1.1007, bid=1.1002)]
+        MT5.order_send.side_effect = [MagicMock(retcode=10004), MagicMock(retcode=10009, order=11, price=1.1007)]
+
+        future = self.om.submit_trade("EURUSD", "BUY", 0.1, 1.0900, 1.1100)
+        result = future.result(timeout=5)
+
+        self.assertTrue(result.success)
+        self.assertEqual([a.retcode for a in result.attempts], [10004, 10009])
+        self.assertEqual(result.attempts[1].price, 1.1007)
+        self.assertEqual(self.om.stats.summary("EURUSD")['retries'], 1)
+        self.assertEqual(self.om.stats.retcode_distribution(), {10004: 1, 10009: 1})
+        self.om.shutdown()
+
+    def test_filling_mode_fallback_is_cached(self):
+        self.addCleanup(MT5.reset_mock, side_effect=True)
+        MT5.positions_get.return_value = []
+        MT5.symbol_info_tick.return_value = MagicMock(ask=1.1005, bid=1.1000)
+        MT5.order_send.side_effect = [MagicMock(retcode=10030), MagicMock(retcode=10009, order=1)]
+
+        self.assertTrue(self.om.execute_trade("EURUSD", "BUY", 0.1, 1.09, 1.11))
+        first, second = [c[0][0]['type_filling'] for c in MT5.order_send.call_args_list]
+        self.assertEqual(first, MT5.ORDER_FILLING_IOC)
+        self.assertEqual(second, MT5.ORDER_FILLING_FOK)
+
+        # Next order goes straight to the mode the broker accepted
+        self.assertEqual(self.om._filling_candidates("EURUSD")[0], MT5.ORDER_FILLING_FOK)
+
+    def test_non_retryable_failure_is_not_retried(self):
+        MT5.positions_get.return_value = []
+        MT5.symbol_info_tick.return_value = MagicMock(ask=1.1005, bid=1.1000)
+        MT5.order_send.return_value = MagicMock(retcode=10019)  # No money
+
+        self.assertFalse(self.om.execute_trade("EURUSD", "BUY", 0.1, 1.09, 1.11))
+        MT5.order_send.assert_called_once()
+
+class TestExecutionStats(unittest.TestCase):
+    def _rec(self, symbol, send_ms, success=True, slip=0.0, ts=1700000000.0):
+        return ExecutionRecord(
+            timestamp=ts, symbol=symbol, direction="BUY", success=success,
+            retcode=10009 if success else 10006, queue_ms=1.0, send_ms=send_ms,
+            requested_price=1.1, fill_price=1.1, slippage_points=slip,
+        )
+
+    def test_slippage_sign(self):
+        self.assertAlmostEqual(slippage_points("BUY", 1.1000, 1.1002, 0.00001), 20.0)
+        self.assertAlmostEqual(slippage_points("SELL", 1.1000, 1.1002, 0.00001), -20.0)
+
+    def test_aggregation(self):
+        stats = ExecutionStats(window=3)
+        for ms in (10, 20, 30, 40):
+            stats.record(self._rec("EURUSD", ms, slip=1.0))
+        stats.record(self._rec("GBPUSD", 100, success=False))
+
+        eur = stats.summary("EURUSD")
+        # Rolling window keeps only the last 3
+        self.assertEqual(eur['count'], 3)
+        self.assertEqual(eur['send_ms_p50'], 30)
+        self.assertEqual(stats.summary("GBPUSD")['fill_rate'], 0.0)
+        self.assertEqual(stats.retcode_distribution(), {10009: 4, 10006: 1})
+        self.assertIn(22, stats.by_hour())  # 1700000000 is 22:13 UTC
+        self.assertIn("EURUSD", stats.format_report())
+
+class TestOrderPipeline(unittest.TestCase):
+    def test_per_symbol_serialization(self):
+        release = threading.Event()
+
+        def slow_handler(request):
+            release.wait(5)
+            return OrderResult(request, success=True)
+
+        pipeline = OrderPipeline(slow_handler, max_workers=2)
+        first = pipeline.submit(OrderRequest("EURUSD", "BUY", 0.1, 1.0, 1.2))
+
+        # Same symbol is rejected while in flight, other symbols are not blocked
+        self.assertIsNone(pipeline.submit(OrderRequest("EURUSD", "SELL", 0.1, 1.2, 1.0)))
+        self.assertTrue(pipeline.is_pending("EURUSD"))
+        other = pipeline.submit(OrderRequest("GBPUSD", "BUY", 0.1, 1.0, 1.2))
+        self.assertIsNotNone(other)
+
+        release.set()
+        self.assertTrue(first.result(timeout=5).success)
+        other.result(timeout=5)
+        self.assertFalse(pipeline.is_pending("EURUSD"))
+        self.assertEqual(len(pipeline.drain()), 2)
+        pipeline.shutdown()
+
+    def test_handler_exception_becomes_failed_result(self):
+        def broken_handler(request):
+            raise RuntimeError("terminal gone")
+
+        pipeline = OrderPipeline(broken_handler, max_workers=0)
+        result = pipeline.submit(OrderRequest("EURUSD", "BUY", 0.1, 1.0, 1.2)).result()
+        self.assertFalse(result.success)
+        self.assertIn("terminal gone", result.comment)
+        self.assertFalse(pipeline.is_pending("EURUSD"))
+
+def _deal(ticket, entry, position_id, profit=0.0, magic=123456, symbol="EURUSD", time=1000):
+    return MagicMock(ticket=ticket, entry=entry, position_id=position_id, profit=profit,
+                     commission=0.0, swap=0.0, magic=magic, symbol=symbol, volume=0.1,
+                     price=1.1, time=time, time_msc=time * 1000, reason=4)
+
+class TestPositionCache(unittest.TestCase):
+    def setUp(self):
+        MT5.reset_mock()
+        self.addCleanup(MT5.reset_mock, side_effect=True)
+        self.cache = PositionCache(magic_number=123456)
+        self.events = []
+        self.cache.subscribe(self.events.append)
+
+    def test_single_snapshot_per_symbol_lookups(self):
+        MT5.positions_get.return_value = [
+            MagicMock(ticket=1, magic=123456, symbol="EURUSD"),
+            MagicMock(ticket=2, magic=123456, symbol="GBPUSD"),
+            MagicMock(ticket=3, magic=999999, symbol="EURUSD"),
+        ]
+        MT5.history_deals_get.return_value = []
+        self.cache.sync()
+
+        self.assertEqual(self.cache.count("EURUSD"), 1)
+        self.assertEqual(self.cache.count("GBPUSD"), 1)
+        self.assertEqual(self.cache.count("USDJPY"), 0)
+        self.assertEqual(self.cache.total(), 2)
+        MT5.positions_get.assert_called_once_with()
+
+    def test_close_events_are_emitted_once(self):
+        MT5.positions_get.return_value = []
+        # Existing history is not replayed on the first sync
+        MT5.history_deals_get.return_value = [_deal(10, DEAL_ENTRY_OUT, 1, profit=-5.0)]
+        self.assertEqual(self.cache.sync(), [])
+
+        MT5.history_deals_get.return_value = [
+            _deal(10, DEAL_ENTRY_OUT, 1, profit=-5.0),
+            _deal(11, DEAL_ENTRY_IN, 2, time=1001),
+            _deal(12, DEAL_ENTRY_OUT, 2, profit=12.5, time=1002),
+            _deal(13, DEAL_ENTRY_OUT, 3, magic=999999, time=1003),  # Not ours
+        ]
+        closed = self.cache.sync()
+        self.assertEqual([t.position_id for t in closed], [2])
+        self.assertEqual(closed[0].profit, 12.5)
+        self.assertEqual(closed[0].reason, "SL")
+        self.assertEqual(self.events, closed)
+
+        # Overlapping query window: nothing new
+        self.assertEqual(self.cache.sync(), [])
+
+    def test_terminal_error_keeps_last_snapshot(self):
+        MT5.positions_get.return_value = [MagicMock(ticket=1, magic=123456, symbol="EURUSD")]
+        MT5.history_deals_get.return_value = []
+        self.cache.sync()
+        MT5.positions_get.return_value = None
+        MT5.history_deals_get.return_value = None
+        self.assertEqual(self.cache.sync(), [])
+        self.assertEqual(self.cache.count("EURUSD"), 1)
+
+class TestPositionManager(unittest.TestCase):
+    def setUp(self):
+        MT5.reset_mock()
+        self.pm = PositionManager(break_even_atr=1.0, break_even_lock_points=10,
+                                  trail_start_atr=1.5, trail_distance_atr=1.0, min_step_points=20)
+        self.pm._points["EURUSD"] = 0.00001
+        self.pm.set_atr("EURUSD", 0.0010)
+
+    def _buy(self, ticket=1, sl=1.0985):
+        return MagicMock(ticket=ticket, symbol="EURUSD", type=0, price_open=1.1000, sl=sl, tp=1.1030)
+
+    def test_no_update_before_trigger(self):
+        self.assertEqual(self.pm.compute_updates([self._buy()], {"EURUSD": (1.1005, 1.1006)}), [])
+
+    def test_break_even(self):
+        updates = self.pm.compute_updates([self._buy()], {"EURUSD": (1.1010, 1.1011)})
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(updates[0].reason, "BREAK_EVEN")
+        self.assertAlmostEqual(updates[0].sl, 1.1001)
+
+    def test_trailing_and_sell_side(self):
+        sell = MagicMock(ticket=2, symbol="EURUSD", type=1, price_open=1.1000, sl=1.1015, tp=1.0970)
+        updates = self.pm.compute_updates(
+            [self._buy(), sell], {"EURUSD": (1.1020, 1.1021)}
+        )
+        # Only the long is in profit: trail 1 ATR below the bid
+        self.assertEqual([u.ticket for u in updates], [1])
+        self.assertEqual(updates[0].reason, "TRAIL")
+        self.assertAlmostEqual(updates[0].sl, 1.1010)
+
+    def test_min_step_suppresses_small_moves(self):
+        # Already trailed to 1.1010; bid moved 1 pip -> below the 2 pip step
+        pos = self._buy(sl=1.1010)
+        self.assertEqual(self.pm.compute_updates([pos], {"EURUSD": (1.1021, 1.1022)}), [])
+        self.assertEqual(len(self.pm.compute_updates([pos], {"EURUSD": (1.1030, 1.1031)})), 1)
+
+    def test_run_sends_sltp(self):
+        om = OrderManager()
+        MT5.order_send.return_value = MagicMock(retcode=10009)
+        applied = self.pm.run(om, [self._buy()], {"EURUSD": (1.1010, 1.1011)})
+        self.assertEqual(len(applied), 1)
+        request = MT5.order_send.call_args[0][0]
+        self.assertEqual(request["action"], MT5.TRADE_ACTION_SLTP)
+        self.assertEqual(request["position"], 1)
+        self.assertEqual(request["tp"], 1.1030)
+
 if __name__ == '__main__':
     unittest.main()
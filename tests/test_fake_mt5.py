@@ -0,0 +1,134 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+import numpy as np
+import pandas as pd
+from modules.data.fake_mt5 import (
+    RES_E_IPC_TIMEOUT, RES_E_NO_IPC, TRADE_RETCODE_DONE, TRADE_RETCODE_INVALID_FILL, TRADE_RETCODE_REQUOTE,
+    FakeTerminal,
+)
+
+START = 1_700_000_000  # 1699999980 is the open of the start minute
+
+class TestFakeTerminal(unittest.TestCase):
+    def setUp(self):
+        self.now = [0.0]
+        self.terminal = self._terminal()
+        self.terminal.initialize()
+
+    def _terminal(self, **kwargs):
+        kwargs.setdefault("history_bars", 300)
+        return FakeTerminal(start=START, clock=lambda: self.now[0], **kwargs)
+
+    def _buy(self, **fields):
+        tick = self.terminal.symbol_info_tick("EURUSD")
+        request = {"action": FakeTerminal.TRADE_ACTION_DEAL, "symbol": "EURUSD", "volume": 0.1,
+                   "type": FakeTerminal.ORDER_TYPE_BUY, "price": tick.ask, "deviation": 10, "magic": 7,
+                   "type_filling": FakeTerminal.ORDER_FILLING_IOC}
+        request.update(fields)
+        return self.terminal.order_send(request)
+
+    def test_requires_initialize(self):
+        terminal = self._terminal()
+        self.assertIsNone(terminal.terminal_info())
+        self.assertEqual(terminal.last_error(), RES_E_NO_IPC)
+        self.assertTrue(terminal.initialize())
+        self.assertTrue(terminal.terminal_info().connected)
+
+    def test_rates_and_ticks_agree(self):
+        rates = self.terminal.copy_rates_from_pos("EURUSD", FakeTerminal.TIMEFRAME_M1, 0, 50)
+        self.assertEqual(len(rates), 50)
+        self.assertTrue((np.diff(rates["time"]) == 60).all())
+        self.assertEqual(rates["time"][-1], START - 20)
+        self.assertTrue((rates["high"] >= rates["low"]).all())
+
+        self.now[0] = 25.0
+        tick = self.terminal.symbol_info_tick("EURUSD")
+        forming = self.terminal.copy_rates_from_pos("EURUSD", FakeTerminal.TIMEFRAME_M1, 0, 1)[0]
+        self.assertEqual(forming["close"], tick.bid)
+        self.assertTrue(forming["low"] <= tick.bid <= forming["high"])
+        self.assertAlmostEqual(tick.ask - tick.bid, 10 * 0.00001)
+
+        hourly = self.terminal.copy_rates_from_pos("EURUSD", FakeTerminal.TIMEFRAME_H1, 1, 1)[0]
+        minutes = self.terminal.copy_rates_from_pos("EURUSD", FakeTerminal.TIMEFRAME_M1, 0, 200)
+        inside = minutes[(minutes["time"] >= hourly["time"]) & (minutes["time"] < hourly["time"] + 3600)]
+        self.assertEqual(hourly["high"], inside["high"].max())
+        self.assertEqual(hourly["close"], inside["close"][-1])
+
+    def test_same_seed_same_market(self):
+        other = self._terminal()
+        other.initialize()
+        for symbol in ("EURUSD", "USDJPY"):
+            np.testing.assert_array_equal(
+                self.terminal.copy_rates_from_pos(symbol, FakeTerminal.TIMEFRAME_M1, 0, 100),
+                other.copy_rates_from_pos(symbol, FakeTerminal.TIMEFRAME_M1, 0, 100),
+            )
+        self.assertEqual(self.terminal.symbol_info("USDJPY").digits, 3)
+
+    def test_order_fill_and_take_profit(self):
+        tick = self.terminal.symbol_info_tick("EURUSD")
+        result = self._buy(tp=round(tick.ask + 0.0001, 5))
+        self.assertEqual(result.retcode, TRADE_RETCODE_DONE)
+        self.assertEqual(result.price, tick.ask)
+        [position] = self.terminal.positions_get(symbol="EURUSD")
+        self.assertEqual((position.ticket, position.magic), (result.order, 7))
+
+        # Run the clock until a tick touches the TP
+        while self.terminal.positions_get() and self.now[0] < 86400:
+            self.now[0] += 60
+        deals = self.terminal.history_deals_get(0, START + 86400)
+        self.assertEqual([d.entry for d in deals], [FakeTerminal.DEAL_ENTRY_IN, FakeTerminal.DEAL_ENTRY_OUT])
+        exit_deal = deals[-1]
+        self.assertEqual((exit_deal.reason, exit_deal.position_id), (FakeTerminal.DEAL_REASON_TP, result.order))
+        self.assertGreaterEqual(exit_deal.price, position.tp)
+        self.assertEqual(self.terminal.account_info().balance, round(10000.0 + exit_deal.profit, 2))
+
+    def test_close_by_position(self):
+        opened = self._buy()
+        tick = self.terminal.symbol_info_tick("EURUSD")
+        closed = self.terminal.order_send({
+            "action": FakeTerminal.TRADE_ACTION_DEAL, "symbol": "EURUSD", "volume": 0.1,
+            "type": FakeTerminal.ORDER_TYPE_SELL, "position": opened.order, "price": tick.bid, "deviation": 10,
+        })
+        self.assertEqual(closed.retcode, TRADE_RETCODE_DONE)
+        self.assertEqual(self.terminal.positions_get(), ())
+
+    def test_rejections(self):
+        self.assertEqual(self._buy(price=1.0).retcode, TRADE_RETCODE_REQUOTE)
+        self.assertEqual(self._buy(type_filling=FakeTerminal.ORDER_FILLING_RETURN).retcode, TRADE_RETCODE_INVALID_FILL)
+
+        self.terminal.inject("order_send", retcode=TRADE_RETCODE_REQUOTE)
+        self.assertEqual(self._buy().retcode, TRADE_RETCODE_REQUOTE)
+        self.terminal.inject("symbol_info_tick")
+        self.assertIsNone(self.terminal.symbol_info_tick("EURUSD"))
+        self.assertEqual(self.terminal.last_error(), RES_E_IPC_TIMEOUT)
+        self.assertEqual(self._buy().retcode, TRADE_RETCODE_DONE)
+
+        self.terminal.disconnect()
+        self.assertIsNone(self.terminal.terminal_info())
+
+    def test_latency_and_failure_rate(self):
+        sleep = MagicMock()
+        terminal = self._terminal(latency_ms=5.0, failure_rate=1.0)
+        terminal._sleep = sleep
+        terminal.initialize()
+        self.assertIsNone(terminal.symbol_info_tick("EURUSD"))
+        sleep.assert_called_with(0.005)
+        self.assertEqual(terminal.calls, 2)
+
+    def test_recorded_bars(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp, True)
+        closes = 1.2 + np.arange(400) * 0.0001
+        pd.DataFrame({"time": np.arange(400) * 60, "open": closes, "high": closes + 0.0002,
+                      "low": closes - 0.0002, "close": closes}).to_csv(os.path.join(tmp, "EURUSD.csv"), index=False)
+        terminal = self._terminal(bars_path=tmp)
+        terminal.initialize()
+        rates = terminal.copy_rates_from_pos("EURUSD", FakeTerminal.TIMEFRAME_M1, 1, 3)
+        # The first history_bars recorded bars are history, the rest plays from the start minute
+        np.testing.assert_allclose(rates["close"], closes[297:300])
+
+if __name__ == '__main__':
+    unittest.main()
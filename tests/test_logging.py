@@ -0,0 +1,67 @@
+import io
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from core.logging_setup import JsonFormatter, setup_logging
+from modules.ui.telegram.notifier import TelegramLogHandler
+
+class TestLoggingPipeline(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        self.logger = logging.getLogger("test.logging.pipeline")
+        self.logger.propagate = False
+        self.addCleanup(setattr, self.logger, "handlers", [])
+
+    def test_json_lines_to_file_and_stream(self):
+        path = os.path.join(self.tmp, "logs", "bot.log")
+        stream = io.StringIO()
+        listener = setup_logging("DEBUG", "json", path, logger=self.logger, stream=stream)
+        self.logger.info("Scanned %s", "EURUSD", extra={"symbol": "EURUSD", "stage": "scan", "latency_ms": 1.5})
+        listener.stop()
+
+        with open(path, encoding="utf-8") as f:
+            entry = json.loads(f.readline())
+        self.assertEqual(entry["msg"], "Scanned EURUSD")
+        self.assertEqual((entry["symbol"], entry["stage"], entry["latency_ms"]), ("EURUSD", "scan", 1.5))
+        self.assertEqual(json.loads(stream.getvalue())["level"], "INFO")
+
+    def test_records_reach_handlers_unformatted(self):
+        captured = []
+        sink = logging.Handler()
+        sink.emit = captured.append
+        listener = setup_logging("INFO", "text", "", extra_handlers=[sink], logger=self.logger, stream=io.StringIO())
+        self.logger.error("Error processing %s: %s", "EURUSD", ConnectionError("offline"))
+        listener.stop()
+
+        # Template and args survive the queue (TelegramLogHandler fingerprints them)
+        [record] = captured
+        self.assertEqual(record.msg, "Error processing %s: %s")
+        self.assertEqual(TelegramLogHandler.fingerprint(record)[2], "ConnectionError")
+
+    def test_handler_levels_respected(self):
+        captured = []
+        sink = logging.Handler(logging.ERROR)
+        sink.emit = captured.append
+        listener = setup_logging("DEBUG", "text", "", extra_handlers=[sink], logger=self.logger, stream=io.StringIO())
+        self.logger.debug("tick")
+        self.logger.error("boom")
+        listener.stop()
+        self.assertEqual([r.getMessage() for r in captured], ["boom"])
+
+    def test_json_formatter_exception(self):
+        try:
+            raise KeyError("atr")
+        except KeyError:
+            record = self.logger.makeRecord(self.logger.name, logging.ERROR, __file__, 1, "failed", (), None)
+            record.exc_info = sys.exc_info()
+        entry = json.loads(JsonFormatter().format(record))
+        self.assertIn("KeyError", entry["exc"])
+        self.assertNotIn("symbol", entry)
+
+if __name__ == '__main__':
+    unittest.main()
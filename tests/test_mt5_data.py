@@ -4,6 +4,8 @@ from unittest.mock import MagicMock
 from modules.data.connection_manager import ConnectionManager
 from modules.data.market_data import MarketData
 from modules.data.mt5_loader import MT5
+from modules.data.fake_mt5 import RES_E_IPC_TIMEOUT, TRADE_RETCODE_REQUOTE, FakeTerminal
+from modules.data.mt5_profiler import CallProfile, CallStats, MT5Profiler
 from config.config import Config
 
 class TestMT5Data(unittest.TestCase):
@@ -68,5 +70,52 @@ class TestMT5Data(unittest.TestCase):
         self.assertIsInstance(df, pd.DataFrame)
         self.assertTrue(df.empty)
 
+class TestMT5Profiler(unittest.TestCase):
+    def setUp(self):
+        # Every clock read advances 1 ms: each call measures exactly 1 ms
+        self.ticks = iter(range(10**6))
+        self.profile = CallProfile(clock=lambda: next(self.ticks) / 1000.0)
+        self.terminal = FakeTerminal(start=1_700_000_000, history_bars=50)
+        self.mt5 = MT5Profiler(self.terminal, self.profile)
+        self.mt5.initialize()
+
+    def _tick(self):
+        return self.mt5.symbol_info_tick("EURUSD")
+
+    def test_counts_per_function_and_site(self):
+        self.assertEqual(self.mt5.ORDER_TYPE_BUY, FakeTerminal.ORDER_TYPE_BUY)
+        for _ in range(3):
+            self._tick()
+        self.mt5.copy_rates_from_pos("EURUSD", self.mt5.TIMEFRAME_M1, 0, 10)
+
+        self.assertEqual(self.profile.functions["symbol_info_tick"].count, 3)
+        self.assertAlmostEqual(self.profile.functions["symbol_info_tick"].mean_ms, 1.0)
+        [(function, site)] = [key for key in self.profile.sites if key[0] == "symbol_info_tick"]
+        self.assertIn("test_mt5_data._tick:", site)
+        calls, ms = self.profile.loop()
+        self.assertEqual(calls, 5)  # initialize + 3 ticks + rates
+        self.assertAlmostEqual(ms, 5.0)
+        self.assertEqual(self.profile.loop()[0], 0)
+
+    def test_error_codes(self):
+        self.terminal.inject("symbol_info_tick")
+        self.assertIsNone(self._tick())
+        self.terminal.inject("order_send", retcode=TRADE_RETCODE_REQUOTE)
+        self.mt5.order_send({"action": 1, "symbol": "EURUSD", "volume": 0.1, "type": 0})
+        self.assertEqual(self.profile.errors, {
+            ("symbol_info_tick", RES_E_IPC_TIMEOUT[0]): 1, ("order_send", TRADE_RETCODE_REQUOTE): 1,
+        })
+        report = self.profile.report()
+        self.assertIn("order_send", report)
+        self.assertIn(f"symbol_info_tick {RES_E_IPC_TIMEOUT[0]} x1", report)
+
+    def test_histogram_percentiles(self):
+        stats = CallStats()
+        for ms in [0.3] * 98 + [40.0, 700.0]:
+            stats.record(ms, False)
+        self.assertEqual(stats.percentile(0.5), 0.5)
+        self.assertEqual(stats.percentile(0.99), 50.0)
+        self.assertEqual(stats.percentile(1.0), 700.0)
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,7 +1,13 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
 import unittest
 from unittest.mock import MagicMock, patch
 from datetime import datetime
-from modules.data.news_loader import NewsLoader
+from modules.data.news_loader import NewsLoader, NewsSnapshot
 
 class TestNewsLoader(unittest.TestCase):
     def setUp(self):
@@ -73,5 +79,189 @@ class TestNewsLoader(unittest.TestCase):
         is_news = self.loader.is_news_imminent("GBPCHF")
         self.assertFalse(is_news)
 
+class TestNewsRefresh(unittest.TestCase):
+    @patch('modules.data.news_loader.requests.get')
+    def test_background_refresh_swaps_snapshot(self, mock_get):
+        fetched = threading.Event()
+        def respond(*args, **kwargs):
+            fetched.set()
+            response = MagicMock()
+            response.json.return_value = [
+                {"title": "NFP", "country": "USD", "date": "2024-01-05T13:30:00+00:00", "impact": "High"}
+            ]
+            return response
+        mock_get.side_effect = respond
+
+        loader = NewsLoader()
+        self.assertEqual(loader.news_age(), float("inf"))
+        old = loader.snapshot
+        loader.start()
+        self.addCleanup(loader.stop)
+        self.assertTrue(fetched.wait(2))
+        for _ in range(100):
+            if loader.snapshot is not old:
+                break
+            threading.Event().wait(0.01)
+
+        self.assertEqual(len(loader.snapshot.events), 1)
+        self.assertLess(loader.news_age(), 5)
+        # Hot path never fetches while the refresher runs
+        mock_get.reset_mock()
+        loader.is_news_imminent("EURUSD")
+        mock_get.assert_not_called()
+
+    @patch('modules.data.news_loader.requests.get', side_effect=Exception("timeout"))
+    def test_failed_refresh_keeps_snapshot(self, mock_get):
+        loader = NewsLoader()
+        snapshot = NewsSnapshot.build([], 15, fetched_at=1.0)
+        loader._set_snapshot(snapshot)
+        self.assertFalse(loader.refresh())
+        self.assertIs(loader.snapshot, snapshot)
+
+class TestNewsTimeline(unittest.TestCase):
+    def setUp(self):
+        self.loader = NewsLoader()
+        self.loader.last_fetch_time = float("inf")  # No network
+        events = [
+            {"title": "NFP", "country": "USD", "date": "2024-01-05T13:30:00+00:00", "impact": "High"},
+            {"title": "ISM", "country": "USD", "date": "2024-01-05T13:40:00+00:00", "impact": "High"},
+            {"title": "CPI", "country": "EUR", "date": "2024-01-05T10:00:00+01:00", "impact": "High"},
+            {"title": "Bad Date", "country": "EUR", "date": "not-a-date", "impact": "High"},
+        ]
+        self.loader._set_snapshot(NewsSnapshot.build(events, 15))
+
+    def _at(self, iso):
+        patcher = patch('modules.data.news_loader.datetime')
+        mock_datetime = patcher.start()
+        self.addCleanup(patcher.stop)
+        mock_datetime.utcnow.return_value = datetime.fromisoformat(iso)
+        return mock_datetime
+
+    def test_overlapping_windows_are_merged(self):
+        usd = self.loader.snapshot.timelines["USD"]
+        self.assertEqual(len(usd.starts), 1)
+        self.assertEqual(usd.ends[0] - usd.starts[0], 40 * 60)  # 13:15 -> 13:55
+        self.assertEqual(usd.titles[0], "NFP, ISM")
+
+    def test_blackout_edges(self):
+        self._at("2024-01-05T13:15:00")
+        self.assertTrue(self.loader.is_news_imminent("GBPUSD"))
+        self.loader._state[1].clear()
+        self._at("2024-01-05T13:14:59")
+        self.assertFalse(self.loader.is_news_imminent("GBPUSD"))
+        self.loader._state[1].clear()
+        # Offset-aware date converted to UTC (10:00+01:00 -> 09:00Z)
+        self._at("2024-01-05T09:10:00")
+        self.assertTrue(self.loader.is_news_imminent("EURJPY"))
+        self.assertFalse(self.loader.is_news_imminent("GBPJPY"))
+
+    def test_cached_boundary_until_next_window(self):
+        self._at("2024-01-05T12:00:00")
+        self.assertFalse(self.loader.is_news_imminent("EURUSD"))
+        active, since, until = self.loader._state[1]["EURUSD"]
+        # Quiet since EUR's window ended, until USD's window starts
+        self.assertFalse(active)
+        self.assertEqual(until - since, (13 * 60 + 15 - (9 * 60 + 15)) * 60)
+
+        # Inside the cached range the timelines are not consulted
+        with patch.object(self.loader, '_symbol_currencies') as currencies:
+            self._at("2024-01-05T13:00:00")
+            self.assertFalse(self.loader.is_news_imminent("EURUSD"))
+            currencies.assert_not_called()
+        self._at("2024-01-05T13:20:00")
+        self.assertTrue(self.loader.is_news_imminent("EURUSD"))
+
+    def test_upcoming_events(self):
+        self._at("2024-01-05T12:00:00")
+        titles = [e["title"] for e in self.loader.get_upcoming_events(limit=5)]
+        self.assertEqual(titles, ["NFP", "ISM"])
+
+class TestNewsCache(unittest.TestCase):
+    EVENTS = [
+        {"title": "NFP", "country": "USD", "date": "2024-01-05T13:30:00+00:00", "impact": "High"},
+        {"title": "Retail Sales", "country": "USD", "date": "2024-01-05T15:00:00+00:00", "impact": "Low"},
+    ]
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        self.cache_path = os.path.join(self.tmp, "news_cache.json")
+
+    def _response(self, status=200, headers=None):
+        response = MagicMock()
+        response.status_code = status
+        response.headers = headers or {}
+        response.json.return_value = self.EVENTS
+        return response
+
+    @patch('modules.data.news_loader.requests.get')
+    def test_cache_round_trip(self, mock_get):
+        mock_get.return_value = self._response(headers={"ETag": '"v1"', "Last-Modified": "Fri, 05 Jan 2024 00:00:00 GMT"})
+        loader = NewsLoader(cache_path=self.cache_path)
+        self.assertTrue(loader.refresh())
+
+        restored = NewsLoader(cache_path=self.cache_path)
+        self.assertEqual([e["title"] for e in restored.snapshot.events], ["NFP"])
+        self.assertEqual(restored.snapshot.timelines["USD"].starts, loader.snapshot.timelines["USD"].starts)
+        self.assertAlmostEqual(restored.snapshot.fetched_at, loader.snapshot.fetched_at)
+        self.assertLess(restored.news_age(), 5)
+        self.assertEqual(restored._etag, '"v1"')
+
+    @patch('modules.data.news_loader.requests.get')
+    def test_not_modified_keeps_events(self, mock_get):
+        mock_get.return_value = self._response(headers={"ETag": '"v1"'})
+        loader = NewsLoader(cache_path=self.cache_path)
+        loader.refresh()
+        events = loader.snapshot.events
+        loader.last_fetch_time = loader.snapshot.fetched_at - 100
+
+        mock_get.return_value = self._response(status=304)
+        self.assertTrue(loader.refresh())
+        self.assertEqual(mock_get.call_args.kwargs["headers"], {"If-None-Match": '"v1"'})
+        self.assertIs(loader.snapshot.events, events)
+        self.assertLess(loader.news_age(), 5)
+        mock_get.return_value.json.assert_not_called()
+
+    def test_unreadable_cache_is_ignored(self):
+        with open(self.cache_path, "w") as f:
+            f.write("{ not json")
+        loader = NewsLoader(cache_path=self.cache_path)
+        self.assertEqual(loader.news_age(), float("inf"))
+
+    @patch('modules.data.news_loader.requests.get')
+    def test_calendar_file_replaces_feed(self, mock_get):
+        calendar = os.path.join(self.tmp, "calendar.json")
+        with open(calendar, "w") as f:
+            json.dump(self.EVENTS, f)
+        loader = NewsLoader(calendar_file=calendar)
+        self.assertTrue(loader.refresh())
+        mock_get.assert_not_called()
+        self.assertEqual(len(loader.snapshot.events), 1)
+
+        # Unchanged file: not re-parsed
+        events = loader.snapshot.events
+        self.assertTrue(loader.refresh())
+        self.assertIs(loader.snapshot.events, events)
+
+        with open(calendar, "w") as f:
+            json.dump([], f)
+        os.utime(calendar, (time.time() + 10, time.time() + 10))
+        self.assertTrue(loader.refresh())
+        self.assertEqual(len(loader.snapshot.events), 0)
+
+    def test_calendar_file_is_never_cached(self):
+        calendar = os.path.join(self.tmp, "calendar.json")
+        with open(calendar, "w") as f:
+            json.dump(self.EVENTS, f)
+        loader = NewsLoader(cache_path=self.cache_path, calendar_file=calendar)
+        self.assertTrue(loader.refresh())
+        self.assertTrue(loader.refresh())
+        self.assertFalse(os.path.exists(self.cache_path))
+
+        # A cache written by anything but the feed is not trusted either
+        with open(self.cache_path, "w") as f:
+            json.dump({"source": calendar, "fetched_at": time.time(), "events": self.EVENTS}, f)
+        self.assertEqual(NewsLoader(cache_path=self.cache_path).news_age(), float("inf"))
+
 if __name__ == '__main__':
     unittest.main()
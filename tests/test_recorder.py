@@ -0,0 +1,130 @@
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+import numpy as np
+from modules.data.fake_mt5 import RES_E_IPC_TIMEOUT, FakeTerminal
+from modules.data.mt5_recorder import (
+    RES_E_NOT_FOUND, MT5Recorder, ReplayTerminal, _decode, _encode, call_key, read_frames,
+)
+
+class TestSessionRecording(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        self.path = os.path.join(self.tmp, "session.mt5rec")
+        self.now = [0.0]
+        self.terminal = FakeTerminal(start=1_700_000_000, history_bars=500, clock=lambda: self.now[0])
+
+    def _record(self):
+        """A short session; returns what the engine saw."""
+        mt5 = MT5Recorder(self.terminal, self.path)
+        seen = [mt5.initialize(), mt5.login(login=1, password="secret", server="demo")]
+        for _ in range(5):
+            seen.append(mt5.copy_rates_from_pos("EURUSD", mt5.TIMEFRAME_M1, 0, 500))
+            seen.append(mt5.symbol_info_tick("EURUSD"))
+            self.now[0] += 20
+        tick = seen[-1]
+        seen.append(mt5.order_send({"action": mt5.TRADE_ACTION_DEAL, "symbol": "EURUSD", "volume": 0.1,
+                                    "type": mt5.ORDER_TYPE_BUY, "price": tick.ask, "deviation": 10, "magic": 7}))
+        seen.append(mt5.positions_get())
+        self.terminal.inject("account_info")
+        seen.append(mt5.account_info())
+        mt5.shutdown()
+        mt5.close()
+        return seen
+
+    def _replay(self, **kwargs):
+        replay = ReplayTerminal(self.path, **kwargs)
+        seen = [replay.initialize(), replay.login(login=2, password="", server="")]
+        for _ in range(5):
+            seen.append(replay.copy_rates_from_pos("EURUSD", replay.TIMEFRAME_M1, 0, 500))
+            seen.append(replay.symbol_info_tick("EURUSD"))
+        seen.append(replay.order_send({"action": replay.TRADE_ACTION_DEAL, "symbol": "EURUSD", "volume": 0.1,
+                                       "type": replay.ORDER_TYPE_BUY, "price": 0.0}))
+        seen.append(replay.positions_get())
+        seen.append(replay.account_info())
+        return replay, seen
+
+    def test_replay_returns_recorded_responses(self):
+        recorded = self._record()
+        replay, replayed = self._replay(pace="fast")
+
+        for original, copy in zip(recorded, replayed):
+            if isinstance(original, np.ndarray):
+                np.testing.assert_array_equal(original, copy)
+            else:
+                self.assertEqual(original, copy)
+        self.assertEqual(replayed[-2][0].price_open, recorded[-2][0].price_open)
+        self.assertEqual(replayed[-2][0]._fields, recorded[-2][0]._fields)
+        self.assertIsNone(replayed[-1])
+        self.assertEqual(replay.last_error(), RES_E_IPC_TIMEOUT)
+        self.assertEqual(replay.remaining, 1)  # shutdown
+
+        self.assertFalse(hasattr(replay, "close"))
+        # Nothing left for this call
+        self.assertIsNone(replay.symbol_info_tick("EURUSD"))
+        self.assertEqual(replay.last_error(), RES_E_NOT_FOUND)
+
+    def test_compact_and_no_credentials(self):
+        self._record()
+        with gzip.open(self.path, "rb") as f:
+            raw = f.read()
+        self.assertNotIn(b"secret", raw)
+        # 5 x 500 bars, only the first response is stored in full
+        bars = 500 * np.dtype([("time", "<i8"), ("f", "<f8", 4), ("v", "<u8"), ("s", "<i4"), ("r", "<u8")]).itemsize
+        self.assertLess(len(raw), 1.5 * bars)
+
+    def test_realtime_pace(self):
+        self._record()
+        sleep = MagicMock()
+        replay, _ = self._replay(pace="realtime", clock=lambda: 0.0, sleep=sleep)
+        self.assertTrue(sleep.called)
+        self.assertEqual(sorted(c.args[0] for c in sleep.call_args_list),
+                         [c.args[0] for c in sleep.call_args_list])
+
+    def test_last_error_follows_latest_served_call(self):
+        self._record()
+        served = []
+
+        def sleep(wait):
+            # Another thread's call is served while account_info waits for its time
+            if not served:
+                served.append(None)
+                served[0] = replay.positions_get()
+        replay = ReplayTerminal(self.path, pace="realtime", clock=lambda: 0.0, sleep=sleep)
+        self.assertIsNone(replay.account_info())
+        self.assertTrue(served[0])
+        self.assertEqual(replay.last_error(), (1, "Success"))
+
+    def test_plain_arrays_keep_dtype(self):
+        plain = np.arange(6, dtype=np.float32).reshape(2, 3)
+        decoded = _decode(_encode(plain))
+        self.assertEqual(decoded.dtype, plain.dtype)
+        np.testing.assert_array_equal(decoded, plain)
+        self.terminal.initialize()
+        rates = self.terminal.copy_rates_from_pos("EURUSD", self.terminal.TIMEFRAME_M1, 0, 3)
+        self.assertEqual(_decode(_encode(rates)).dtype, rates.dtype)
+
+    def test_truncated_recording(self):
+        self._record()
+        # As if the process died mid-write
+        with open(self.path, "rb") as f:
+            raw = f.read()
+        with open(self.path, "wb") as f:
+            f.write(raw[:len(raw) // 2])
+        with self.assertLogs("modules.data.mt5_recorder", "WARNING"):
+            replay = ReplayTerminal(self.path, pace="fast")
+        self.assertGreater(replay.total, 0)
+
+    def test_call_key(self):
+        self.assertEqual(call_key("copy_rates_from_pos", ("EURUSD", 1, 0, 500), {}),
+                         ("copy_rates_from_pos", "EURUSD", 1, 0, 500))
+        self.assertEqual(call_key("order_send", ({"symbol": "EURUSD", "price": 1.1},), {}), ("order_send", "EURUSD"))
+        self.assertEqual(call_key("positions_get", (), {"ticket": 5}), ("positions_get", ("ticket", 5)))
+        self.assertEqual(call_key("login", (), {"password": "secret"}), ("login",))
+
+if __name__ == '__main__':
+    unittest.main()
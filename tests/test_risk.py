@@ -1,5 +1,11 @@
 import unittest
-from core.risk import RiskManager
+from unittest.mock import MagicMock, patch
+import numpy as np
+import pandas as pd
+from core.bot import ScalpMasterBot
+from core.risk import LotSpec, RiskManager, size_positions
+from core.correlation import RollingCorrelation
+from core.exposure import PortfolioExposure
 from config.config import Config
 
 class TestRiskManager(unittest.TestCase):
@@ -68,5 +74,156 @@ class TestRiskManager(unittest.TestCase):
         lots = self.rm.calculate_lot_size(100000.0, 1.1000, 1.0990, 0.5)
         self.assertAlmostEqual(lots, 5.0)
 
+    def test_lot_size_with_symbol_metadata(self):
+        # USDJPY-like: 1 tick (0.001) is worth 0.67 USD per lot
+        spec = LotSpec(tick_size=0.001, tick_value=0.67, volume_min=0.1, volume_max=2.0, volume_step=0.1)
+        # 500 / (670 * 0.5) = 1.49 -> 1.5 lots
+        self.assertAlmostEqual(self.rm.calculate_lot_size(100000.0, 150.0, 149.5, 0.5, spec), 1.5)
+        # Capped at volume_max, floored at volume_min
+        self.assertEqual(self.rm.calculate_lot_size(100000.0, 150.0, 149.9, 0.5, spec), 2.0)
+        self.assertEqual(self.rm.calculate_lot_size(100.0, 150.0, 149.5, 0.5, spec), 0.1)
+
+    def test_vectorized_matches_scalar(self):
+        rng = np.random.default_rng(3)
+        n = 2000
+        balances = rng.uniform(100, 1e6, n)
+        entries = rng.uniform(0.5, 2.0, n)
+        stops = entries - rng.uniform(1e-4, 1e-2, n)
+        risks = rng.choice([0.25, 0.5, 1.0], n)
+        specs = [LotSpec(), LotSpec(volume_step=0.1, volume_max=50.0)] * (n // 2)
+
+        batch = self.rm.calculate_lot_sizes(balances, entries, stops, risks, specs)
+        scalar = [self.rm.calculate_lot_size(b, e, s, r, spec)
+                  for b, e, s, r, spec in zip(balances, entries, stops, risks, specs)]
+        np.testing.assert_array_equal(batch, scalar)
+
+    def test_invalid_rows_get_zero(self):
+        lots = size_positions([1000.0, 0.0, 1000.0], [1.1, 1.1, 1.1], [1.099, 1.099, 1.1], 0.5)
+        np.testing.assert_array_equal(lots, [0.05, 0.0, 0.0])
+
+class TestRollingCorrelation(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        common = rng.normal(0, 1e-3, 400)
+        noise = rng.normal(0, 1e-3, (400, 3))
+        # A follows the common factor, B is its mirror, C is independent
+        self.returns = np.column_stack([common + 0.2 * noise[:, 0], -common + 0.2 * noise[:, 1], noise[:, 2]])
+        self.symbols = ["EURUSD", "USDCHF", "USDJPY"]
+
+    def test_matches_full_recompute(self):
+        corr = RollingCorrelation(self.symbols, window=100, min_periods=30)
+        for row in self.returns:
+            corr.push(row)
+        expected = np.corrcoef(self.returns[-100:].T)
+        np.testing.assert_allclose(corr.matrix(), expected, atol=1e-9)
+        self.assertGreater(corr.correlation("EURUSD", "EURUSD"), 0.99)
+        self.assertLess(corr.correlation("EURUSD", "USDCHF"), -0.9)
+
+    def test_not_ready_until_min_periods(self):
+        corr = RollingCorrelation(self.symbols, window=100, min_periods=30)
+        for row in self.returns[:10]:
+            corr.push(row)
+        self.assertIsNone(corr.correlation("EURUSD", "USDCHF"))
+
+    def test_bars_commit_per_cross_section(self):
+        corr = RollingCorrelation(["EURUSD", "GBPUSD"], window=10, min_periods=1)
+        corr.on_bar("EURUSD", 1, 1.10)
+        corr.on_bar("GBPUSD", 1, 1.30)
+        corr.on_bar("EURUSD", 2, 1.11)
+        self.assertEqual(corr.count, 0)
+        corr.on_bar("GBPUSD", 2, 1.31)
+        self.assertEqual(corr.count, 1)
+        # Late or repeated bars are ignored
+        corr.on_bar("EURUSD", 2, 1.50)
+        corr.on_bar("EURUSD", 3, 1.12)
+        corr.on_bar("GBPUSD", 4, 1.32)  # Bar 3 committed without GBPUSD
+        self.assertEqual(corr.count, 2)
+
+    def test_seed_from_history(self):
+        closes = pd.DataFrame(np.exp(np.cumsum(self.returns, axis=0)), columns=self.symbols)
+        corr = RollingCorrelation(self.symbols, window=100, min_periods=30)
+        corr.seed(closes)
+        self.assertEqual(corr.count, 100)
+        self.assertLess(corr.correlation("EURUSD", "USDCHF"), -0.9)
+
+    def test_with_symbols_keeps_buffer(self):
+        closes = pd.DataFrame(np.exp(np.cumsum(self.returns, axis=0)), columns=self.symbols)
+        corr = RollingCorrelation(self.symbols[:2], window=100, min_periods=30)
+        corr.seed(closes[self.symbols[:2]])
+
+        resized = corr.with_symbols(["EURUSD", "USDJPY"], closes[["USDJPY"]])
+        self.assertEqual(resized.count, 100)
+        np.testing.assert_allclose(resized.matrix(), np.corrcoef(self.returns[-100:, [0, 2]].T), atol=1e-9)
+        # Original untouched
+        self.assertEqual(corr.symbols, self.symbols[:2])
+
+    def test_unscanned_pairs_still_feed_bars(self):
+        bot = ScalpMasterBot.__new__(ScalpMasterBot)
+        bot.correlation = RollingCorrelation(["EURUSD", "GBPUSD"], window=5, min_periods=1)
+        bot._fed_symbols = set()
+        bars = {"EURUSD": [1.10, 1.11, 1.12, 1.11], "GBPUSD": [1.30, 1.32, 1.34, 1.32]}
+        with patch('core.bot.Config.TRADING_PAIRS', ["EURUSD", "GBPUSD"]), \
+                patch('core.bot.MarketData.get_candles_df') as candles:
+            for t in range(1, 4):
+                candles.side_effect = lambda symbol, tf, n: pd.DataFrame(
+                    {"time": [t - 1, t, t + 1], "close": bars[symbol][t - 1:t + 1] + [0.0]})
+                # GBPUSD is paused: only EURUSD is scanned
+                bot._fed_symbols.clear()
+                bot._feed_correlation("EURUSD", candles("EURUSD", None, 3))
+                bot._feed_unscanned()
+        self.assertEqual(bot.correlation.count, 2)
+        self.assertAlmostEqual(bot.correlation.correlation("EURUSD", "GBPUSD"), 1.0)
+
+class TestPortfolioExposure(unittest.TestCase):
+    @staticmethod
+    def _pos(symbol, type_):
+        return MagicMock(symbol=symbol, type=type_)
+
+    def test_currency_exposure_limit(self):
+        exposure = PortfolioExposure(["EURUSD", "GBPUSD", "USDCHF"], max_currency_exposure=2)
+        exposure.update([self._pos("EURUSD", 0), self._pos("GBPUSD", 0)])
+
+        ok, reason = exposure.check("USDCHF", "SHORT")
+        self.assertFalse(ok)
+        self.assertEqual(reason, "CURRENCY_EXPOSURE: USD -3")
+        # Opposite side reduces USD exposure
+        self.assertTrue(exposure.check("USDCHF", "LONG")[0])
+
+    def test_correlated_position_blocked(self):
+        corr = MagicMock()
+        corr.correlation.return_value = 0.9
+        exposure = PortfolioExposure(["EURUSD", "GBPUSD"], corr, max_currency_exposure=5, max_correlation=0.8)
+        exposure.update([self._pos("EURUSD", 0)])
+
+        ok, reason = exposure.check("GBPUSD", "LONG")
+        self.assertFalse(ok)
+        self.assertIn("CORRELATED_WITH: EURUSD", reason)
+        # Opposite direction is a hedge, not added exposure
+        self.assertTrue(exposure.check("GBPUSD", "SHORT")[0])
+
+    def test_pending_orders_count_as_held(self):
+        exposure = PortfolioExposure(["EURUSD", "GBPUSD", "USDCHF"], max_currency_exposure=2)
+        exposure.update([self._pos("EURUSD", 0)], pending=[("GBPUSD", "BUY")])
+        self.assertEqual(exposure.check("USDCHF", "SHORT"), (False, "CURRENCY_EXPOSURE: USD -3"))
+
+    def test_correlated_signals_of_one_loop(self):
+        corr = MagicMock()
+        corr.correlation.return_value = 0.9
+        bot = ScalpMasterBot.__new__(ScalpMasterBot)
+        bot.exposure = PortfolioExposure(["EURUSD", "GBPUSD"], corr, max_currency_exposure=5, max_correlation=0.8)
+        bot.exposure.update([])
+        # Both passed the scan gate: nothing was held when the loop started
+        self.assertTrue(bot.exposure.check("EURUSD", "LONG")[0] and bot.exposure.check("GBPUSD", "LONG")[0])
+        bot.risk_manager = MagicMock()
+        bot.risk_manager.calculate_lot_sizes.return_value = np.array([0.1, 0.1])
+        bot.execution = MagicMock()
+        bot.position_manager = MagicMock()
+        bot._get_balance = lambda: 10000.0
+        signals = [{'symbol': symbol, 'direction': "BUY", 'entry': 1.1, 'sl': 1.09, 'tp': 1.12, 'atr': 0.001,
+                    'risk_pct': 0.5, 'spec': None} for symbol in ("EURUSD", "GBPUSD")]
+        bot._execute_signals(signals)
+        [call] = bot.execution.submit_trade.call_args_list
+        self.assertEqual(call.args[:2], ("EURUSD", "BUY"))
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,6 +1,6 @@
 import unittest
 from unittest.mock import MagicMock
-from modules.execution.simulator import SimulatedExecution
+from modules.execution.simulator import SimulatedExecution, FillModel
 from modules.data.mt5_loader import MT5
 
 class TestSimulator(unittest.TestCase):
@@ -46,5 +46,138 @@ class TestSimulator(unittest.TestCase):
         self.assertTrue(success)
         self.assertEqual(len(self.sim.get_open_positions("EURUSD")), 0)
 
+    def test_no_tick_rejects_trade(self):
+        MT5.symbol_info_tick.return_value = None
+        success = self.sim.execute_trade("EURUSD", "BUY", 0.1, 1.0900, 1.1100)
+        self.assertFalse(success)
+        self.assertEqual(self.sim.count_open_trades("EURUSD"), 0)
+
+class TestSimulatorTickEngine(unittest.TestCase):
+    def setUp(self):
+        # Backtest style: prices come only from on_tick()
+        self.sim = SimulatedExecution(FillModel(), use_terminal_ticks=False)
+        self.sim.set_symbol_spec("EURUSD", point=0.00001)
+        self.sim.on_tick("EURUSD", 1.1000, 1.1001, time_msc=0)
+
+    def test_long_stop_loss_hit(self):
+        self.sim.execute_trade("EURUSD", "BUY", 0.1, 1.0990, 1.1020)
+        self.assertEqual(self.sim.get_open_positions("EURUSD")[0].price, 1.1001)
+
+        self.assertEqual(self.sim.on_tick("EURUSD", 1.0995, 1.0996, time_msc=1000), [])
+        exits = self.sim.on_tick("EURUSD", 1.0989, 1.0990, time_msc=2000)
+
+        self.assertEqual(len(exits), 1)
+        self.assertEqual(exits[0].reason, "SL")
+        self.assertEqual(exits[0].close_price, 1.0989)
+        self.assertEqual(self.sim.count_open_trades("EURUSD"), 0)
+
+    def test_short_take_profit_hit(self):
+        self.sim.execute_trade("EURUSD", "SELL", 0.1, 1.1010, 1.0980)
+        exits = self.sim.on_tick("EURUSD", 1.0975, 1.0976, time_msc=1000)
+
+        self.assertEqual(len(exits), 1)
+        self.assertEqual(exits[0].reason, "TP")
+        # Limit fill at the target or better
+        self.assertEqual(exits[0].close_price, 1.0976)
+
+    def test_many_positions_only_crossed_levels_close(self):
+        # Same symbol, bypass the one-trade rule through the book directly
+        for i in range(50):
+            self.sim._fill(5000 + i, "EURUSD", 0, 0.1, 1.0900 + i * 0.0001, 0.0, 1.1000, 1.1001, 0)
+
+        exits = self.sim.on_tick("EURUSD", 1.0925, 1.0926, time_msc=1000)
+        # Stops at 1.0925 .. 1.0949 are hit (25 of them)
+        self.assertEqual(len(exits), 25)
+        self.assertEqual(len(self.sim.get_open_positions("EURUSD")), 25)
+
+    def test_latency_delays_fill(self):
+        sim = SimulatedExecution(FillModel(latency_ms=500), use_terminal_ticks=False)
+        sim.on_tick("EURUSD", 1.1000, 1.1001, time_msc=0)
+        self.assertTrue(sim.execute_trade("EURUSD", "BUY", 0.1, 1.0900, 1.1100))
+
+        # Pending order still counts against the one-trade rule
+        self.assertEqual(sim.count_open_trades("EURUSD"), 1)
+        self.assertEqual(sim.get_open_positions("EURUSD"), [])
+
+        sim.on_tick("EURUSD", 1.1002, 1.1003, time_msc=200)
+        self.assertEqual(sim.get_open_positions("EURUSD"), [])
+
+        sim.on_tick("EURUSD", 1.1004, 1.1005, time_msc=600)
+        self.assertEqual(sim.get_open_positions("EURUSD")[0].price, 1.1005)
+
+    def test_modify_sltp_reindexes_book(self):
+        self.sim.execute_trade("EURUSD", "BUY", 0.1, 1.0990, 1.1020)
+        ticket = self.sim.get_open_positions("EURUSD")[0].ticket
+        self.assertTrue(self.sim.modify_sltp(ticket, "EURUSD", 1.0998, 1.1020))
+
+        # Old stop no longer triggers, the new one does
+        self.assertEqual(self.sim.on_tick("EURUSD", 1.0999, 1.1000, time_msc=1000), [])
+        exits = self.sim.on_tick("EURUSD", 1.0997, 1.0998, time_msc=2000)
+        self.assertEqual(exits[0].reason, "SL")
+
+    def test_spread_and_slippage_are_adverse(self):
+        sim = SimulatedExecution(FillModel(spread_points=10, slippage_points=5, seed=1), use_terminal_ticks=False)
+        sim.set_symbol_spec("EURUSD", point=0.00001)
+        sim.on_tick("EURUSD", 1.1000, 1.1001, time_msc=0)
+        sim.execute_trade("EURUSD", "BUY", 0.1, 1.0900, 1.1100)
+
+        price = sim.get_open_positions("EURUSD")[0].price
+        self.assertGreaterEqual(price, 1.1001 + 0.00005)
+        self.assertLessEqual(price, 1.1001 + 0.00010 + 1e-12)
+
+    def test_close_all_trades(self):
+        for i in range(5):
+            self.sim._fill(7000 + i, "EURUSD", i % 2, 0.1, 0.0, 0.0, 1.1000, 1.1001, 0)
+        report = self.sim.close_all_trades()
+        self.assertTrue(report.is_flat)
+        self.assertEqual(len(report.closed), 5)
+        self.assertEqual(self.sim.get_open_positions(), [])
+
+class TestSimulatedAccount(unittest.TestCase):
+    def setUp(self):
+        self.risk = MagicMock()
+        self.sim = SimulatedExecution(FillModel(), use_terminal_ticks=False,
+                                      risk_manager=self.risk, initial_balance=10000.0)
+        self.sim.set_symbol_spec("EURUSD", point=0.00001, contract_size=100000,
+                                 tick_size=0.00001, tick_value=1.0)
+        self.sim.on_tick("EURUSD", 1.1000, 1.1000, time_msc=0)
+
+    def test_floating_pnl_tracks_ticks(self):
+        self.sim.execute_trade("EURUSD", "BUY", 1.0, 1.0900, 1.1100)
+        account = self.sim.account_info()
+        self.assertAlmostEqual(account.equity, 10000.0)
+        self.assertAlmostEqual(account.margin, 1100.0)  # 1 lot * 100k * 1.1 / 100
+
+        # +10 pips on 1 lot = +100
+        self.sim.on_tick("EURUSD", 1.1010, 1.1011, time_msc=1000)
+        self.assertAlmostEqual(account.profit, 100.0)
+        self.assertAlmostEqual(account.equity, 10100.0)
+        self.assertAlmostEqual(account.balance, 10000.0)
+
+    def test_close_realizes_and_feeds_risk(self):
+        self.sim.execute_trade("EURUSD", "SELL", 0.5, 1.1020, 1.0980)
+        exits = self.sim.on_tick("EURUSD", 1.1025, 1.1025, time_msc=1000)
+
+        # Stop hit at 1.1025: -25 pips on 0.5 lots = -125
+        self.assertAlmostEqual(exits[0].profit, -125.0)
+        account = self.sim.account_info()
+        self.assertAlmostEqual(account.balance, 9875.0)
+        self.assertAlmostEqual(account.profit, 0.0)
+        self.assertAlmostEqual(account.margin, 0.0)
+        self.risk.update_metrics.assert_called_once()
+        self.assertAlmostEqual(self.risk.update_metrics.call_args[0][0], -125.0)
+
+    def test_close_listeners_receive_closed_trade(self):
+        events = []
+        self.sim.subscribe_closes(events.append)
+        self.sim.execute_trade("EURUSD", "BUY", 1.0, 1.0990, 1.1010)
+        self.sim.on_tick("EURUSD", 1.1010, 1.1010, time_msc=2000)
+
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0].reason, "TP")
+        self.assertEqual(events[0].symbol, "EURUSD")
+        self.assertAlmostEqual(events[0].profit, 100.0)
+        self.assertEqual(events[0].time, 2.0)
+
 if __name__ == '__main__':
     unittest.main()
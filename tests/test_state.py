@@ -0,0 +1,157 @@
+import os
+import shutil
+import tempfile
+import dataclasses
+import unittest
+from unittest.mock import MagicMock, patch
+from core.bot import ScalpMasterBot
+from core.engine_state import EngineState, PositionView, SymbolState
+from modules.execution.simulator import FillModel, SimPosition, SimulatedExecution
+from modules.data.state_store import StateStore
+from core.risk import RiskManager
+from core.correlation import RollingCorrelation
+
+class TestStateStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.path = os.path.join(self.tmp, "state.db")
+
+    def test_put_is_buffered_until_flush(self):
+        store = StateStore(self.path, "LIVE")
+        store.put("risk", {"loss_streak": 2})
+        store.put("risk", {"loss_streak": 3})  # Coalesced: latest wins
+        # Readable before it hits disk
+        self.assertEqual(store.get("risk"), {"loss_streak": 3})
+        self.assertEqual(store.flush(), 1)
+        self.assertEqual(store.flush(), 0)
+        store.close()
+
+        reopened = StateStore(self.path, "LIVE")
+        self.assertEqual(reopened.load(), {"risk": {"loss_streak": 3}})
+        reopened.close()
+
+    def test_namespaces_are_isolated(self):
+        live = StateStore(self.path, "LIVE")
+        live.put("risk", {"a": 1})
+        live.close()
+        dry = StateStore(self.path, "DRY-RUN")
+        self.assertIsNone(dry.get("risk"))
+        dry.close()
+
+    def test_wal_mode(self):
+        store = StateStore(self.path)
+        mode = store._conn.execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(mode.lower(), "wal")
+        store.close()
+
+class TestWarmRestart(unittest.TestCase):
+    def test_risk_state_same_day(self):
+        rm = RiskManager()
+        rm.snapshot_account(10000.0)
+        rm.update_metrics(-50)
+        rm.update_metrics(-50)
+        rm.is_hard_stopped = True
+
+        restored = RiskManager()
+        self.assertTrue(restored.restore_state(rm.to_state()))
+        self.assertEqual(restored.daily_start_balance, 10000.0)
+        self.assertEqual(restored.loss_streak, 2)
+        self.assertEqual(restored.trades_today, 2)
+        self.assertTrue(restored.is_hard_stopped)
+        self.assertFalse(restored.needs_snapshot())
+
+    def test_risk_state_previous_day(self):
+        rm = RiskManager()
+        rm.snapshot_account(10000.0)
+        rm.update_metrics(-50)
+        rm.is_hard_stopped = True
+        state = rm.to_state()
+
+        restored = RiskManager()
+        with patch("core.risk._utc_day", return_value="2099-01-01"):
+            self.assertFalse(restored.restore_state(state))
+            self.assertTrue(restored.needs_snapshot())
+        # Streaks survive the day change, daily limits do not
+        self.assertEqual(restored.loss_streak, 1)
+        self.assertFalse(restored.is_hard_stopped)
+
+    def test_correlation_round_trip(self):
+        corr = RollingCorrelation(["EURUSD", "GBPUSD"], window=5, min_periods=1)
+        for i, (a, b) in enumerate([(1.10, 1.30), (1.11, 1.31), (1.12, 1.30), (1.11, 1.32),
+                                     (1.13, 1.33), (1.12, 1.31), (1.14, 1.34)]):
+            corr.on_bar("EURUSD", i, a)
+            corr.on_bar("GBPUSD", i, b)
+
+        restored = RollingCorrelation(["EURUSD", "GBPUSD"], window=5, min_periods=1)
+        self.assertTrue(restored.restore_state(corr.to_state()))
+        self.assertEqual(restored.count, corr.count)
+        self.assertAlmostEqual(restored.correlation("EURUSD", "GBPUSD"), corr.correlation("EURUSD", "GBPUSD"))
+        self.assertFalse(RollingCorrelation(["EURUSD"], window=5).restore_state(corr.to_state()))
+
+    def _sim(self):
+        sim = SimulatedExecution(FillModel(), use_terminal_ticks=False, initial_balance=10000.0)
+        for symbol in ("EURUSD", "GBPUSD"):
+            sim.set_symbol_spec(symbol, point=0.00001)
+            sim.on_tick(symbol, 1.1000, 1.1001, time_msc=0)
+        return sim
+
+    def test_sim_ledger_round_trip(self):
+        sim = self._sim()
+        sim.execute_trade("EURUSD", "BUY", 0.1, 1.0900, 1.1100)
+        sim.execute_trade("GBPUSD", "SELL", 0.1, 1.1100, 1.0900)
+        sim.on_tick("EURUSD", 1.0950, 1.0951, time_msc=1)
+        sim.close_trade(next(iter(sim.positions)), "EURUSD")
+
+        restored = self._sim()
+        restored.restore_state(sim.to_state())
+        self.assertAlmostEqual(restored.account.balance, sim.account.balance)
+        self.assertLess(restored.account.balance, 10000.0)
+        self.assertEqual(list(restored.positions), list(sim.positions))
+        self.assertAlmostEqual(restored.account.margin, sim.account.margin)
+        restored.execute_trade("EURUSD", "BUY", 0.1, 1.0900, 1.1100)
+        self.assertEqual(len(restored.positions), 2)
+
+    def test_dry_run_restores_ledger_with_risk(self):
+        sim = self._sim()
+        sim.execute_trade("EURUSD", "BUY", 0.1, 1.0900, 1.1100)
+        sim.on_tick("EURUSD", 1.0950, 1.0951, time_msc=1)
+        sim.close_trade(next(iter(sim.positions)), "EURUSD")
+        rm = RiskManager()
+        rm.snapshot_account(10000.0)
+        rm.update_metrics(sim.closed[-1].profit)
+
+        bot = ScalpMasterBot.__new__(ScalpMasterBot)
+        bot.state_store = MagicMock()
+        bot.state_store.load.return_value = {'risk': rm.to_state(), 'simulator': sim.to_state()}
+        bot.risk_manager = RiskManager()
+        bot.execution = self._sim()
+        with patch('core.bot.Config.DRY_RUN', True):
+            restored = bot._restore_state()
+        self.assertTrue(restored['simulator'] and restored['risk'])
+        # Daily PnL is measured against the ledger that produced it
+        self.assertAlmostEqual(bot.execution.account.equity - bot.risk_manager.daily_start_balance,
+                               sim.closed[-1].profit)
+
+class TestEngineState(unittest.TestCase):
+    def test_snapshot_is_immutable(self):
+        decisions = {"EURUSD": SymbolState("EURUSD", "LONG", 55.0, "Wait Pullback")}
+        state = EngineState(mode="LIVE", started_at=0.0, symbols=EngineState.freeze(decisions))
+        decisions["GBPUSD"] = SymbolState("GBPUSD", "SHORT", 40.0, "Spread High")
+        # The published copy does not follow later loop changes
+        self.assertEqual(list(state.symbols), ["EURUSD"])
+        with self.assertRaises(TypeError):
+            state.symbols["GBPUSD"] = decisions["GBPUSD"]
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            state.balance = 1.0
+        self.assertIsNone(state.age)
+
+    def test_position_view(self):
+        position = SimPosition(ticket=7, symbol="EURUSD", type=1, volume=0.1, price=1.1, sl=1.11, tp=1.09, magic=1)
+        view = PositionView.from_position(position)
+        self.assertEqual((view.direction, view.price_open, view.profit), ("SELL", 1.1, 0.0))
+        state = EngineState(mode="DRY-RUN", started_at=0.0, published_at=1.0, positions=(view,))
+        self.assertEqual(state.open_trades, 1)
+
+if __name__ == '__main__':
+    unittest.main()
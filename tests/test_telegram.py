@@ -1,6 +1,16 @@
+import asyncio
+import logging
+import threading
 import unittest
-from unittest.mock import AsyncMock, MagicMock
+from unittest.mock import AsyncMock, MagicMock, patch
+from core.bot import ScalpMasterBot
+from core.commands import CommandQueue
+from core.engine_state import SymbolState
+from core.risk import RiskManager
+from modules.data.mt5_loader import MT5
+from modules.execution.simulator import FillModel, SimulatedExecution
 from modules.ui.telegram import commands
+from modules.ui.telegram.notifier import HIGH, LOW, NORMAL, MAX_MESSAGE_LENGTH, TelegramLogHandler, TelegramOutbox
 
 class TestTelegramCommands(unittest.TestCase):
     async def asyncSetUp(self):
@@ -27,5 +37,348 @@ class TestTelegramCommands(unittest.TestCase):
         args = self.update.message.reply_text.call_args[0][0]
         self.assertIn("COMMANDS", args)
 
+class TestTelegramOutbox(unittest.TestCase):
+    def setUp(self):
+        self.session = MagicMock()
+        self.session.post.return_value.status_code = 200
+        self.outbox = TelegramOutbox("token", "42", max_queue=3, min_interval=0.0, session=self.session)
+
+    def _sent(self):
+        return [c.kwargs["json"]["text"] for c in self.session.post.call_args_list]
+
+    def test_put_never_posts(self):
+        self.outbox.put("hello")
+        self.session.post.assert_not_called()
+        self.assertEqual(self.outbox.pending, 1)
+
+    def test_burst_is_merged_by_priority(self):
+        self.outbox.put("error", LOW)
+        self.outbox.put("trade", NORMAL)
+        self.outbox.put("panic", HIGH)
+        self.assertEqual(self.outbox.take_batch(), ["panic", "trade"])
+        # Log forwards never share a post with trade or panic reports
+        self.assertEqual(self.outbox.take_batch(), ["error"])
+        self.assertEqual(self.outbox.pending, 0)
+
+    def test_rejected_batch_resent_part_by_part(self):
+        def post(url, json, timeout):
+            bad = json.get("parse_mode") and "&lt;" not in json["text"] and "<module>" in json["text"]
+            response = MagicMock(status_code=400 if bad else 200)
+            response.json.return_value = {"ok": False, "description": "Bad Request: can't parse entities"}
+            return response
+        self.session.post.side_effect = post
+        self.assertEqual(self.outbox.deliver(["🚨 <b>PANIC CLOSE COMPLETE</b>", "<pre>File <module></pre>"]),
+                         self.outbox.min_interval)
+        sent = [(c.kwargs["json"]["text"], "parse_mode" in c.kwargs["json"]) for c in self.session.post.call_args_list]
+        self.assertIn(("🚨 <b>PANIC CLOSE COMPLETE</b>", True), sent)
+        # The unparsable part still goes out, as plain text
+        self.assertFalse(sent[-1][1])
+        self.assertTrue(sent[-1][0].startswith("File"))
+
+    def test_batch_respects_message_limit(self):
+        self.outbox.max_queue = 10
+        for _ in range(3):
+            self.outbox.put("x" * (MAX_MESSAGE_LENGTH // 2))
+        self.assertEqual(len(self.outbox.take_batch()), 1)
+        self.assertEqual(len(self.outbox.take_batch()), 1)
+        self.assertEqual(len(self.outbox.take_batch()), 1)
+
+    def test_oversized_message_split_into_valid_parts(self):
+        self.outbox.max_queue = 10
+        lines = [f"  File &quot;engine_{i}.py&quot;, line {i}, in run_tick" for i in range(200)]
+        self.outbox.put("🚨 <b>SYSTEM ERROR</b>\n<pre>" + "\n".join(lines) + "</pre>")
+        self.outbox.put("<code>" + "x" * 5000 + "</code>")
+        self.assertGreater(self.outbox.pending, 2)
+        while self.outbox.pending:
+            self.outbox.deliver(self.outbox.take_batch())
+        sent = self._sent()
+        for text in sent:
+            self.assertLessEqual(len(text), MAX_MESSAGE_LENGTH)
+            for tag in ("pre", "code", "b"):
+                self.assertEqual(text.count(f"<{tag}>"), text.count(f"</{tag}>"))
+        body = "".join(sent)
+        self.assertTrue(all(line in body for line in lines))
+
+    def test_overflow_drops_lowest_priority_first(self):
+        self.outbox.put("error 1", LOW)
+        self.outbox.put("trade", NORMAL)
+        self.outbox.put("error 2", LOW)
+        self.outbox.put("panic", HIGH)
+        batch = self.outbox.take_batch()
+        self.assertIn("1 lower priority message(s) dropped", batch[0])
+        self.assertEqual(batch[1:], ["panic", "trade"])
+        self.assertEqual(self.outbox.take_batch(), ["error 2"])
+
+    def test_rate_limited_batch_is_requeued(self):
+        response = MagicMock(status_code=429)
+        response.json.return_value = {"ok": False, "parameters": {"retry_after": 3}}
+        self.session.post.return_value = response
+        self.outbox.put("trade")
+        wait = self.outbox.deliver(self.outbox.take_batch())
+        self.assertEqual(wait, 3.0)
+        self.assertEqual(self.outbox.take_batch(), ["trade"])
+
+    def test_sender_thread_delivers_and_flushes(self):
+        posted = threading.Event()
+        self.session.post.side_effect = lambda *a, **k: (posted.set(), MagicMock(status_code=200))[1]
+        self.outbox.start()
+        self.addCleanup(self.outbox.stop, 1.0)
+        self.outbox.put("started", HIGH)
+        self.assertTrue(self.outbox.flush(2.0))
+        self.assertTrue(posted.is_set())
+        self.assertEqual(self._sent(), ["started"])
+
+class TestTelegramLogHandler(unittest.TestCase):
+    def setUp(self):
+        patcher = patch('modules.ui.telegram.notifier.TelegramNotifier.send')
+        self.send = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.handler = TelegramLogHandler(window=600, digest_interval=3600)
+        self.handler.setFormatter(logging.Formatter('%(name)s: %(message)s'))
+        self.addCleanup(self.handler.close)
+        self.logger = logging.getLogger("test.telegram.dedup")
+        self.logger.propagate = False
+        self.logger.addHandler(self.handler)
+        self.addCleanup(self.logger.removeHandler, self.handler)
+
+    def test_repeats_are_suppressed_and_digested(self):
+        for tick in range(3):
+            for symbol in ("EURUSD", "GBPUSD", "USDJPY"):
+                self.logger.error("Error processing %s: %s", symbol, ConnectionError("terminal offline"))
+        self.assertEqual(self.send.call_count, 1)
+        self.assertIn("Error processing EURUSD", self.send.call_args[0][0])
+
+        self.assertEqual(self.handler.send_digest(), 1)
+        digest = self.send.call_args[0][0]
+        self.assertIn("REPEATED ERRORS", digest)
+        self.assertIn("x8 test.telegram.dedup: Error processing USDJPY", digest)
+        # Nothing new suppressed: no second digest
+        self.assertEqual(self.handler.send_digest(), 0)
+
+    def test_exception_type_is_part_of_fingerprint(self):
+        self.logger.error("Error processing %s: %s", "EURUSD", ConnectionError("offline"))
+        self.logger.error("Error processing %s: %s", "EURUSD", KeyError("atr"))
+        self.logger.error("Order failed")
+        self.assertEqual(self.send.call_count, 3)
+
+    def test_sent_again_after_window(self):
+        self.handler.window = 0
+        self.logger.error("Order failed")
+        self.logger.error("Order failed")
+        self.assertEqual(self.send.call_count, 2)
+
+    def test_expired_fingerprints_are_swept_without_digest(self):
+        with patch('modules.ui.telegram.notifier.time.monotonic', return_value=1000.0):
+            for i in range(50):
+                self.logger.error(f"One-off failure {i}")
+        self.assertEqual(len(self.handler._seen), 50)
+        with patch('modules.ui.telegram.notifier.time.monotonic', return_value=1000.0 + self.handler.window):
+            self.logger.error("Another failure")
+        self.assertEqual(list(self.handler._seen), [self.handler.fingerprint(
+            logging.LogRecord("test.telegram.dedup", logging.ERROR, "", 0, "Another failure", None, None))])
+
+    def test_log_text_is_html_escaped(self):
+        try:
+            (lambda: sorted([1, "a"]))()
+        except TypeError:
+            self.logger.exception("Sizing failed: %s", "'<' not supported")
+        alert = self.send.call_args[0][0]
+        self.assertIn("&lt;lambda&gt;", alert)
+        self.assertIn("'&lt;' not supported", alert)
+        body = alert.split("<pre>", 1)[1].rsplit("</pre>", 1)[0]
+        self.assertNotIn("<", body)
+
+        for _ in range(2):
+            self.logger.error("Bad value <%s>", "None")
+        self.handler.send_digest()
+        self.assertIn("Bad value &lt;None&gt;", self.send.call_args[0][0])
+
+    def test_warnings_and_telegram_errors_ignored(self):
+        self.logger.warning("Spread high")
+        self.logger.error("Failed to send", extra={"is_telegram": True})
+        self.send.assert_not_called()
+
+class TestCommandQueue(unittest.TestCase):
+    def test_submit_wakes_loop(self):
+        queue = CommandQueue()
+        self.assertFalse(queue.wait(0))
+        future = queue.submit("pause", symbol="EURUSD")
+        self.assertTrue(queue.wait(0))
+        [command] = queue.drain()
+        self.assertEqual((command.name, command.args), ("pause", {"symbol": "EURUSD"}))
+        self.assertIs(command.future, future)
+        self.assertFalse(queue.wait(0))
+
+    def test_drain_is_bounded(self):
+        queue = CommandQueue()
+        for _ in range(5):
+            queue.submit("risk")
+        self.assertEqual(len(queue.drain(limit=3)), 3)
+        # Remaining commands keep the loop awake
+        self.assertTrue(queue.wait(0))
+        self.assertEqual(len(queue.drain(limit=3)), 2)
+
+class TestEngineCommands(unittest.TestCase):
+    def setUp(self):
+        # Only the state the command handlers touch (no MT5, no threads)
+        self.bot = ScalpMasterBot.__new__(ScalpMasterBot)
+        self.bot.commands = CommandQueue()
+        self.bot.paused = set()
+        self.bot.risk_manager = RiskManager()
+        self.bot._decisions = {}
+        patcher = patch('core.bot.Config.TRADING_PAIRS', ["EURUSD", "GBPUSD"])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_pause_resume_and_risk(self):
+        pause = self.bot.commands.submit("pause", symbol="eurusd")
+        risk = self.bot.commands.submit("risk", pct=0.25)
+        bad = self.bot.commands.submit("risk", pct=50)
+        unknown = self.bot.commands.submit("pause", symbol="XAUUSD")
+        self.assertEqual(self.bot._apply_commands(), [])
+        self.assertEqual(pause.result(0), ["EURUSD"])
+        self.assertEqual(risk.result(0), 0.25)
+        self.assertEqual(self.bot.risk_manager.base_risk, 0.25)
+        self.assertRaises(ValueError, bad.result, 0)
+        self.assertRaises(ValueError, unknown.result, 0)
+
+        resume = self.bot.commands.submit("resume")
+        self.bot._apply_commands()
+        self.assertEqual(resume.result(0), [])
+
+    def test_scan_answered_after_scan_stage(self):
+        future = self.bot.commands.submit("scan", symbol="GBPUSD")
+        scans = self.bot._apply_commands()
+        self.assertFalse(future.done())
+        self.bot._decisions["GBPUSD"] = SymbolState("GBPUSD", "LONG", 60.0, "Wait Pullback")
+        self.bot._complete_scans(scans)
+        self.assertEqual(future.result(0)["GBPUSD"].status, "Wait Pullback")
+
+    def test_cancelled_command_is_skipped(self):
+        future = self.bot.commands.submit("pause")
+        future.cancel()
+        self.bot._apply_commands()
+        self.assertEqual(self.bot.paused, set())
+
+class TestTelegramControlCommands(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.update = MagicMock()
+        self.update.message.reply_text = AsyncMock()
+        self.context = MagicMock()
+        self.engine = MagicMock()
+        self.engine.commands = CommandQueue()
+        self.context.bot_data = {"engine": self.engine}
+        # Stand-in for the strategy loop
+        self.stop = threading.Event()
+        self.loop = threading.Thread(target=self._engine_loop, daemon=True)
+        self.loop.start()
+
+    async def asyncTearDown(self):
+        self.stop.set()
+        self.loop.join(1)
+
+    def _engine_loop(self):
+        while not self.stop.is_set():
+            self.engine.commands.wait(0.05)
+            for command in self.engine.commands.drain():
+                if command.future.set_running_or_notify_cancel():
+                    command.future.set_result(["EURUSD"] if command.name == "pause" else 0.3)
+
+    async def test_pause_acknowledged(self):
+        self.context.args = ["EURUSD"]
+        await commands.cmd_pause(self.update, self.context)
+        self.assertIn("Paused", self.update.message.reply_text.call_args[0][0])
+        self.assertIn("EURUSD", self.update.message.reply_text.call_args[0][0])
+
+    async def test_risk_shows_value(self):
+        self.context.args = []
+        await commands.cmd_risk(self.update, self.context)
+        self.assertIn("0.3%", self.update.message.reply_text.call_args[0][0])
+
+    async def test_timeout_reply(self):
+        self.stop.set()
+        self.loop.join(1)
+        self.context.args = []
+        with patch.object(commands.Config, 'TELEGRAM_COMMAND_TIMEOUT', 0.05):
+            await commands.cmd_pause(self.update, self.context)
+        self.assertIn("did not answer", self.update.message.reply_text.call_args[0][0])
+
+class TestPanicCommand(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        MT5.reset_mock()
+        MT5.symbol_info_tick.return_value = MagicMock(bid=1.1, ask=1.1001, time_msc=1.0)
+        self.addCleanup(setattr, MT5.symbol_info_tick, "side_effect", None)
+        self.sim = SimulatedExecution(FillModel(), initial_balance=10000.0)
+        for symbol in ("EURUSD", "GBPUSD", "USDJPY"):
+            self.sim.execute_trade(symbol, "BUY", 0.1, 1.0, 1.2)
+        self.bot = ScalpMasterBot.__new__(ScalpMasterBot)
+        self.bot.commands = CommandQueue()
+        self.bot.execution = self.sim
+        self.bot.is_running = True
+        patcher = patch('core.bot.TelegramNotifier.send')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.update = MagicMock()
+        self.update.message.reply_text = AsyncMock()
+        self.context = MagicMock()
+        self.context.bot_data = {"engine": self.bot}
+
+    async def test_panic_waits_for_poll_ticks(self):
+        in_poll, release = threading.Event(), threading.Event()
+        quote = MagicMock(bid=1.1010, ask=1.1011, time_msc=2.0)
+
+        def slow_tick(symbol):
+            in_poll.set()
+            release.wait(5)
+            return quote
+        MT5.symbol_info_tick.side_effect = slow_tick
+
+        def engine_loop():
+            # The loop's positions stage, then its command boundary
+            self.bot.execution.sync_positions()
+            self.bot._apply_commands()
+        engine = threading.Thread(target=engine_loop, daemon=True)
+        engine.start()
+        self.assertTrue(in_poll.wait(5))
+
+        panic = asyncio.ensure_future(commands.cmd_panic(self.update, self.context))
+        await asyncio.sleep(0.05)
+        # Queued, not run from the Telegram thread while the book is being walked
+        self.assertFalse(panic.done())
+        self.assertEqual(len(self.sim.positions), 3)
+        release.set()
+        await panic
+        engine.join(5)
+
+        self.assertIn("PANIC EXECUTED", self.update.message.reply_text.call_args[0][0])
+        self.assertEqual(self.sim.positions, {})
+        self.assertEqual(sorted(e.ticket for e in self.sim.closed), sorted({e.ticket for e in self.sim.closed}))
+        self.assertEqual(len(self.sim.closed), 3)
+        self.assertAlmostEqual(self.sim.account.balance, 10000.0 + sum(e.profit for e in self.sim.closed))
+
+    async def test_panic_not_cancelled_by_timeout(self):
+        with patch.object(commands.Config, 'TELEGRAM_COMMAND_TIMEOUT', 0.05):
+            await commands.cmd_panic(self.update, self.context)
+        self.assertIn("PANIC QUEUED", self.update.message.reply_text.call_args[0][0])
+        # Still executed by the next loop
+        self.bot._apply_commands()
+        self.assertEqual(self.sim.positions, {})
+
+    async def test_panic_with_engine_down(self):
+        self.bot.is_running = False
+        await commands.cmd_panic(self.update, self.context)
+        self.assertIn("NOTHING was closed", self.update.message.reply_text.call_args[0][0])
+        self.assertEqual(len(self.bot.commands), 0)
+
+    async def test_panic_cancelled_when_engine_stops_while_queued(self):
+        def stop_engine():
+            self.bot.is_running = False
+        asyncio.get_running_loop().call_later(0.01, stop_engine)
+        with patch.object(commands.Config, 'TELEGRAM_COMMAND_TIMEOUT', 0.05):
+            await commands.cmd_panic(self.update, self.context)
+        self.assertIn("NOTHING was closed", self.update.message.reply_text.call_args[0][0])
+        self.bot._apply_commands()
+        self.assertEqual(len(self.sim.positions), 3)
+
 if __name__ == '__main__':
     unittest.main()